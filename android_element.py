@@ -0,0 +1,103 @@
+from hierarchy_parser import parse_bounds
+from label_placement import place_labels
+from overlay_renderer import draw_boxes, draw_labels, draw_leaders, get_atlas, putbtext_origin
+
+# --- Configuration ---
+# Shared by draw_element_boxes, compositor.ElementBoxesLayer and the annotator's visibility pass
+VISIBILITY_MIN_FRACTION = 0.5 # Minimum fraction of an element's area that must be on screen and uncovered
+LABEL_PLACEMENT = True # Move labels that would overlap to free spots (label_placement.py); False keeps (x1+5, y1+20)
+
+
+class AndroidElement:
+    __slots__ = ("uid", "bbox", "attrib_name", "attrib_value", "text", "desc", "tree", "row", "class_name",
+                 "visible_fraction", "label_rect")
+
+    def __init__(self, uid, bbox, attrib_name, attrib_value, text=None, desc=None, tree=None, row=None,
+                 class_name=None):
+        self.uid = uid
+        self.bbox = bbox  # ((x1, y1), (x2, y2))
+        self.attrib_name = attrib_name
+        self.attrib_value = attrib_value
+        self.text = text
+        self.desc = desc
+        self.tree = tree  # ui_tree.UiTree this element is a view of, if any
+        self.row = row    # Row of the element in `tree`
+        self.class_name = class_name  # "class" attribute of the node, e.g. "android.widget.Button"
+        self.visible_fraction = None  # Set by visibility.filter_visible_elements
+        self.label_rect = None  # (x1, y1, x2, y2) of the drawn label, set by draw_element_boxes
+
+    def __repr__(self):
+        return (f"AndroidElement(uid='{self.uid}', bbox={self.bbox}, "
+                f"{self.attrib_name}='{self.attrib_value}', text='{self.text}', desc='{self.desc}')")
+
+def _element_bounds(elem):
+    """Returns (x1, y1, x2, y2), reusing bounds pre-parsed by hierarchy_parser when available."""
+    bounds = getattr(elem, "bounds", None)
+    if bounds is None:
+        bounds = parse_bounds(elem.attrib.get("bounds", "[0,0][0,0]")) or (0, 0, 0, 0)
+    return bounds
+
+def get_id_from_element_appagent_logic(elem, parent_elem=None):
+    """Generates an ID for an element, similar to AppAgent's logic."""
+    elem_id_parts = []
+
+    if parent_elem is not None:
+        parent_id_parts = []
+        if "resource-id" in parent_elem.attrib and parent_elem.attrib["resource-id"]:
+            parent_id_parts.append(parent_elem.attrib["resource-id"].replace(":", ".").replace("/", "_"))
+        else:
+            parent_id_parts.append(parent_elem.attrib.get('class', 'UnknownClass'))
+            x1_p, y1_p, x2_p, y2_p = _element_bounds(parent_elem)
+            parent_id_parts.append(f"{x2_p-x1_p}_{y2_p-y1_p}")
+
+        if "content-desc" in parent_elem.attrib and parent_elem.attrib["content-desc"] and len(parent_elem.attrib["content-desc"]) < 20:
+            content_desc = parent_elem.attrib['content-desc'].replace("/", "_").replace(" ", "").replace(":", "_")
+            parent_id_parts.append(content_desc)
+        elem_id_parts.append("_".join(parent_id_parts))
+
+
+    if "resource-id" in elem.attrib and elem.attrib["resource-id"]:
+        elem_id_parts.append(elem.attrib["resource-id"].replace(":", ".").replace("/", "_"))
+    else:
+        elem_id_parts.append(elem.attrib.get('class', 'UnknownClass'))
+        x1, y1, x2, y2 = _element_bounds(elem)
+        elem_id_parts.append(f"{x2-x1}_{y2-y1}")
+
+    if "content-desc" in elem.attrib and elem.attrib["content-desc"] and len(elem.attrib["content-desc"]) < 20:
+        content_desc = elem.attrib['content-desc'].replace("/", "_").replace(" ", "").replace(":", "_")
+        elem_id_parts.append(content_desc)
+
+    return "_".join(filter(None, elem_id_parts)) if elem_id_parts else "unidentified_element"
+
+def draw_element_boxes(img_cv, elements_list):
+    """Draws bounding boxes and numbered labels for elements onto a BGR image in place; returns the image."""
+    atlas = get_atlas(font_scale=0.7, thickness=1, vspace=5, hspace=5)
+    box_colors, labels, origins = [], [], []
+    for i, elem in enumerate(elements_list):
+        (x1, y1), (x2, y2) = elem.bbox
+        box_color = (250, 0, 0) # BGR format for OpenCV (Blue)
+        if elem.visible_fraction is not None and elem.visible_fraction < VISIBILITY_MIN_FRACTION:
+            box_color = (160, 160, 160) # Grey: flagged as hidden by the visibility pass
+        box_colors.append(box_color)
+        labels.append(str(i + 1))
+        origins.append(putbtext_origin(x1 + 5, y1 + 20, atlas))
+
+    boxes = [elem.bbox for elem in elements_list]
+    leaders, leader_colors = [], []
+    if LABEL_PLACEMENT:
+        placements = place_labels(boxes, [atlas.size(label) for label in labels],
+                                  (img_cv.shape[1], img_cv.shape[0]), preferred=origins)
+        origins = [placement.origin for placement in placements]
+        for placement, box_color in zip(placements, box_colors):
+            if placement.leader is not None:
+                leaders.append(placement.leader)
+                leader_colors.append(box_color)
+
+    # All boxes first, then every label in one blend so no box is drawn over a label
+    draw_boxes(img_cv, boxes, box_colors, 2)
+    draw_leaders(img_cv, leaders, leader_colors, 1)
+    rects = draw_labels(img_cv, labels, origins, bg_colors=(0, 0, 0), text_colors=(255, 255, 255), alpha=0.8,
+                        atlas=atlas)
+    for elem, rect in zip(elements_list, rects):
+        elem.label_rect = rect
+    return img_cv
@@ -1,9 +1,15 @@
 import os
 import subprocess
-import xml.etree.ElementTree as ET
 import cv2
-import pyshine # For putBText, ensure you have run: pip install pyshine opencv-python
 import time
+from hierarchy_parser import READ_CHUNK_SIZE, create_parser, iter_nodes, parse_nodes
+from artifact_writer import FLUSH_TIMEOUT, wait, write_image
+from android_element import (VISIBILITY_MIN_FRACTION, AndroidElement, draw_element_boxes,
+                             get_id_from_element_appagent_logic)
+from compositor import ElementBoxesLayer, GridLayer, PointsLayer, compose
+from region_proposer import propose_regions
+from ui_tree import UiTree
+from visibility import filter_visible_elements
 
 # --- Configuration ---
 ADB_PATH = "adb"  # Path to adb executable or just "adb" if in PATH
@@ -17,7 +23,26 @@ OUTPUT_DIR = "output_annotated" # For storing the annotated screenshot
 
 MIN_DIST_ELEMENTS = 10 # Minimum pixel distance between centers of elements to be considered separate
 ELEMENT_ATTRIB_TO_FIND = "clickable" # Attribute to identify elements (e.g., "clickable", "focusable", "enabled")
+# Categories produced by classify_xml_tree in a single pass over the XML
+INTERACTION_ATTRIBS = ("clickable", "long-clickable", "focusable", "scrollable", "checkable", "editable")
+# uiautomator dumps have no "editable" attribute, text inputs are recognised by class name instead
+EDITABLE_CLASS_SUFFIXES = ("EditText", "AutoCompleteTextView")
 IMAGE_PREFIX = "capture" # Prefix for the output files
+XML_PARSER_BACKEND = None # None uses hierarchy_parser.DEFAULT_BACKEND ("expat", "lxml" or "etree")
+
+# Streaming UI dump: `adb exec-out uiautomator dump <target>` writes the XML straight to stdout
+UIAUTOMATOR_DUMP_TARGET = "/dev/tty"
+UIAUTOMATOR_COMPRESSED = False # True passes --compressed: drops layout-only nodes (smaller dump, faster idle wait)
+UIAUTOMATOR_DUMP_RETRIES = 3 # Attempts when the device reports "could not get idle state"
+UIAUTOMATOR_RETRY_DELAY = 0.3 # Seconds before the first retry, doubled after each failed attempt
+UIAUTOMATOR_IDLE_ERROR = b"could not get idle state"
+# --- Visibility filtering (see visibility.py) ---
+VISIBILITY_MODE = "flag" # "flag" hidden elements (drawn grey), "drop" them, or None to skip the pass
+# VISIBILITY_MIN_FRACTION and LABEL_PLACEMENT are set in android_element.py, shared with compositor.py
+VISION_FALLBACK = True # Propose regions from the screenshot (region_proposer.py) when the XML is missing or empty
+# Views main() renders from one decode of the screenshot (compositor.py): "elements", "grid", "points"
+ANNOTATION_VIEWS = ("elements",)
+BACKGROUND_WRITES = False # Encode and write annotated images on artifact_writer's worker pool instead of blocking
 
 
 def execute_adb_command(command_parts, device_id=None, check_error=True):
@@ -43,118 +68,187 @@ def execute_adb_command(command_parts, device_id=None, check_error=True):
         raise
     return None
 
-class AndroidElement:
-    def __init__(self, uid, bbox, attrib_name, attrib_value, text=None, desc=None):
-        self.uid = uid
-        self.bbox = bbox  # ((x1, y1), (x2, y2))
-        self.attrib_name = attrib_name
-        self.attrib_value = attrib_value
-        self.text = text
-        self.desc = desc
-
-    def __repr__(self):
-        return (f"AndroidElement(uid='{self.uid}', bbox={self.bbox}, "
-                f"{self.attrib_name}='{self.attrib_value}', text='{self.text}', desc='{self.desc}')")
-
-def get_id_from_element_appagent_logic(elem, parent_elem=None):
-    """Generates an ID for an element, similar to AppAgent's logic."""
-    elem_id_parts = []
-
-    if parent_elem is not None:
-        parent_id_parts = []
-        if "resource-id" in parent_elem.attrib and parent_elem.attrib["resource-id"]:
-            parent_id_parts.append(parent_elem.attrib["resource-id"].replace(":", ".").replace("/", "_"))
-        else:
-            parent_id_parts.append(parent_elem.attrib.get('class', 'UnknownClass'))
-            bounds = parent_elem.attrib.get("bounds", "[0,0][0,0]")[1:-1].split("][")
-            x1_p, y1_p = map(int, bounds[0].split(","))
-            x2_p, y2_p = map(int, bounds[1].split(","))
-            parent_id_parts.append(f"{x2_p-x1_p}_{y2_p-y1_p}")
-        
-        if "content-desc" in parent_elem.attrib and parent_elem.attrib["content-desc"] and len(parent_elem.attrib["content-desc"]) < 20:
-            content_desc = parent_elem.attrib['content-desc'].replace("/", "_").replace(" ", "").replace(":", "_")
-            parent_id_parts.append(content_desc)
-        elem_id_parts.append("_".join(parent_id_parts))
-
-
-    if "resource-id" in elem.attrib and elem.attrib["resource-id"]:
-        elem_id_parts.append(elem.attrib["resource-id"].replace(":", ".").replace("/", "_"))
-    else:
-        elem_id_parts.append(elem.attrib.get('class', 'UnknownClass'))
-        bounds = elem.attrib.get("bounds", "[0,0][0,0]")[1:-1].split("][")
-        x1, y1 = map(int, bounds[0].split(","))
-        x2, y2 = map(int, bounds[1].split(","))
-        elem_id_parts.append(f"{x2-x1}_{y2-y1}")
-
-    if "content-desc" in elem.attrib and elem.attrib["content-desc"] and len(elem.attrib["content-desc"]) < 20:
-        content_desc = elem.attrib['content-desc'].replace("/", "_").replace(" ", "").replace(":", "_")
-        elem_id_parts.append(content_desc)
+class _CategoryCollector:
+    """Collects elements of one category, skipping centers closer than min_dist to an accepted one."""
 
-    return "_".join(filter(None, elem_id_parts)) if elem_id_parts else "unidentified_element"
+    def __init__(self, attrib_name, min_dist, elements=None, keep=True, tree=None):
+        self.attrib_name = attrib_name
+        self.tree = tree # UiTree built from the same nodes: elements become views of its rows
+        self.elements = elements if elements is not None else []
+        self.keep = keep # False: only dedup, accepted elements are handed out by add() and not stored
+        self._min_dist_sq = min_dist ** 2
+        self._cell = max(int(min_dist), 1) # Bucket size >= min_dist: close centers share a 3x3 neighbourhood
+        self._buckets = {}
+        for elem in self.elements:
+            (x1, y1), (x2, y2) = elem.bbox
+            self._remember((x1 + x2) // 2, (y1 + y2) // 2)
+
+    def _remember(self, center_x, center_y):
+        key = (center_x // self._cell, center_y // self._cell)
+        self._buckets.setdefault(key, []).append((center_x, center_y))
+
+    def is_too_close(self, center_x, center_y):
+        bucket_x, bucket_y = center_x // self._cell, center_y // self._cell
+        for dx in (-1, 0, 1):
+            for dy in (-1, 0, 1):
+                for existing_x, existing_y in self._buckets.get((bucket_x + dx, bucket_y + dy), ()):
+                    if (center_x - existing_x)**2 + (center_y - existing_y)**2 < self._min_dist_sq:
+                        return True
+        return False
 
-def traverse_xml_tree(xml_path, elements_list, target_attrib_name, min_dist_elements):
-    """Parses XML and extracts elements with the target attribute."""
-    path_tracker = []
+    def add(self, node, attrib_value):
+        """Accepts the node unless it is too close to a previous one; returns the new element or None."""
+        x1, y1, x2, y2 = node.bounds
+        center_x, center_y = (x1 + x2) // 2, (y1 + y2) // 2
+        if self.is_too_close(center_x, center_y):
+            return None
+        self._remember(center_x, center_y)
+        elem = AndroidElement(
+            uid=get_id_from_element_appagent_logic(node, node.parent),
+            bbox=((x1, y1), (x2, y2)),
+            attrib_name=self.attrib_name,
+            attrib_value=attrib_value,
+            text=node.attrib.get("text", ""),
+            desc=node.attrib.get("content-desc", ""),
+            class_name=node.attrib.get("class", ""),
+            tree=self.tree,
+            row=node.index if self.tree is not None else None # Document order is the UiTree row
+        )
+        if self.keep:
+            self.elements.append(elem)
+        return elem
+
+def _node_attrib_value(attrib, attrib_name):
+    """Returns "true" if the node has the attribute set, including the derived "editable" category."""
+    value = attrib.get(attrib_name)
+    if value is None and attrib_name == "editable":
+        return "true" if attrib.get("class", "").endswith(EDITABLE_CLASS_SUFFIXES) else "false"
+    return value
+
+def _collect_nodes(xml_path, collectors, backend, nodes=None):
+    """
+    Single pass over the XML feeding every node to each collector whose attribute it has.
+
+    A generator: yields (collector, element) as soon as an element is accepted, and stops
+    reading the dump when the caller stops iterating. Already parsed `nodes` are used
+    instead of reading xml_path when given.
+    """
+    for node in (nodes if nodes is not None else iter_nodes(xml_path, backend)):
+        matching = [c for c in collectors if _node_attrib_value(node.attrib, c.attrib_name) == "true"]
+        if not matching:
+            continue
+        bounds_str = node.attrib.get("bounds")
+        if not bounds_str:
+            continue
+        if node.bounds is None:
+            print(f"Warning: Could not parse bounds for element: {node.attrib}")
+            continue
+
+        x1, y1, x2, y2 = node.bounds
+        if x1 >= x2 or y1 >= y2:
+            print(f"Warning: Skipping element with invalid bounds: {bounds_str}")
+            continue
+
+        for collector in matching:
+            elem = collector.add(node, "true")
+            if elem is not None:
+                yield collector, elem
+
+def traverse_xml_tree(xml_path, elements_list, target_attrib_name, min_dist_elements, backend=XML_PARSER_BACKEND,
+                      nodes=None, tree=None):
+    """
+    Parses XML (or walks its already parsed HierarchyNode list `nodes`) and extracts elements with the target attribute.
+
+    Passing the UiTree built from those same nodes links every element to its row (elem.tree, elem.row).
+    """
     try:
-        for event, elem in ET.iterparse(xml_path, ['start', 'end']):
-            if event == 'start':
-                path_tracker.append(elem)
-                if target_attrib_name in elem.attrib and elem.attrib[target_attrib_name] == "true":
-                    bounds_str = elem.attrib.get("bounds")
-                    if not bounds_str:
-                        continue
-                    
-                    try:
-                        bounds_parts = bounds_str[1:-1].split("][")
-                        x1, y1 = map(int, bounds_parts[0].split(","))
-                        x2, y2 = map(int, bounds_parts[1].split(","))
-                    except ValueError:
-                        print(f"Warning: Could not parse bounds for element: {elem.attrib}")
-                        continue
+        collectors = [_CategoryCollector(target_attrib_name, min_dist_elements, elements_list, tree=tree)]
+        for _ in _collect_nodes(xml_path, collectors, backend, nodes):
+            pass
+    except ValueError as e:
+        print(f"Error parsing XML file '{xml_path}': {e}")
+    except Exception as e:
+        print(f"An unexpected error occurred during XML traversal: {e}")
 
-                    if x1 >= x2 or y1 >= y2:
-                        print(f"Warning: Skipping element with invalid bounds: {bounds_str}")
-                        continue
+def classify_xml_tree(xml_path, min_dist_elements, attrib_names=INTERACTION_ATTRIBS, backend=XML_PARSER_BACKEND):
+    """
+    Parses XML once and classifies every node by all interaction attributes.
 
-                    center_x = (x1 + x2) // 2
-                    center_y = (y1 + y2) // 2
-
-                    is_too_close = False
-                    for existing_elem in elements_list:
-                        ex_x1, ex_y1 = existing_elem.bbox[0]
-                        ex_x2, ex_y2 = existing_elem.bbox[1]
-                        existing_center_x = (ex_x1 + ex_x2) // 2
-                        existing_center_y = (ex_y1 + ex_y2) // 2
-                        dist_sq = (center_x - existing_center_x)**2 + (center_y - existing_center_y)**2
-                        if dist_sq < min_dist_elements**2:
-                            is_too_close = True
-                            break
-                    
-                    if not is_too_close:
-                        parent_elem = path_tracker[-2] if len(path_tracker) > 1 else None
-                        uid = get_id_from_element_appagent_logic(elem, parent_elem)
-                        text_content = elem.attrib.get("text", "")
-                        content_desc = elem.attrib.get("content-desc", "")
-                        
-                        android_elem = AndroidElement(
-                            uid=uid,
-                            bbox=((x1, y1), (x2, y2)),
-                            attrib_name=target_attrib_name,
-                            attrib_value=elem.attrib[target_attrib_name],
-                            text=text_content,
-                            desc=content_desc
-                        )
-                        elements_list.append(android_elem)
-            
-            elif event == 'end':
-                if path_tracker and path_tracker[-1] == elem: 
-                    path_tracker.pop()
-                elem.clear()
-
-    except ET.ParseError as e:
+    Args:
+        xml_path (str): Path to the uiautomator XML dump (or its raw bytes)
+        min_dist_elements (int): Minimum center distance between two elements of the same category
+        attrib_names (tuple): Categories to collect, see INTERACTION_ATTRIBS
+        backend (str): hierarchy_parser backend name
+
+    Returns:
+        dict: {attrib_name: [AndroidElement, ...]}, one list per category in document order
+    """
+    collectors = [_CategoryCollector(name, min_dist_elements) for name in attrib_names]
+    try:
+        for _ in _collect_nodes(xml_path, collectors, backend):
+            pass
+    except ValueError as e:
         print(f"Error parsing XML file '{xml_path}': {e}")
     except Exception as e:
         print(f"An unexpected error occurred during XML traversal: {e}")
+    return {collector.attrib_name: collector.elements for collector in collectors}
+
+def iter_xml_elements(xml_path, target_attrib_name=ELEMENT_ATTRIB_TO_FIND, min_dist_elements=MIN_DIST_ELEMENTS,
+                      predicate=None, backend=XML_PARSER_BACKEND):
+    """
+    Streaming version of traverse_xml_tree: yields elements while the dump is being parsed.
+
+    Elements are the ones traverse_xml_tree would return, in the same order. Breaking out of
+    the loop (or closing the generator) stops parsing and closes the file, so callers looking
+    for a single target do not pay for the rest of a large dump. Only the dedup centers of
+    accepted elements are retained, not the parsed tree.
+
+    Args:
+        xml_path (str): Path to the uiautomator XML dump, a binary file object or its raw bytes
+        target_attrib_name (str): Attribute to look for (e.g. "clickable"), or "editable"
+        min_dist_elements (int): Minimum center distance between two yielded elements
+        predicate (callable): Optional filter, predicate(AndroidElement) -> bool
+        backend (str): hierarchy_parser backend name
+
+    Yields:
+        AndroidElement: Matching elements in document order
+
+    Raises:
+        ValueError: If the XML is malformed
+    """
+    collector = _CategoryCollector(target_attrib_name, min_dist_elements, keep=False)
+    for _, elem in _collect_nodes(xml_path, [collector], backend):
+        if predicate is None or predicate(elem):
+            yield elem
+
+def find_first_element(xml_path, predicate=None, target_attrib_name=ELEMENT_ATTRIB_TO_FIND,
+                       min_dist_elements=MIN_DIST_ELEMENTS, backend=XML_PARSER_BACKEND):
+    """
+    Returns the first element matching `predicate`, parsing the dump only up to it.
+
+    Example:
+        find_first_element(xml_path, lambda e: e.text == "Install")
+
+    Returns:
+        AndroidElement or None if nothing matches or the XML cannot be parsed
+    """
+    elements = iter_xml_elements(xml_path, target_attrib_name, min_dist_elements, predicate, backend)
+    try:
+        return next(elements, None)
+    except ValueError as e:
+        print(f"Error parsing XML file '{xml_path}': {e}")
+        return None
+    finally:
+        elements.close()
+
+def merge_clickable_focusable(classified, min_dist_elements):
+    """Clickable elements plus focusable ones not near any of them, as expected by draw_bbox_multi(record_mode=True)."""
+    merged = _CategoryCollector("clickable", min_dist_elements, list(classified.get("clickable", [])))
+    for elem in classified.get("focusable", []):
+        (x1, y1), (x2, y2) = elem.bbox
+        if not merged.is_too_close((x1 + x2) // 2, (y1 + y2) // 2):
+            merged.elements.append(elem)
+    return merged.elements
 
 def draw_bounding_boxes_on_image(img_path, output_path, elements_list):
     """Draws bounding boxes and labels for elements on the image."""
@@ -167,34 +261,15 @@ def draw_bounding_boxes_on_image(img_path, output_path, elements_list):
         print(f"Error reading image {img_path} with OpenCV: {e}")
         return False
 
-    for i, elem in enumerate(elements_list):
-        (x1, y1), (x2, y2) = elem.bbox
-        label = str(i + 1) 
-
-        box_color = (250, 0, 0) # BGR format for OpenCV (Blue)
-        cv2.rectangle(img_cv, (x1, y1), (x2, y2), box_color, 2)
-
-        text_color = (255, 255, 255) 
-        bg_color = (0,0,0) 
-
-        text_x = x1 + 5
-        text_y = y1 + 20 
-        
-        try:
-            img_cv = pyshine.putBText(img_cv, label, 
-                                      text_offset_x=text_x, text_offset_y=text_y,
-                                      vspace=5, hspace=5, font_scale=0.7, 
-                                      background_RGB=(bg_color[2], bg_color[1], bg_color[0]), 
-                                      text_RGB=(text_color[2], text_color[1], text_color[0]), 
-                                      font_thickness=1, alpha=0.8)
-        except Exception as e:
-            cv2.putText(img_cv, label, (x1 + 5, y1 + 15), cv2.FONT_HERSHEY_SIMPLEX, 0.5, text_color, 1, cv2.LINE_AA)
-            
-            (w, h), _ = cv2.getTextSize(label, cv2.FONT_HERSHEY_SIMPLEX, 0.5, 1)
-            cv2.rectangle(img_cv, (x1+2, y1+2), (x1+5+w, y1+15+h-5), (bg_color[0],bg_color[1],bg_color[2]), -1) # BGR for cv2
-            cv2.putText(img_cv, label, (x1 + 5, y1 + 15), cv2.FONT_HERSHEY_SIMPLEX, 0.5, text_color, 1, cv2.LINE_AA)
-
+    draw_element_boxes(img_cv, elements_list)
     try:
+        if BACKGROUND_WRITES:
+            output_path = write_image(output_path, img_cv)
+            if not wait([output_path], FLUSH_TIMEOUT): # Only report success once the file is on disk
+                print(f"Error saving annotated image {output_path}")
+                return False
+            print(f"Annotated image saved to: {output_path}")
+            return True
         cv2.imwrite(output_path, img_cv)
         print(f"Annotated image saved to: {output_path}")
         return True
@@ -202,8 +277,140 @@ def draw_bounding_boxes_on_image(img_path, output_path, elements_list):
         print(f"Error saving annotated image {output_path}: {e}")
         return False
 
-def get_device_screenshot_and_xml(device_id=None):
-    """Captures screenshot and UI XML from the device."""
+def stream_ui_hierarchy(device_id=None, compressed=UIAUTOMATOR_COMPRESSED, retries=UIAUTOMATOR_DUMP_RETRIES,
+                        backend=XML_PARSER_BACKEND):
+    """
+    Dumps the UI hierarchy to stdout via `adb exec-out` and parses it while bytes are still arriving.
+
+    No device-side file, `adb pull` or fixed sleep is involved. When the device reports
+    "could not get idle state" (or the output is not a complete dump) the dump is retried
+    up to `retries` times with a short exponential backoff.
+
+    Args:
+        device_id (str): Device serial, None for the only connected device
+        compressed (bool): Pass --compressed to uiautomator dump
+        retries (int): Maximum number of dump attempts
+        backend (str): hierarchy_parser backend name
+
+    Returns:
+        tuple: (xml_bytes, nodes) with the HierarchyNode list, or (None, None) on failure
+    """
+    command = [ADB_PATH]
+    if device_id:
+        command.extend(["-s", device_id])
+    command.extend(["exec-out", "uiautomator", "dump"])
+    if compressed:
+        command.append("--compressed")
+    command.append(UIAUTOMATOR_DUMP_TARGET)
+
+    delay = UIAUTOMATOR_RETRY_DELAY
+    for attempt in range(1, retries + 1):
+        parser = create_parser(backend)
+        received = bytearray()
+        xml_start = -1
+        nodes = []
+        error = None
+        eof = False
+        try:
+            process = subprocess.Popen(command, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+        except FileNotFoundError:
+            print(f"Error: '{ADB_PATH}' command not found. Is ADB installed and in your PATH?")
+            raise
+        try:
+            while not parser.done:
+                chunk = process.stdout.read1(READ_CHUNK_SIZE)
+                if not chunk:
+                    eof = True
+                    break
+                received.extend(chunk)
+                if xml_start < 0:
+                    xml_start = received.find(b"<?xml")
+                    if xml_start < 0:
+                        xml_start = received.find(b"<hierarchy")
+                    if xml_start < 0:
+                        continue
+                    chunk = bytes(received[xml_start:])
+                parser.feed(chunk)
+                nodes.extend(parser.read_nodes())
+        except ValueError as e:
+            error = str(e)
+        finally:
+            if not eof:
+                # Parsed (the trailing "UI hierchary dumped to" line is not needed), failed or interrupted:
+                # stop the dump so communicate() cannot block on it
+                process.kill()
+            _, stderr = process.communicate()
+
+        if parser.done and error is None:
+            xml_end = received.find(b"</hierarchy>", xml_start)
+            xml_end = xml_end + len(b"</hierarchy>") if xml_end >= 0 else len(received)
+            return bytes(received[xml_start:xml_end]), nodes
+
+        output = bytes(received) + stderr
+        if UIAUTOMATOR_IDLE_ERROR in output.lower():
+            reason = "could not get idle state"
+        else:
+            reason = error or output.decode("utf-8", errors="replace").strip()[:200] or f"exit code {process.returncode}"
+        print(f"Warning: UI dump attempt {attempt}/{retries} failed: {reason}")
+        if attempt < retries:
+            time.sleep(delay)
+            delay *= 2
+    return None, None
+
+def capture_screenshot(device_id=None):
+    """
+    Reads a PNG screenshot straight from `adb exec-out screencap -p`, without a device file.
+
+    Returns:
+        bytes: The PNG data, or None if adb failed or did not return a PNG
+    """
+    command = [ADB_PATH]
+    if device_id:
+        command.extend(["-s", device_id])
+    command.extend(["exec-out", "screencap", "-p"])
+    try:
+        result = subprocess.run(command, capture_output=True, check=False)
+    except FileNotFoundError:
+        print(f"Error: '{ADB_PATH}' command not found. Is ADB installed and in your PATH?")
+        raise
+    if result.returncode != 0 or not result.stdout.startswith(b"\x89PNG"):
+        reason = result.stderr.decode("utf-8", errors="replace").strip()[:200] or f"exit code {result.returncode}"
+        print(f"Warning: Streaming screenshot failed: {reason}")
+        return None
+    return result.stdout
+
+def _pull_screenshot_via_device_file(device_id, device_screenshot_path, local_screenshot_path):
+    """Legacy screenshot path: screencap to a device file, then adb pull."""
+    execute_adb_command(["shell", "rm", device_screenshot_path], device_id, check_error=False)
+    time.sleep(0.2)
+    if execute_adb_command(["shell", "screencap", "-p", device_screenshot_path], device_id) is None:
+        return None
+    time.sleep(0.5)
+    if execute_adb_command(["pull", device_screenshot_path, local_screenshot_path], device_id) is None:
+        return None
+    return local_screenshot_path
+
+def _pull_ui_xml_via_device_file(device_id, device_xml_path, local_xml_path):
+    """Legacy dump path: uiautomator dump to a device file, then adb pull."""
+    execute_adb_command(["shell", "rm", device_xml_path], device_id, check_error=False)
+    time.sleep(0.2)
+    if execute_adb_command(["shell", "uiautomator", "dump", device_xml_path], device_id) is None:
+        return None
+    time.sleep(0.5) 
+    if execute_adb_command(["pull", device_xml_path, local_xml_path], device_id) is None:
+        return None
+    return local_xml_path
+
+def get_device_screenshot_and_xml(device_id=None, stream_xml=True, return_nodes=False):
+    """
+    Captures screenshot and UI XML from the device.
+
+    With stream_xml=True both are read over `adb exec-out` (screencap -p, uiautomator dump),
+    without device files or fixed sleeps; the legacy device file + adb pull path is the fallback.
+
+    With return_nodes=True a third value is returned: the HierarchyNode list parsed while the
+    dump was streamed, or None when the XML came from the device-file fallback (or is missing).
+    """
     os.makedirs(LOCAL_TEMP_DIR, exist_ok=True)
 
     device_screenshot_path = f"{ANDROID_DEVICE_TEMP_DIR}/{IMAGE_PREFIX}.png"
@@ -213,25 +420,34 @@ def get_device_screenshot_and_xml(device_id=None):
     local_xml_path = os.path.join(LOCAL_TEMP_DIR, f"{IMAGE_PREFIX}.xml")
 
     print("Capturing screenshot...")
-    execute_adb_command(["shell", "rm", device_screenshot_path], device_id, check_error=False) 
-    time.sleep(0.2)
-    if execute_adb_command(["shell", "screencap", "-p", device_screenshot_path], device_id) is None:
-        return None, None
-    time.sleep(0.5)
-    if execute_adb_command(["pull", device_screenshot_path, local_screenshot_path], device_id) is None:
-        return None, None
+    failed = (None, None, None) if return_nodes else (None, None)
+    png_bytes = capture_screenshot(device_id) if stream_xml else None
+    if png_bytes is not None:
+        with open(local_screenshot_path, "wb") as f:
+            f.write(png_bytes)
+    else:
+        if stream_xml:
+            print("Falling back to device file + adb pull for the screenshot.")
+        if _pull_screenshot_via_device_file(device_id, device_screenshot_path, local_screenshot_path) is None:
+            return failed
     print(f"Screenshot saved to: {local_screenshot_path}")
 
     print("Dumping UI XML...")
-    execute_adb_command(["shell", "rm", device_xml_path], device_id, check_error=False)
-    time.sleep(0.2)
-    if execute_adb_command(["shell", "uiautomator", "dump", device_xml_path], device_id) is None:
-        return local_screenshot_path, None 
-    time.sleep(0.5) 
-    if execute_adb_command(["pull", device_xml_path, local_xml_path], device_id) is None:
-        return local_screenshot_path, None
+    xml_bytes = nodes = None
+    if stream_xml:
+        xml_bytes, nodes = stream_ui_hierarchy(device_id)
+    if xml_bytes is not None:
+        with open(local_xml_path, "wb") as f:
+            f.write(xml_bytes)
+    else:
+        if stream_xml:
+            print("Streaming dump failed, falling back to device file + adb pull.")
+        if _pull_ui_xml_via_device_file(device_id, device_xml_path, local_xml_path) is None:
+            return (local_screenshot_path, None, None) if return_nodes else (local_screenshot_path, None)
     print(f"UI XML saved to: {local_xml_path}")
 
+    if return_nodes:
+        return local_screenshot_path, local_xml_path, nodes
     return local_screenshot_path, local_xml_path
 
 def main():
@@ -242,22 +458,44 @@ def main():
     # e.g., device_id = "emulator-5554" 
     device_id = None 
 
-    local_screenshot_path, local_xml_path = get_device_screenshot_and_xml(device_id)
+    local_screenshot_path, local_xml_path, xml_nodes = get_device_screenshot_and_xml(device_id, return_nodes=True)
 
-    if not local_screenshot_path or not local_xml_path:
+    if not local_screenshot_path or (not local_xml_path and not VISION_FALLBACK):
         print("Failed to get screenshot or XML. Exiting.")
         return
 
     if not os.path.exists(local_screenshot_path):
         print(f"Error: Screenshot file not found at {local_screenshot_path}")
         return
-    if not os.path.exists(local_xml_path):
+    if local_xml_path and not os.path.exists(local_xml_path):
         print(f"Error: XML file not found at {local_xml_path}")
         return
 
     ui_elements = []
-    print(f"Parsing XML and finding '{ELEMENT_ATTRIB_TO_FIND}' elements...")
-    traverse_xml_tree(local_xml_path, ui_elements, ELEMENT_ATTRIB_TO_FIND, MIN_DIST_ELEMENTS)
+    ui_tree = None
+    if local_xml_path:
+        print(f"Parsing XML and finding '{ELEMENT_ATTRIB_TO_FIND}' elements...")
+        if xml_nodes is None:
+            try:
+                xml_nodes = parse_nodes(local_xml_path, XML_PARSER_BACKEND)
+            except ValueError as e:
+                print(f"Error parsing XML file '{local_xml_path}': {e}")
+                xml_nodes = []
+        if VISIBILITY_MODE and xml_nodes:
+            ui_tree = UiTree.from_nodes(xml_nodes) # Shared by the element and visibility passes
+        traverse_xml_tree(local_xml_path, ui_elements, ELEMENT_ATTRIB_TO_FIND, MIN_DIST_ELEMENTS,
+                          nodes=xml_nodes, tree=ui_tree)
+
+    if ui_tree is not None and ui_elements:
+        found = len(ui_elements)
+        ui_elements = filter_visible_elements(ui_elements, ui_tree, VISIBILITY_MIN_FRACTION,
+                                              drop=VISIBILITY_MODE == "drop")
+        if VISIBILITY_MODE == "drop" and len(ui_elements) < found:
+            print(f"Dropped {found - len(ui_elements)} hidden or off-screen elements.")
+
+    if not ui_elements and VISION_FALLBACK:
+        print("No usable UI XML elements, proposing regions from the screenshot...")
+        ui_elements = propose_regions(local_screenshot_path)
 
     if not ui_elements:
         print(f"No '{ELEMENT_ATTRIB_TO_FIND}' elements found in the UI XML.")
@@ -266,12 +504,24 @@ def main():
         for i, elem in enumerate(ui_elements):
             print(f"  {i+1}. {elem}") 
 
-    os.makedirs(OUTPUT_DIR, exist_ok=True)
-    annotated_image_filename = f"{IMAGE_PREFIX}_annotated_{ELEMENT_ATTRIB_TO_FIND}.png"
-    annotated_image_path = os.path.join(OUTPUT_DIR, annotated_image_filename)
-    
-    print(f"Annotating screenshot: {local_screenshot_path} -> {annotated_image_path}")
-    if draw_bounding_boxes_on_image(local_screenshot_path, annotated_image_path, ui_elements):
+    views = {
+        "elements": (f"{IMAGE_PREFIX}_annotated_{ELEMENT_ATTRIB_TO_FIND}.png", [ElementBoxesLayer(ui_elements)]),
+        "grid": (f"{IMAGE_PREFIX}_grid.png", [GridLayer()]),
+        "points": (f"{IMAGE_PREFIX}_points.png", [PointsLayer()]),
+    }
+    outputs = [(os.path.join(OUTPUT_DIR, views[view][0]), views[view][1]) for view in ANNOTATION_VIEWS]
+
+    print(f"Annotating screenshot: {local_screenshot_path} -> {', '.join(path for path, _ in outputs)}")
+    try:
+        results = compose(local_screenshot_path, outputs, background=BACKGROUND_WRITES)
+    except ValueError as e:
+        print(f"Error: {e} ({local_screenshot_path})")
+        results = {}
+    if BACKGROUND_WRITES and results and not wait(results.values(), FLUSH_TIMEOUT):
+        results = {} # Queued but not (all) written
+    if results and all(results.values()):
+        for path in results.values():
+            print(f"Annotated image saved to: {path}")
         print("Annotation successful.")
     else:
         print("Annotation failed.")
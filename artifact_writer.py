@@ -0,0 +1,207 @@
+import atexit
+import collections
+import os
+import threading
+import time
+
+import cv2
+
+# --- Configuration ---
+WRITER_WORKERS = 2 # Threads encoding and writing images (OpenCV releases the GIL while encoding)
+WRITER_QUEUE_SIZE = 8 # Images waiting to be written; each pending image holds a full frame in memory
+# What submit() does when the queue is full: "block" waits for a free slot (back-pressure),
+# "drop_newest" discards the new image, "drop_oldest" discards the longest-waiting one
+WRITER_FULL_POLICY = "block"
+ARTIFACT_FORMAT = None # None keeps each path's extension; "png" or "webp" rewrites it
+PNG_COMPRESSION = None # zlib level 0-9, None for OpenCV's default (fast RLE strategy, larger files)
+WEBP_LOSSLESS = True # WebP output is lossless (about half the PNG size, several times slower to encode)
+WEBP_QUALITY = 90 # Quality 1-100 when WEBP_LOSSLESS is False
+FLUSH_TIMEOUT = 30.0 # Seconds the exit handler waits for pending images
+
+FULL_POLICIES = ("block", "drop_newest", "drop_oldest")
+
+
+def encode_settings(path, image_format=ARTIFACT_FORMAT, png_compression=PNG_COMPRESSION,
+                    webp_lossless=WEBP_LOSSLESS, webp_quality=WEBP_QUALITY):
+    """(path with the output extension, cv2.imwrite params) for an artifact path."""
+    if image_format:
+        path = os.path.splitext(path)[0] + "." + image_format.lower().lstrip(".")
+    ext = os.path.splitext(path)[1].lower()
+    if ext == ".png" and png_compression is not None:
+        return path, [cv2.IMWRITE_PNG_COMPRESSION, int(png_compression)]
+    if ext == ".webp":
+        return path, [cv2.IMWRITE_WEBP_QUALITY, 101 if webp_lossless else int(webp_quality)] # >100 is lossless
+    return path, []
+
+
+class ArtifactWriter:
+    """
+    Encodes and writes images on a small worker pool so callers do not wait on cv2.imwrite.
+
+    The queue is bounded: when it is full, submit() applies the full policy (block the caller
+    until a worker frees a slot, or drop an image) so a slow disk cannot grow memory without
+    limit. flush() waits until everything submitted so far is on disk; the shared writer from
+    get_writer() is flushed at interpreter exit.
+    """
+
+    def __init__(self, workers=WRITER_WORKERS, queue_size=WRITER_QUEUE_SIZE, full_policy=WRITER_FULL_POLICY,
+                 image_format=ARTIFACT_FORMAT, png_compression=PNG_COMPRESSION, webp_lossless=WEBP_LOSSLESS,
+                 webp_quality=WEBP_QUALITY):
+        if full_policy not in FULL_POLICIES:
+            raise ValueError(f"Unknown full policy '{full_policy}', expected one of {', '.join(FULL_POLICIES)}")
+        self.workers = max(int(workers), 1)
+        self.queue_size = max(int(queue_size), 1)
+        self.full_policy = full_policy
+        self.settings = dict(image_format=image_format, png_compression=png_compression,
+                             webp_lossless=webp_lossless, webp_quality=webp_quality)
+        self.written = 0
+        self.dropped = 0
+        self.failed = 0
+        self.failed_paths = set() # Paths whose last write failed
+        self._pending = collections.deque() # (path, image, params) waiting for a worker
+        self._in_progress = 0
+        self._condition = threading.Condition()
+        self._threads = []
+        self._closed = False
+
+    def __repr__(self):
+        return (f"ArtifactWriter(workers={self.workers}, pending={len(self._pending)}, written={self.written}, "
+                f"dropped={self.dropped}, failed={self.failed})")
+
+    def _start_workers(self):
+        self._threads = [p for p in self._threads if p.is_alive()]
+        for i in range(len(self._threads), self.workers):
+            thread = threading.Thread(target=self._work, name=f"artifact-writer-{i}", daemon=True)
+            thread.start()
+            self._threads.append(thread)
+
+    def submit(self, path, image, copy=False):
+        """
+        Queues `image` to be written to `path` (its extension may be rewritten by ARTIFACT_FORMAT).
+
+        The writer keeps a reference to the array; pass copy=True if the caller keeps drawing on it.
+
+        Returns:
+            str: The path the image will be written to, or None if the "drop_newest" policy discarded it
+        """
+        path, params = encode_settings(path, **self.settings)
+        job = (path, image.copy() if copy else image, params)
+        with self._condition:
+            if self._closed:
+                raise ValueError("ArtifactWriter is closed")
+            if not self._threads:
+                self._start_workers()
+            if len(self._pending) >= self.queue_size:
+                if self.full_policy == "drop_newest":
+                    self.dropped += 1
+                    print(f"Warning: Artifact queue full, not writing {path}")
+                    return None
+                if self.full_policy == "drop_oldest":
+                    self.dropped += 1
+                    print(f"Warning: Artifact queue full, not writing {self._pending.popleft()[0]}")
+                else:
+                    while len(self._pending) >= self.queue_size:
+                        self._condition.wait()
+            self._pending.append(job)
+            self._condition.notify_all()
+        return path
+
+    def _work(self):
+        while True:
+            with self._condition:
+                while not self._pending and not self._closed:
+                    self._condition.wait()
+                if not self._pending: # Closed and drained
+                    return
+                path, image, params = self._pending.popleft()
+                self._in_progress += 1
+                self._condition.notify_all() # A slot is free for a blocked submit()
+            ok = False
+            try:
+                directory = os.path.dirname(path)
+                if directory:
+                    os.makedirs(directory, exist_ok=True)
+                ok = cv2.imwrite(path, image, params)
+                if not ok:
+                    print(f"Error: Could not write artifact {path}")
+            except (OSError, cv2.error) as e:
+                print(f"Error: Could not write artifact {path}: {e}")
+            with self._condition:
+                self._in_progress -= 1
+                if ok:
+                    self.written += 1
+                    self.failed_paths.discard(path)
+                else:
+                    self.failed += 1
+                    self.failed_paths.add(path)
+                self._condition.notify_all()
+
+    def flush(self, timeout=None):
+        """Waits until every image submitted so far is written; returns False on timeout."""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with self._condition:
+            while self._pending or self._in_progress:
+                remaining = None if deadline is None else deadline - time.monotonic()
+                if remaining is not None and remaining <= 0:
+                    return False
+                self._condition.wait(remaining)
+        return True
+
+    def wait(self, paths, timeout=None):
+        """
+        Flushes, then reports whether every one of `paths` (as returned by submit()) is on disk.
+
+        Returns:
+            bool: False on timeout or if any path was dropped (None) or failed to write
+        """
+        paths = list(paths)
+        if not self.flush(timeout):
+            return False
+        with self._condition:
+            return all(path is not None and path not in self.failed_paths for path in paths)
+
+    def close(self, timeout=None):
+        """Writes what is queued, then stops the workers; returns False if pending images were abandoned."""
+        flushed = self.flush(timeout)
+        with self._condition:
+            self._closed = True
+            self._condition.notify_all()
+        for thread in self._threads:
+            thread.join(timeout=1)
+        return flushed
+
+
+_writer = None
+_writer_lock = threading.Lock()
+
+
+def get_writer():
+    """Returns the shared ArtifactWriter, created with the module settings on first use."""
+    global _writer
+    with _writer_lock:
+        if _writer is None:
+            _writer = ArtifactWriter()
+    return _writer
+
+
+def write_image(path, image, copy=False):
+    """Queues an image on the shared writer; returns the final path, or None if it was dropped."""
+    return get_writer().submit(path, image, copy)
+
+
+def flush(timeout=None):
+    """Waits for the shared writer (if any) to finish everything queued so far."""
+    return _writer.flush(timeout) if _writer is not None else True
+
+
+def wait(paths, timeout=FLUSH_TIMEOUT):
+    """True once every path queued on the shared writer is written, False if one failed, was dropped or timed out."""
+    return get_writer().wait(paths, timeout)
+
+
+def _flush_at_exit():
+    if _writer is not None and not _writer.close(FLUSH_TIMEOUT):
+        print(f"Warning: Gave up on {len(_writer._pending)} artifact(s) still queued after {FLUSH_TIMEOUT}s")
+
+
+atexit.register(_flush_at_exit)
@@ -0,0 +1,118 @@
+import argparse
+import os
+import random
+import time
+import xml.etree.ElementTree as ET
+
+from hierarchy_parser import available_backends, parse_nodes
+
+# python bench_hierarchy_parser.py --synthetic 1000 20000 --repeat 5
+
+SAMPLE_DUMPS = [
+    os.path.join("temp_capture", "capture.xml"),
+    os.path.join("grid_test_output", "test_0_grid.xml"),
+]
+SYNTHETIC_CLASSES = [
+    "android.widget.FrameLayout", "android.widget.LinearLayout", "android.widget.TextView",
+    "android.widget.ImageView", "android.widget.Button", "androidx.recyclerview.widget.RecyclerView",
+]
+
+
+def make_synthetic_dump(num_nodes, seed=0, width=1280, height=2856):
+    """Builds a uiautomator-style dump with `num_nodes` nested nodes, returned as UTF-8 bytes."""
+    rng = random.Random(seed)
+    parts = ["<?xml version='1.0' encoding='UTF-8' standalone='yes' ?><hierarchy rotation=\"0\">"]
+    open_boxes = []
+    for i in range(num_nodes):
+        while open_boxes and (len(open_boxes) > 12 or rng.random() < 0.35):
+            parts.append("</node>")
+            open_boxes.pop()
+        px1, py1, px2, py2 = open_boxes[-1] if open_boxes else (0, 0, width, height)
+        x1 = rng.randint(px1, max(px1, px2 - 2))
+        y1 = rng.randint(py1, max(py1, py2 - 2))
+        x2 = rng.randint(min(x1 + 1, px2), px2)
+        y2 = rng.randint(min(y1 + 1, py2), py2)
+        clickable = "true" if rng.random() < 0.2 else "false"
+        text = f"Item {i}" if rng.random() < 0.3 else ""
+        parts.append(
+            f'<node index="{len(open_boxes)}" text="{text}" resource-id="" class="{rng.choice(SYNTHETIC_CLASSES)}" '
+            f'package="com.example.synthetic" content-desc="" checkable="false" checked="false" '
+            f'clickable="{clickable}" enabled="true" focusable="{clickable}" focused="false" scrollable="false" '
+            f'long-clickable="false" password="false" selected="false" bounds="[{x1},{y1}][{x2},{y2}]" '
+            f'drawing-order="{len(open_boxes) + 1}" hint="">'
+        )
+        open_boxes.append((x1, y1, x2, y2))
+    parts.append("</node>" * len(open_boxes))
+    parts.append("</hierarchy>")
+    return "".join(parts).encode("utf-8")
+
+
+def _legacy_parse(xml_bytes):
+    """The pre-hierarchy_parser approach: iterparse start/end events plus split-based bounds parsing."""
+    import io
+    count = 0
+    for event, elem in ET.iterparse(io.BytesIO(xml_bytes), ["start", "end"]):
+        if event == "start" and elem.tag == "node":
+            bounds = elem.attrib.get("bounds", "[0,0][0,0]")[1:-1].split("][")
+            x1, y1 = map(int, bounds[0].split(","))
+            x2, y2 = map(int, bounds[1].split(","))
+            count += 1
+        elif event == "end":
+            elem.clear()
+    return count
+
+
+def _time_best(func, xml_bytes, repeat):
+    best = float("inf")
+    count = 0
+    for _ in range(repeat):
+        start = time.perf_counter()
+        count = func(xml_bytes)
+        best = min(best, time.perf_counter() - start)
+    return count, best
+
+
+def run_benchmark(dumps, repeat=5):
+    """
+    Times every available backend on each dump and prints nodes/sec.
+
+    Args:
+        dumps (list): (name, xml_bytes) pairs
+        repeat (int): Runs per measurement, the fastest one is reported
+
+    Returns:
+        list: Rows of (dump_name, backend, node_count, seconds, nodes_per_sec)
+    """
+    parsers = {"legacy-iterparse": _legacy_parse}
+    for backend in available_backends():
+        parsers[backend] = lambda data, backend=backend: len(parse_nodes(data, backend))
+
+    results = []
+    print(f"{'dump':<32} {'backend':<18} {'nodes':>8} {'ms':>10} {'nodes/sec':>12}")
+    for name, xml_bytes in dumps:
+        for backend, func in parsers.items():
+            count, seconds = _time_best(func, xml_bytes, repeat)
+            rate = count / seconds if seconds > 0 else float("inf")
+            results.append((name, backend, count, seconds, rate))
+            print(f"{name:<32} {backend:<18} {count:>8} {seconds * 1000:>10.2f} {rate:>12,.0f}")
+    return results
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark UI hierarchy parser backends (nodes/sec).")
+    parser.add_argument("--synthetic", type=int, nargs="*", default=[1000, 10000, 50000],
+                        help="Node counts of the synthetic dumps to generate.")
+    parser.add_argument("--repeat", type=int, default=5, help="Runs per measurement (best is reported).")
+    args = parser.parse_args()
+
+    dumps = []
+    for path in SAMPLE_DUMPS:
+        if os.path.exists(path):
+            with open(path, "rb") as f:
+                dumps.append((path, f.read()))
+        else:
+            print(f"Warning: sample dump not found, skipping: {path}")
+    for num_nodes in args.synthetic:
+        dumps.append((f"synthetic_{num_nodes}", make_synthetic_dump(num_nodes)))
+
+    run_benchmark(dumps, args.repeat)
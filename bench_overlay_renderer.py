@@ -0,0 +1,108 @@
+import argparse
+import os
+import random
+import time
+
+import cv2
+import numpy as np
+
+import overlay_renderer
+from overlay_renderer import draw_labels, get_atlas, putbtext_origin
+from utils import putBText
+
+# python bench_overlay_renderer.py --labels 50 200 500 --repeat 7
+
+SAMPLE_FRAME = os.path.join("temp_capture", "capture.png")
+# The label style of draw_bounding_boxes_on_image
+LABEL_STYLE = dict(font_scale=0.7, thickness=1, vspace=5, hspace=5)
+LABEL_COLORS = ((0, 0, 0), (255, 255, 255)) # BGR (background, text)
+LABEL_ALPHA = 0.8
+
+
+def make_label_layout(num_labels, width, height, seed=0):
+    """Labels "1".."N" at random text offsets that keep every label box on a width x height frame."""
+    rng = random.Random(seed)
+    offsets = [(rng.randint(10, width - 80), rng.randint(30, height - 30)) for _ in range(num_labels)]
+    return [str(i + 1) for i in range(num_labels)], offsets
+
+
+def _putbtext_labels(img, labels, offsets):
+    """The per-label loop the annotator used before overlay_renderer."""
+    bg_color, text_color = LABEL_COLORS
+    for label, (x, y) in zip(labels, offsets):
+        putBText(img, label, text_offset_x=x, text_offset_y=y, vspace=LABEL_STYLE["vspace"],
+                 hspace=LABEL_STYLE["hspace"], font_scale=LABEL_STYLE["font_scale"],
+                 background_RGB=bg_color[::-1], text_RGB=text_color[::-1], font=overlay_renderer.LABEL_FONT,
+                 thickness=LABEL_STYLE["thickness"], alpha=LABEL_ALPHA)
+
+
+def _atlas_labels(img, labels, offsets):
+    atlas = get_atlas(**LABEL_STYLE)
+    origins = [putbtext_origin(x, y, atlas) for x, y in offsets]
+    bg_color, text_color = LABEL_COLORS
+    draw_labels(img, labels, origins, bg_colors=bg_color, text_colors=text_color, alpha=LABEL_ALPHA, atlas=atlas)
+
+
+def _time_best(func, frame, labels, offsets, repeat):
+    best = float("inf")
+    for _ in range(repeat):
+        img = frame.copy()
+        start = time.perf_counter()
+        func(img, labels, offsets)
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def run_benchmark(frame, label_counts, repeat=7):
+    """
+    Times putBText against overlay_renderer.draw_labels for each label count and prints the speedup.
+
+    The "cold" column is draw_labels on a fresh atlas (sprites and blend factors built on first
+    use); "warm" reuses them as consecutive frames do. The largest pixel difference to the
+    putBText output is reported as a correctness check.
+
+    Args:
+        frame (np.ndarray): BGR frame the labels are drawn on (a copy per run)
+        label_counts (list): Numbers of labels to draw
+        repeat (int): Runs per measurement, the fastest one is reported
+
+    Returns:
+        list: Rows of (labels, putbtext_ms, cold_ms, warm_ms, speedup)
+    """
+    height, width = frame.shape[:2]
+    _atlas_labels(frame.copy(), *make_label_layout(1, width, height)) # Library warm-up, not timed
+    results = []
+    print(f"{'labels':>8} {'putBText ms':>12} {'cold ms':>10} {'warm ms':>10} {'speedup':>8} {'max diff':>9}")
+    for count in label_counts:
+        labels, offsets = make_label_layout(count, width, height)
+        overlay_renderer._atlases.clear()
+        cold_img = frame.copy()
+        start = time.perf_counter()
+        _atlas_labels(cold_img, labels, offsets)
+        cold = time.perf_counter() - start
+        warm = _time_best(_atlas_labels, frame, labels, offsets, repeat)
+        baseline = _time_best(_putbtext_labels, frame, labels, offsets, repeat)
+
+        reference = frame.copy()
+        _putbtext_labels(reference, labels, offsets)
+        max_diff = int(np.abs(reference.astype(np.int16) - cold_img).max())
+        speedup = baseline / warm if warm > 0 else float("inf")
+        results.append((count, baseline * 1000, cold * 1000, warm * 1000, speedup))
+        print(f"{count:>8} {baseline * 1000:>12.2f} {cold * 1000:>10.2f} {warm * 1000:>10.2f} "
+              f"{speedup:>7.1f}x {max_diff:>9}")
+    return results
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark cached-sprite label drawing against putBText.")
+    parser.add_argument("--labels", type=int, nargs="*", default=[50, 200, 500],
+                        help="Label counts to draw per frame.")
+    parser.add_argument("--repeat", type=int, default=7, help="Runs per measurement (best is reported).")
+    parser.add_argument("--frame", default=SAMPLE_FRAME, help="Screenshot to draw on.")
+    args = parser.parse_args()
+
+    frame = cv2.imread(args.frame)
+    if frame is None:
+        print(f"Warning: frame not found, using a blank 1280x2856 frame: {args.frame}")
+        frame = np.full((2856, 1280, 3), 200, dtype=np.uint8)
+    run_benchmark(frame, args.labels, args.repeat)
@@ -0,0 +1,183 @@
+import os
+
+import cv2
+import numpy as np
+
+from android_element import draw_element_boxes
+from artifact_writer import encode_settings, write_image
+from grid_overlay import apply_grid
+from point_lattice import get_point_lattice
+from utils import draw_element_labels
+
+# --- Configuration ---
+HIGHLIGHT_COLOR = (0, 0, 255) # BGR outline and fill of highlighted regions (red)
+HIGHLIGHT_THICKNESS = 3 # Outline thickness in pixels
+HIGHLIGHT_FILL_ALPHA = 0.25 # Opacity of the fill inside highlighted regions, 0 for outline only
+
+
+class ElementBoxesLayer:
+    """Element boxes with numbered labels, as draw_bounding_boxes_on_image draws them."""
+
+    def __init__(self, elements):
+        self.elements = elements
+
+    def draw(self, img):
+        draw_element_boxes(img, self.elements)
+
+
+class ElementLabelsLayer:
+    """The e1, e2, ... element labels of utils.draw_bbox_multi."""
+
+    def __init__(self, elements, record_mode=False, dark_mode=False):
+        self.elements = elements
+        self.record_mode = record_mode
+        self.dark_mode = dark_mode
+
+    def draw(self, img):
+        draw_element_labels(img, self.elements, self.record_mode, self.dark_mode)
+
+
+class GridLayer:
+    """The numbered cell grid of test_grid_generator.draw_grid_and_get_info."""
+
+    def __init__(self, rows=10, cols=4, dark_mode=False):
+        self.rows = rows
+        self.cols = cols
+        self.dark_mode = dark_mode
+
+    def draw(self, img):
+        apply_grid(img, self.rows, self.cols, self.dark_mode)
+
+
+class PointsLayer:
+    """The labelled sparse points of test_points.draw_sparse_points_custom_labels."""
+
+    def __init__(self, rows=16, cols=9, primary_rows=(0, 4, 8, 12), point_size=10, label_font_scale=0.7,
+                 label_thickness=2):
+        self.rows = rows
+        self.cols = cols
+        self.primary_rows = primary_rows
+        self.style = (point_size, label_font_scale, label_thickness)
+
+    def draw(self, img):
+        height, width = img.shape[:2]
+        get_point_lattice(width, height, self.rows, self.cols, self.primary_rows).template(*self.style).apply(img)
+
+
+class HighlightLayer:
+    """Outlined, optionally tinted rectangles, e.g. the element or cell about to be tapped."""
+
+    def __init__(self, rects, color=HIGHLIGHT_COLOR, thickness=HIGHLIGHT_THICKNESS, fill_alpha=HIGHLIGHT_FILL_ALPHA):
+        self.rects = rects  # (x1, y1, x2, y2) per region
+        self.color = color
+        self.thickness = thickness
+        self.fill_alpha = fill_alpha
+
+    def draw(self, img):
+        img_h, img_w = img.shape[:2]
+        for x1, y1, x2, y2 in self.rects:
+            if self.fill_alpha > 0:
+                region = img[max(y1, 0):min(y2, img_h), max(x1, 0):min(x2, img_w)]
+                if region.size:
+                    tint = np.empty_like(region)
+                    tint[:] = self.color
+                    cv2.addWeighted(region, 1.0 - self.fill_alpha, tint, self.fill_alpha, 0, dst=region)
+            cv2.rectangle(img, (x1, y1), (x2, y2), self.color, self.thickness)
+
+
+def load_frame(source):
+    """
+    Decodes a frame once: a file path, encoded image bytes (e.g. adb screencap output) or a BGR array.
+
+    Returns:
+        np.ndarray: BGR uint8 frame, or None if it could not be decoded
+    """
+    if isinstance(source, np.ndarray):
+        return source
+    if isinstance(source, (bytes, bytearray, memoryview)):
+        return cv2.imdecode(np.frombuffer(source, dtype=np.uint8), cv2.IMREAD_COLOR)
+    return cv2.imread(source)
+
+
+class Compositor:
+    """
+    Renders any combination of annotation layers over one decoded frame.
+
+    The frame is decoded once and never modified; each view is a copy with its layers drawn
+    in order. write() renders a layer prefix shared by several outputs only once (e.g. boxes
+    for both "boxes" and "boxes + grid") and encodes every output exactly once.
+    """
+
+    def __init__(self, frame):
+        self.frame = load_frame(frame)
+        if self.frame is None or self.frame.size == 0:
+            raise ValueError("Could not decode the frame to composite")
+
+    def render(self, layers):
+        """A copy of the frame with `layers` drawn in order."""
+        img = self.frame.copy()
+        for layer in layers:
+            layer.draw(img)
+        return img
+
+    def encode(self, layers, ext=".png", params=None):
+        """
+        The rendered view encoded in memory, for sending without a disk round trip.
+
+        Raises:
+            ValueError: If OpenCV cannot encode to `ext`
+        """
+        ok, buffer = cv2.imencode(ext, self.render(layers), params or [])
+        if not ok:
+            raise ValueError(f"Could not encode the composited frame as {ext}")
+        return buffer.tobytes()
+
+    def write(self, outputs, background=False):
+        """
+        Renders and writes several views of the frame.
+
+        Args:
+            outputs (list): (path, layers) per view; the extension of path picks the format,
+                unless artifact_writer.ARTIFACT_FORMAT overrides it
+            background (bool): Queue the encodes on artifact_writer's worker pool instead of
+                writing before returning
+
+        Returns:
+            dict: requested path -> path written (or queued), None if it failed or was dropped
+        """
+        outputs = [(path, tuple(layers)) for path, layers in outputs]
+        counts = {}
+        for _, layers in outputs:
+            for i in range(1, len(layers) + 1):
+                counts[layers[:i]] = counts.get(layers[:i], 0) + 1
+        rendered = {(): self.frame} # Layer prefix -> image, kept only for prefixes another output reuses
+
+        results = {}
+        for path, layers in outputs:
+            start = max(i for i in range(len(layers) + 1) if layers[:i] in rendered)
+            img = rendered[layers[:start]].copy()
+            for i in range(start, len(layers)):
+                layers[i].draw(img)
+                if counts[layers[:i + 1]] > 1 and layers[:i + 1] not in rendered:
+                    rendered[layers[:i + 1]] = img.copy()
+            if background:
+                results[path] = write_image(path, img) # img is never drawn on again
+                continue
+            final_path, params = encode_settings(path)
+            results[path] = None
+            try:
+                directory = os.path.dirname(final_path)
+                if directory:
+                    os.makedirs(directory, exist_ok=True)
+                if cv2.imwrite(final_path, img, params):
+                    results[path] = final_path
+                else:
+                    print(f"Error: Could not write composited view {final_path}")
+            except (OSError, cv2.error) as e:
+                print(f"Error: Could not write composited view {final_path}: {e}")
+        return results
+
+
+def compose(frame, outputs, background=False):
+    """Decodes `frame` once and writes every (path, layers) view of it; see Compositor.write."""
+    return Compositor(frame).write(outputs, background)
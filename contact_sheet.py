@@ -0,0 +1,195 @@
+import math
+import os
+
+import cv2
+import numpy as np
+
+from overlay_renderer import draw_labels, get_atlas
+from zoom_grid import parse_zoom_response
+
+# --- Configuration ---
+SHEET_SIZE = (768, 768) # Maximum (width, height) of the sheet; unused rows are trimmed off the bottom
+SHEET_PADDING = 6 # Pixels between tiles and around the sheet
+SHEET_CONTEXT = 0.1 # Context added around each element on every side, as a fraction of its size
+SHEET_MAX_UPSCALE = 3.0 # Small elements are enlarged at most this much
+SHEET_MAX_ELEMENTS = 64 # Candidates beyond this are left off the sheet
+SHEET_BG_COLOR = (40, 40, 40) # BGR sheet background
+SHEET_LABEL_COLORS = ((255, 255, 255), (0, 0, 0)) # BGR (text, background) of the tile labels
+SHEET_OUTPUT_DIR = os.path.join("temp", "contact_sheets") # Where choose_element writes its sheets
+
+SHEET_PROMPT = """The image is a contact sheet: each tile is one element cropped from a phone screenshot,
+with its number printed above it.
+
+Task: pick the element that is {target}.
+
+Answer with a JSON object only:
+{{
+  "found": true or false,
+  "cell_id": <number of the chosen tile>,
+  "reasoning": "<one short sentence>"
+}}"""
+
+
+class ContactSheet:
+    """A tiled sheet of element crops and the mapping from printed tile numbers back to elements."""
+
+    def __init__(self, image, elements, tiles, sources):
+        self.image = image        # (height, width, 3) BGR sheet
+        self.elements = elements  # {label: element}, labels "1", "2", ... in input order
+        self.tiles = tiles        # {label: (x1, y1, x2, y2)} of the crop on the sheet
+        self.sources = sources    # {label: (x1, y1, x2, y2)} of the crop in the frame
+
+    def __repr__(self):
+        return f"ContactSheet({self.image.shape[1]}x{self.image.shape[0]}, tiles={len(self.tiles)})"
+
+    def __len__(self):
+        return len(self.elements)
+
+    def element(self, label):
+        """Element shown under a printed tile number; raises ValueError for unknown labels."""
+        element = self.elements.get(str(label).strip())
+        if element is None:
+            raise ValueError(f"Contact sheet has no tile '{label}'")
+        return element
+
+    def tap_point(self, label):
+        """Center of the element's bounds in frame pixels."""
+        (x1, y1), (x2, y2) = self.element(label).bbox
+        return (x1 + x2) // 2, (y1 + y2) // 2
+
+
+def _crop_region(bbox, context, frame_width, frame_height):
+    """Element bounds grown by `context` of their size on each side and clipped to the frame."""
+    (x1, y1), (x2, y2) = bbox
+    dx, dy = int(round((x2 - x1) * context)), int(round((y2 - y1) * context))
+    return (max(x1 - dx, 0), max(y1 - dy, 0), min(x2 + dx, frame_width), min(y2 + dy, frame_height))
+
+
+def _layout(sizes, sheet_size, padding, label_height, max_upscale):
+    """
+    Picks the column count whose uniform cells show the most crop area.
+
+    Returns:
+        tuple: (cols, cell_width, cell_height, scales) with one fit scale per crop
+    """
+    width, height = sheet_size
+    sizes = np.asarray(sizes, dtype=np.float64).reshape(-1, 2)
+    best = None
+    for cols in range(1, len(sizes) + 1):
+        rows = math.ceil(len(sizes) / cols)
+        cell_width = (width - padding * (cols + 1)) // cols
+        cell_height = (height - padding * (rows + 1)) // rows - label_height
+        if cell_width < 1 or cell_height < 1:
+            continue
+        scales = np.minimum(np.minimum(cell_width / sizes[:, 0], cell_height / sizes[:, 1]), max_upscale)
+        shown = float((sizes.prod(axis=1) * scales ** 2).sum())
+        if best is None or shown > best[0]:
+            best = (shown, cols, cell_width, cell_height, scales)
+    if best is None:
+        raise ValueError(f"{len(sizes)} tiles do not fit a {width}x{height} sheet")
+    return best[1:]
+
+
+def compose_contact_sheet(frame, elements, sheet_size=SHEET_SIZE, context=SHEET_CONTEXT,
+                          padding=SHEET_PADDING, max_upscale=SHEET_MAX_UPSCALE):
+    """
+    Tiles the candidate elements of one frame into a single labelled image.
+
+    Each element (plus `context`) is taken as a numpy view of the frame and resized straight
+    into its tile of the sheet, so no intermediate crops are copied. The column count is the
+    one that shows the most crop area at `sheet_size`; tiles keep their aspect ratio and
+    carry their number in a band above them.
+
+    Args:
+        frame (np.ndarray): BGR screenshot
+        elements (list): Elements with a .bbox ((x1, y1), (x2, y2)), e.g. from traverse_xml_tree
+        sheet_size (tuple): Maximum (width, height) of the sheet
+        context (float): Margin around each element, fraction of its size per side
+        padding (int): Pixels between tiles
+        max_upscale (float): Largest enlargement of a small element
+
+    Returns:
+        ContactSheet: image plus label -> element mapping, or None if no element is on screen
+
+    Raises:
+        ValueError: If the elements cannot fit the sheet at one pixel per tile
+    """
+    frame_height, frame_width = frame.shape[:2]
+    candidates = []
+    for elem in elements[:SHEET_MAX_ELEMENTS]:
+        region = _crop_region(elem.bbox, context, frame_width, frame_height)
+        if region[2] > region[0] and region[3] > region[1]:
+            candidates.append((elem, region))
+    if not candidates:
+        return None
+
+    atlas = get_atlas(font_scale=0.6, thickness=1, vspace=3, hspace=4)
+    label_height = atlas.size("0")[1]
+    sizes = [(x2 - x1, y2 - y1) for _, (x1, y1, x2, y2) in candidates]
+    cols, cell_width, cell_height, scales = _layout(sizes, sheet_size, padding, label_height, max_upscale)
+    rows = math.ceil(len(candidates) / cols)
+    sheet_height = padding + rows * (cell_height + label_height + padding)
+    sheet = np.empty((min(sheet_height, sheet_size[1]), sheet_size[0], 3), dtype=np.uint8)
+    sheet[:] = SHEET_BG_COLOR
+
+    elements_by_label, tiles, sources, labels, origins = {}, {}, {}, [], []
+    for index, ((elem, region), (width, height), scale) in enumerate(zip(candidates, sizes, scales.tolist())):
+        label = str(index + 1)
+        row, col = divmod(index, cols)
+        cell_x = padding + col * (cell_width + padding)
+        cell_y = padding + row * (cell_height + label_height + padding)
+        tile_width, tile_height = max(int(width * scale), 1), max(int(height * scale), 1)
+        tile_x = cell_x + (cell_width - tile_width) // 2
+        tile_y = cell_y + label_height
+        x1, y1, x2, y2 = region
+        cv2.resize(frame[y1:y2, x1:x2], (tile_width, tile_height),
+                   dst=sheet[tile_y:tile_y + tile_height, tile_x:tile_x + tile_width],
+                   interpolation=cv2.INTER_AREA if scale < 1 else cv2.INTER_CUBIC)
+        elements_by_label[label] = elem
+        tiles[label] = (tile_x, tile_y, tile_x + tile_width, tile_y + tile_height)
+        sources[label] = region
+        labels.append(label)
+        origins.append((tile_x, cell_y))
+    text_color, bg_color = SHEET_LABEL_COLORS
+    draw_labels(sheet, labels, origins, bg_colors=bg_color, text_colors=text_color, alpha=0.0, atlas=atlas)
+    return ContactSheet(sheet, elements_by_label, tiles, sources)
+
+
+def choose_element(llm, frame_path, elements, target, sheet_size=SHEET_SIZE, output_dir=SHEET_OUTPUT_DIR):
+    """
+    Asks the model to pick `target` among the candidate elements, shown as one contact sheet.
+
+    Args:
+        llm: Model with get_model_response(prompt, image_paths) -> (ok, text), e.g. test.BaseModel
+        frame_path (str): Full-resolution screenshot the element bounds refer to
+        elements (list): Candidate elements, e.g. from traverse_xml_tree
+        target (str): What to pick, e.g. "the Google Play Store app icon"
+        sheet_size (tuple): Maximum (width, height) of the sheet sent
+        output_dir (str): Where the sheet image is written
+
+    Returns:
+        tuple: (element or None, ContactSheet or None); the element is None if the model
+            failed, answered with an unknown tile or did not find the target
+    """
+    frame = cv2.imread(frame_path)
+    if frame is None:
+        print(f"Error: Could not read image from {frame_path}")
+        return None, None
+    sheet = compose_contact_sheet(frame, elements, sheet_size)
+    if sheet is None:
+        print(f"Error: None of the {len(elements)} elements lies on the screenshot")
+        return None, None
+    os.makedirs(output_dir, exist_ok=True)
+    sheet_path = os.path.join(output_dir, f"{os.path.splitext(os.path.basename(frame_path))[0]}_sheet.png")
+    cv2.imwrite(sheet_path, sheet.image)
+
+    ok, response = llm.get_model_response(SHEET_PROMPT.format(target=target), [sheet_path])
+    if not ok:
+        print(f"Error: Model request failed for the contact sheet: {response}")
+        return None, sheet
+    try:
+        label = parse_zoom_response(response) # Same {"found", "cell_id", "reasoning"} answer format
+        return (sheet.element(label) if label is not None else None), sheet
+    except ValueError as e:
+        print(f"Error: Unusable answer for the contact sheet: {e}\n{response}")
+        return None, sheet
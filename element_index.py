@@ -0,0 +1,163 @@
+import numpy as np
+
+from ui_tree import UiTree
+
+# --- Configuration ---
+FUZZY_MIN_SCORE = 0.4 # Minimum trigram similarity (Dice coefficient) for fuzzy matches
+TEXT_FIELDS = ("text", "content-desc") # String columns covered by the trigram index
+
+_NO_ROWS = np.empty(0, dtype=np.int64)
+
+
+def _trigrams(value, padded=True):
+    """Set of lowercase character trigrams; padding lets short strings and word starts match."""
+    value = value.lower()
+    if padded:
+        value = f"  {value} "
+    return {value[i:i + 3] for i in range(len(value) - 2)}
+
+
+class ElementIndex:
+    """
+    Lookup structures over one UiTree snapshot, built once and reused for every query.
+
+    Exact lookups are dict hits on the interned string tables; fuzzy and
+    case-insensitive searches over text / content-desc go through a trigram index.
+    All lookups return row arrays of the tree, in document order unless stated otherwise.
+    """
+
+    def __init__(self, tree):
+        self.tree = tree
+        self._rows = {name: self._rows_by_code(column) for name, column in tree.strings.items()}
+        self._simple_class = {}
+        for code, name in enumerate(tree.strings["class"].table):
+            if name:
+                self._simple_class.setdefault(name.rsplit(".", 1)[-1], []).append(code)
+        self._lower = {}
+        self._grams = {}
+        self._gram_counts = {}
+        for field in TEXT_FIELDS:
+            lower, grams, gram_counts = {}, {}, {}
+            for code, value in enumerate(tree.strings[field].table):
+                if not value:
+                    continue
+                lower.setdefault(value.lower(), []).append(code)
+                value_grams = _trigrams(value)
+                gram_counts[code] = len(value_grams)
+                for gram in value_grams:
+                    grams.setdefault(gram, []).append(code)
+            self._lower[field] = lower
+            self._grams[field] = grams
+            self._gram_counts[field] = gram_counts
+
+    @classmethod
+    def for_tree(cls, tree):
+        """Returns the index of `tree`, building it on the first call for that snapshot."""
+        return tree.cached("element_index", cls)
+
+    @staticmethod
+    def _rows_by_code(column):
+        order = np.argsort(column.codes, kind="stable")
+        codes = column.codes[order]
+        starts = np.flatnonzero(np.r_[True, codes[1:] != codes[:-1]]) if len(codes) else _NO_ROWS
+        groups = np.split(order, starts[1:])
+        return {int(codes[start]): rows for start, rows in zip(starts.tolist(), groups)}
+
+    def _rows_for_codes(self, field, codes):
+        groups = [self._rows[field][code] for code in codes if code in self._rows[field]]
+        if not groups:
+            return _NO_ROWS
+        return groups[0] if len(groups) == 1 else np.sort(np.concatenate(groups))
+
+    # --- Exact lookups ---
+
+    def by_value(self, field, value, ignore_case=False):
+        """Rows whose string attribute `field` equals `value`."""
+        if ignore_case and field in self._lower:
+            return self._rows_for_codes(field, self._lower[field].get(value.lower(), ()))
+        code = self.tree.strings[field].code_of(value)
+        return self._rows[field].get(code, _NO_ROWS) if code >= 0 else _NO_ROWS
+
+    def by_resource_id(self, resource_id):
+        """Rows with this resource-id; a bare name ("search_box") also matches "pkg:id/search_box"."""
+        rows = self.by_value("resource-id", resource_id)
+        if len(rows) or "/" in resource_id:
+            return rows
+        suffix = "/" + resource_id
+        codes = [code for code, value in enumerate(self.tree.strings["resource-id"].table) if value.endswith(suffix)]
+        return self._rows_for_codes("resource-id", codes)
+
+    def by_class(self, class_name):
+        """Rows with this class; a simple name ("Button") matches any package."""
+        if "." in class_name:
+            return self.by_value("class", class_name)
+        return self._rows_for_codes("class", self._simple_class.get(class_name, ()))
+
+    def by_text(self, text, ignore_case=False):
+        """Rows whose text equals `text`."""
+        return self.by_value("text", text, ignore_case)
+
+    def by_desc(self, desc, ignore_case=False):
+        """Rows whose content-desc equals `desc`."""
+        return self.by_value("content-desc", desc, ignore_case)
+
+    # --- Trigram searches ---
+
+    def contains(self, query, fields=TEXT_FIELDS):
+        """Rows whose text / content-desc contains `query`, case-insensitive."""
+        needle = query.lower()
+        found = []
+        for field in fields:
+            table = self.tree.strings[field].table
+            if len(needle) >= 3:
+                grams = sorted(_trigrams(needle, padded=False), key=lambda g: len(self._grams[field].get(g, ())))
+                candidates = set(self._grams[field].get(grams[0], ()))
+                for gram in grams[1:]:
+                    if not candidates:
+                        break
+                    candidates.intersection_update(self._grams[field].get(gram, ()))
+            else:
+                candidates = range(1, len(table))
+            codes = [code for code in candidates if needle in table[code].lower()]
+            found.append(self._rows_for_codes(field, codes))
+        return np.unique(np.concatenate(found)) if found else _NO_ROWS
+
+    def fuzzy(self, query, fields=TEXT_FIELDS, min_score=FUZZY_MIN_SCORE, limit=None):
+        """
+        Approximate text / content-desc search ranked by trigram similarity.
+
+        Args:
+            query (str): Text to look for, case-insensitive
+            fields (tuple): String columns to search, subset of TEXT_FIELDS
+            min_score (float): Minimum Dice coefficient (0..1) to report a match
+            limit (int): Maximum number of results
+
+        Returns:
+            list: (row, score) tuples, best score first
+        """
+        query_grams = _trigrams(query)
+        best = {}
+        for field in fields:
+            counts = {}
+            for gram in query_grams:
+                for code in self._grams[field].get(gram, ()):
+                    counts[code] = counts.get(code, 0) + 1
+            gram_counts = self._gram_counts[field]
+            for code, shared in counts.items():
+                score = 2.0 * shared / (len(query_grams) + gram_counts[code])
+                if score < min_score:
+                    continue
+                for row in self._rows[field].get(code, _NO_ROWS).tolist():
+                    if score > best.get(row, 0.0):
+                        best[row] = score
+        ranked = sorted(best.items(), key=lambda item: (-item[1], item[0]))
+        return ranked[:limit] if limit is not None else ranked
+
+    def elements(self, rows, attrib_name="clickable"):
+        """AndroidElement views for `rows`."""
+        return self.tree.elements(rows, attrib_name)
+
+
+def build_element_index(source, backend=None):
+    """Parses a dump (path or bytes) and returns the ElementIndex of its snapshot."""
+    return ElementIndex.for_tree(UiTree.from_xml(source, backend))
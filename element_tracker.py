@@ -0,0 +1,255 @@
+import numpy as np
+
+try:
+    from scipy.optimize import linear_sum_assignment # Optional, faster on large screens: pip install scipy
+except ImportError:
+    linear_sum_assignment = None
+
+# --- Configuration ---
+UID_MISMATCH_COST = 0.6 # Added when the AppAgent-style structural ids differ
+TEXT_MISMATCH_COST = 0.5 # Added when text / content-desc differ
+IOU_WEIGHT = 1.0 # Cost weight of (1 - IoU) after compensating the global scroll shift
+POSITION_WEIGHT = 2.0 # Cost weight of the center distance, relative to the screen diagonal
+MAX_MATCH_COST = 1.5 # Pairs above this cost are never matched
+MAX_TRACK_AGE = 2 # Frames a lost element is remembered, so brief occlusions keep their id
+
+
+def solve_assignment(cost):
+    """
+    Minimum-cost assignment for a rectangular cost matrix (Hungarian algorithm).
+
+    Returns:
+        tuple: (row_indices, col_indices) of the optimal pairs, like scipy's linear_sum_assignment
+    """
+    cost = np.asarray(cost, dtype=float)
+    if cost.size == 0:
+        return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.int64)
+    if linear_sum_assignment is not None:
+        return linear_sum_assignment(cost)
+    transposed = cost.shape[0] > cost.shape[1]
+    if transposed:
+        cost = cost.T
+    n, m = cost.shape
+    u = np.zeros(n + 1)
+    v = np.zeros(m + 1)
+    match = np.zeros(m + 1, dtype=np.int64) # match[j] = 1-based row assigned to column j
+    way = np.zeros(m + 1, dtype=np.int64)
+    for i in range(1, n + 1):
+        match[0] = i
+        j0 = 0
+        min_v = np.full(m + 1, np.inf)
+        used = np.zeros(m + 1, dtype=bool)
+        while True:
+            used[j0] = True
+            i0 = match[j0]
+            free = ~used[1:]
+            reduced = cost[i0 - 1] - u[i0] - v[1:]
+            better = free & (reduced < min_v[1:])
+            min_v[1:][better] = reduced[better]
+            way[1:][better] = j0
+            candidates = np.where(free, min_v[1:], np.inf)
+            j1 = int(candidates.argmin()) + 1
+            delta = candidates[j1 - 1]
+            u[match[used]] += delta
+            v[used] -= delta
+            min_v[1:][free] -= delta
+            j0 = j1
+            if match[j0] == 0:
+                break
+        while j0:
+            j1 = way[j0]
+            match[j0] = match[j1]
+            j0 = j1
+    cols = np.flatnonzero(match[1:]) # Columns that received a row
+    rows = match[1:][cols] - 1
+    if transposed:
+        rows, cols = cols, rows
+    order = np.argsort(rows)
+    return rows[order], cols[order]
+
+
+def _gated_components(admissible):
+    """
+    Splits the admissible (track, row) pairs into independent sub-problems.
+
+    Tracks and rows are linked when their pair passes the gate; each connected component can
+    be solved on its own, and tracks or rows with no admissible pair never reach the solver.
+
+    Returns:
+        list: (track_indices, row_indices) per component with at least one admissible pair
+    """
+    track_idx, row_idx = np.nonzero(admissible)
+    n_tracks = admissible.shape[0]
+    root = list(range(n_tracks + admissible.shape[1])) # Union-find over tracks, then rows
+
+    def find(node):
+        while root[node] != node:
+            root[node] = root[root[node]]
+            node = root[node]
+        return node
+
+    for t, r in zip(track_idx.tolist(), row_idx.tolist()):
+        a, b = find(t), find(n_tracks + r)
+        if a != b:
+            root[b] = a
+    components = {}
+    for node in sorted(set(track_idx.tolist()) | {n_tracks + r for r in row_idx.tolist()}):
+        tracks, rows = components.setdefault(find(node), ([], []))
+        if node < n_tracks:
+            tracks.append(node)
+        else:
+            rows.append(node - n_tracks)
+    return [(np.array(tracks), np.array(rows)) for tracks, rows in components.values()]
+
+
+def _iou(a, b):
+    """Pairwise IoU between (P, 4) and (Q, 4) boxes."""
+    ix = np.clip(np.minimum(a[:, None, 2], b[None, :, 2]) - np.maximum(a[:, None, 0], b[None, :, 0]), 0, None)
+    iy = np.clip(np.minimum(a[:, None, 3], b[None, :, 3]) - np.maximum(a[:, None, 1], b[None, :, 1]), 0, None)
+    inter = ix * iy
+    area_a = (a[:, 2] - a[:, 0]) * (a[:, 3] - a[:, 1])
+    area_b = (b[:, 2] - b[:, 0]) * (b[:, 3] - b[:, 1])
+    union = area_a[:, None] + area_b[None, :] - inter
+    return np.where(union > 0, inter / np.maximum(union, 1), 0.0)
+
+
+class _Track:
+    __slots__ = ("track_id", "uid", "cls", "label", "bounds", "age", "cache")
+
+    def __init__(self, track_id, uid, cls, label, bounds):
+        self.track_id = track_id
+        self.uid = uid
+        self.cls = cls
+        self.label = label
+        self.bounds = bounds
+        self.age = 0
+        self.cache = {}
+
+
+class ElementTracker:
+    """
+    Gives UI elements persistent ids across consecutive UiTree snapshots.
+
+    Each update matches the live tracks to the new rows with an optimal assignment over a
+    cost built from the structural id, text, IoU and center distance. Scrolling is handled
+    by first estimating the global shift from elements whose structural id is unique in
+    both frames. Elements of different classes or packages never match.
+
+    Per-element caches (crops, descriptions, past model decisions) live in cache(track_id)
+    and survive as long as the element keeps being matched.
+    """
+
+    def __init__(self, max_track_age=MAX_TRACK_AGE):
+        self.max_track_age = max_track_age
+        self._tracks = {} # track_id -> _Track, oldest first
+        self._next_id = 1
+
+    def _row_features(self, tree, rows):
+        uids = [tree.uids[row] for row in rows]
+        classes = [(tree.strings["class"][row], tree.strings["package"][row]) for row in rows]
+        labels = [(tree.strings["text"][row], tree.strings["content-desc"][row]) for row in rows]
+        return uids, classes, labels, tree.bounds[rows].astype(np.float64)
+
+    @staticmethod
+    def _estimate_shift(tracks, uids, bounds):
+        """Median (dx, dy) of elements with a structural id unique in both frames."""
+        previous = {}
+        for track in tracks:
+            previous[track.uid] = None if track.uid in previous else track # None marks a repeated id
+        current = {}
+        for i, uid in enumerate(uids):
+            current[uid] = None if uid in current else i
+        shifts = []
+        for uid, track in previous.items():
+            i = current.get(uid)
+            if track is not None and i is not None:
+                shifts.append(bounds[i, :2] - track.bounds[:2])
+        return np.median(shifts, axis=0) if shifts else np.zeros(2)
+
+    def _cost_matrix(self, tree, tracks, uids, classes, labels, bounds):
+        if not tracks or not len(bounds):
+            return np.empty((len(tracks), len(bounds)))
+        shift = self._estimate_shift(tracks, uids, bounds)
+        previous = np.array([track.bounds for track in tracks], dtype=np.float64)
+        previous[:, [0, 2]] += shift[0]
+        previous[:, [1, 3]] += shift[1]
+
+        width, height = np.ptp(tree.bounds[:, [0, 2]]), np.ptp(tree.bounds[:, [1, 3]])
+        diagonal = max(float(np.hypot(width, height)), 1.0)
+        prev_centers = (previous[:, :2] + previous[:, 2:]) / 2
+        centers = (bounds[:, :2] + bounds[:, 2:]) / 2
+        distance = np.linalg.norm(prev_centers[:, None, :] - centers[None, :, :], axis=2) / diagonal
+
+        cost = IOU_WEIGHT * (1.0 - _iou(previous, bounds)) + POSITION_WEIGHT * distance
+        track_uids = np.array([track.uid for track in tracks], dtype=object)
+        cost += UID_MISMATCH_COST * (track_uids[:, None] != np.array(uids, dtype=object)[None, :])
+        track_labels = np.array([hash(track.label) for track in tracks])
+        cost += TEXT_MISMATCH_COST * (track_labels[:, None] != np.array([hash(l) for l in labels])[None, :])
+        class_codes = {}
+        track_classes = np.array([class_codes.setdefault(track.cls, len(class_codes)) for track in tracks])
+        row_classes = np.array([class_codes.setdefault(cls, len(class_codes)) for cls in classes])
+        cost[track_classes[:, None] != row_classes[None, :]] = np.inf
+        return cost
+
+    def update(self, tree, rows=None):
+        """
+        Matches a new snapshot against the live tracks.
+
+        Args:
+            tree (UiTree): Current snapshot
+            rows: Rows to track (mask or indices), defaults to every row with valid bounds
+
+        Returns:
+            np.ndarray: Persistent track id for each tracked row, aligned with `rows`
+        """
+        if rows is None:
+            rows = tree.valid()
+        rows = np.asarray(rows)
+        if rows.dtype == bool:
+            rows = np.flatnonzero(rows)
+        uids, classes, labels, bounds = self._row_features(tree, rows)
+
+        tracks = list(self._tracks.values())
+        cost = self._cost_matrix(tree, tracks, uids, classes, labels, bounds)
+        admissible = np.isfinite(cost) & (cost <= MAX_MATCH_COST)
+        gated = np.where(admissible, cost, MAX_MATCH_COST * 10)
+        pairs = []
+        # The class / cost gate leaves small independent groups, so the O(n^3) solver only sees those
+        for track_group, row_group in _gated_components(admissible):
+            track_idx, row_idx = solve_assignment(gated[np.ix_(track_group, row_group)])
+            pairs.extend(zip(track_group[track_idx].tolist(), row_group[row_idx].tolist()))
+
+        ids = np.zeros(len(rows), dtype=np.int64)
+        for t, r in pairs:
+            if not admissible[t, r]:
+                continue
+            track = tracks[t]
+            track.uid, track.label, track.bounds, track.age = uids[r], labels[r], bounds[r], -1
+            ids[r] = track.track_id
+
+        for track in tracks:
+            track.age += 1 # Matched tracks go back to 0
+            if track.age > self.max_track_age:
+                del self._tracks[track.track_id]
+        for r in np.flatnonzero(ids == 0).tolist():
+            track = _Track(self._next_id, uids[r], classes[r], labels[r], bounds[r])
+            self._tracks[track.track_id] = track
+            self._next_id += 1
+            ids[r] = track.track_id
+        return ids
+
+    def cache(self, track_id):
+        """
+        Per-element dict that persists while the element keeps its id.
+
+        Raises:
+            KeyError: If no live track has this id (never issued, or forgotten after MAX_TRACK_AGE frames)
+        """
+        track = self._tracks.get(track_id)
+        if track is None:
+            raise KeyError(f"Unknown or expired track id {track_id}")
+        return track.cache
+
+    def live_ids(self):
+        """Ids of the tracks currently remembered (matched or briefly lost)."""
+        return list(self._tracks)
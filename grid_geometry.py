@@ -0,0 +1,202 @@
+import json
+import os
+
+import numpy as np
+
+from packed_format import PACKED_EXTENSION, open_packed
+
+# --- Configuration ---
+# Named tap points of a grid cell, in the order of the last axis of GridGeometry.points
+POINT_NAMES = ("center", "top_left_quadrant", "top_right_quadrant", "bottom_left_quadrant", "bottom_right_quadrant",
+               "top_left_corner", "top_right_corner", "bottom_left_corner", "bottom_right_corner")
+GEOMETRY_CACHE_SIZE = 32 # Geometries (screen size / grid combinations or JSON files) kept in memory
+
+_POINT_INDEX = {name: i for i, name in enumerate(POINT_NAMES)}
+# Names used by the grid JSON ("quadrant_centers_px" keys) resolve to the same points
+_POINT_INDEX.update({name[:-len("_quadrant")]: i for name, i in _POINT_INDEX.items() if name.endswith("_quadrant")})
+_QUADRANTS = ("top_left", "top_right", "bottom_left", "bottom_right")
+
+
+def point_index(point_name):
+    """Index of a named point in POINT_NAMES; accepts any case and spaces for underscores."""
+    index = _POINT_INDEX.get(point_name.strip().lower().replace(" ", "_"))
+    if index is None:
+        raise ValueError(f"Unknown point name '{point_name}', expected one of {', '.join(POINT_NAMES)}")
+    return index
+
+
+class GridGeometry:
+    """
+    Every cell bound and named tap point of a rows x cols screen grid as numpy arrays.
+
+    Cell ids are 1-based in row-major order, as numbered on the gridded screenshot, so a
+    (cell_id, point_name) lookup is a divmod and an array index.
+    """
+
+    def __init__(self, width, height, rows, cols, bounds, points):
+        self.width = width
+        self.height = height
+        self.rows = rows
+        self.cols = cols
+        self.bounds = bounds  # (rows, cols, 4) int32 x1, y1, x2, y2
+        self.points = points  # (rows, cols, 9, 2) int32 x, y per POINT_NAMES entry
+
+    def __repr__(self):
+        return f"GridGeometry({self.width}x{self.height}, {self.rows}x{self.cols})"
+
+    def __len__(self):
+        return self.rows * self.cols
+
+    @classmethod
+    def from_size(cls, width, height, rows, cols):
+        """Computes the grid the way test_grid_generator.draw_grid_and_get_info always has."""
+        cell_width, cell_height = width / cols, height / rows
+        x1 = np.arange(cols) * cell_width
+        y1 = np.arange(rows) * cell_height
+        x1_int, y1_int = np.round(x1).astype(np.int32), np.round(y1).astype(np.int32)
+        x2_int = np.maximum(x1_int + 1, np.round(x1 + cell_width).astype(np.int32))
+        y2_int = np.maximum(y1_int + 1, np.round(y1 + cell_height).astype(np.int32))
+
+        bounds = np.empty((rows, cols, 4), dtype=np.int32)
+        bounds[..., 0], bounds[..., 1] = x1_int[None, :], y1_int[:, None]
+        bounds[..., 2], bounds[..., 3] = x2_int[None, :], y2_int[:, None]
+
+        # (fraction of the cell width, fraction of the cell height) of the center and quadrant centers
+        fractions = np.array([(0.5, 0.5), (0.25, 0.25), (0.75, 0.25), (0.25, 0.75), (0.75, 0.75)])
+        points = np.empty((rows, cols, len(POINT_NAMES), 2), dtype=np.int32)
+        points[:, :, :5, 0] = np.round(x1[None, :, None] + cell_width * fractions[:, 0]).astype(np.int32)
+        points[:, :, :5, 1] = np.round(y1[:, None, None] + cell_height * fractions[:, 1]).astype(np.int32)
+        cls._corners(bounds, points)
+        return cls(width, height, rows, cols, bounds, points)
+
+    @classmethod
+    def from_cell_info(cls, cells):
+        """
+        Builds the geometry from the cell dicts of a grid info JSON.
+
+        Raises:
+            ValueError: If the cells do not form a complete row-major grid
+        """
+        if not cells:
+            raise ValueError("Grid info holds no cells")
+        try:
+            cells = sorted(cells, key=lambda cell: cell["cell_id"])
+            all_bounds = np.array([cell["bounds_px"] for cell in cells], dtype=np.int32).reshape(len(cells), 4)
+            centers = [cell["center_px"] for cell in cells]
+            quadrants = [[cell["quadrant_centers_px"][quadrant] for cell in cells] for quadrant in _QUADRANTS]
+        except (KeyError, TypeError) as e:
+            raise ValueError(f"Grid info cell is missing or malformed: {e}") from e
+        cols = len(np.unique(all_bounds[:, 0]))
+        rows = len(cells) // cols
+        if rows * cols != len(cells) or [cell["cell_id"] for cell in cells] != list(range(1, len(cells) + 1)):
+            raise ValueError(f"Grid info with {len(cells)} cells is not a complete grid of {cols} columns")
+        points = np.empty((len(cells), len(POINT_NAMES), 2), dtype=np.int32)
+        points[:, 0] = centers
+        for i, quadrant_points in enumerate(quadrants, start=1):
+            points[:, i] = quadrant_points
+        bounds = all_bounds.reshape(rows, cols, 4)
+        points = points.reshape(rows, cols, len(POINT_NAMES), 2)
+        cls._corners(bounds, points)
+        return cls(int(all_bounds[:, 2].max()), int(all_bounds[:, 3].max()), rows, cols, bounds, points)
+
+    @classmethod
+    def from_packed(cls, packed):
+        """
+        Builds the geometry from an opened packed_format "grid" file (see packed_meta.pack_grid).
+
+        Raises:
+            ValueError: If the file holds another kind of metadata
+        """
+        packed.expect("grid")
+        width, height, rows, cols = packed.column("size").tolist()
+        bounds = np.array(packed.column("bounds")).reshape(rows, cols, 4)
+        points = np.empty((rows, cols, len(POINT_NAMES), 2), dtype=np.int32)
+        points[:, :, :5] = packed.column("points").reshape(rows, cols, 5, 2)
+        cls._corners(bounds, points)
+        return cls(width, height, rows, cols, bounds, points)
+
+    @staticmethod
+    def _corners(bounds, points):
+        """Fills the four corner points from the bounds (x2 / y2 used as given, like the JSON consumers)."""
+        for i, (x, y) in enumerate(((0, 1), (2, 1), (0, 3), (2, 3)), start=5):
+            points[:, :, i, 0], points[:, :, i, 1] = bounds[..., x], bounds[..., y]
+
+    def cell_position(self, cell_id):
+        """(row, col) of a 1-based cell id."""
+        cell_id = int(cell_id)
+        if not 1 <= cell_id <= len(self):
+            raise ValueError(f"Cell id {cell_id} is outside the {self.rows}x{self.cols} grid")
+        return divmod(cell_id - 1, self.cols)
+
+    def point(self, cell_id, point_name="center"):
+        """(x, y) of a named point of a cell."""
+        row, col = self.cell_position(cell_id)
+        x, y = self.points[row, col, point_index(point_name)].tolist()
+        return x, y
+
+    def cell_bounds(self, cell_id):
+        """(x1, y1, x2, y2) of a cell."""
+        row, col = self.cell_position(cell_id)
+        return tuple(self.bounds[row, col].tolist())
+
+    def cell_at(self, x, y):
+        """1-based id of the cell containing pixel (x, y), or None outside the grid."""
+        col = int(np.searchsorted(self.bounds[0, :, 2], x, side="right"))
+        row = int(np.searchsorted(self.bounds[:, 0, 3], y, side="right"))
+        if x < 0 or y < 0 or row >= self.rows or col >= self.cols:
+            return None
+        return row * self.cols + col + 1
+
+    def to_cell_info(self):
+        """The per-cell dicts of the grid info JSON (cell_id, bounds_px, center_px, quadrant_centers_px)."""
+        bounds = self.bounds.reshape(-1, 4).tolist()
+        points = self.points.reshape(len(self), len(POINT_NAMES), 2).tolist()
+        return [{
+            "cell_id": i + 1,
+            "bounds_px": bounds[i],
+            "center_px": points[i][0],
+            "quadrant_centers_px": {quadrant: points[i][j] for j, quadrant in enumerate(_QUADRANTS, start=1)},
+        } for i in range(len(self))]
+
+    def save_json(self, path):
+        """Writes the grid info JSON in the format draw_grid_and_get_info has always produced."""
+        with open(path, "w") as f_json:
+            json.dump(self.to_cell_info(), f_json, indent=4)
+
+
+_geometries = {}
+
+
+def _memoized(key, factory):
+    geometry = _geometries.get(key)
+    if geometry is None:
+        if len(_geometries) >= GEOMETRY_CACHE_SIZE:
+            _geometries.pop(next(iter(_geometries)))
+        geometry = _geometries[key] = factory()
+    return geometry
+
+
+def get_grid_geometry(width, height, rows, cols):
+    """Returns the shared GridGeometry for a screen size and grid, computing it on first use."""
+    key = (int(width), int(height), int(rows), int(cols))
+    return _memoized(key, lambda: GridGeometry.from_size(*key))
+
+
+def load_grid_geometry(json_path):
+    """
+    Loads a grid info JSON (or its packed_meta ".pmeta" form) as a GridGeometry, reparsing
+    only when the file changes.
+
+    Raises:
+        OSError: If the file cannot be read
+        ValueError: If it is not valid JSON / packed metadata or not a complete grid
+    """
+    stat = os.stat(json_path)
+    key = (os.path.abspath(json_path), stat.st_mtime_ns, stat.st_size)
+
+    def load():
+        if json_path.endswith(PACKED_EXTENSION):
+            return GridGeometry.from_packed(open_packed(json_path))
+        with open(json_path, "r") as f:
+            return GridGeometry.from_cell_info(json.load(f))
+    return _memoized(key, load)
@@ -0,0 +1,172 @@
+import os
+
+import cv2
+import numpy as np
+
+# --- Configuration ---
+GRID_TEMPLATE_DIR = None # Directory for an on-disk template cache shared across runs (e.g. "temp/grid_templates"), None for memory only
+GRID_CACHE_SIZE = 8 # Templates kept in memory; one per resolution / grid / theme used in a session
+GRID_LABEL_FONT = cv2.FONT_HERSHEY_SIMPLEX
+
+
+def grid_colors(dark_mode):
+    """(line_color, text_color, text_bg_color) in BGR for the theme."""
+    if dark_mode:
+        return (200, 200, 200), (255, 255, 255), (50, 50, 50)
+    return (50, 50, 50), (0, 0, 0), (220, 220, 220)
+
+
+def render_grid_overlay(width, height, rows, cols, dark_mode=False):
+    """
+    Rasterizes the grid lines and cell labels of test_grid_generator.draw_grid_and_get_info
+    on a transparent canvas.
+
+    Every primitive is drawn twice: in its color onto a black BGR canvas and in 255 onto an
+    alpha canvas. The anti-aliased blend of putText then yields premultiplied color and
+    "over" alpha, so compositing reproduces drawing on the frame directly (OpenCV does not
+    blend the alpha channel of a 4-channel image, hence the separate canvas).
+
+    Returns:
+        np.ndarray: (height, width, 4) uint8 premultiplied BGRA
+    """
+    line_color, text_color, text_bg_color = grid_colors(dark_mode)
+    color = np.zeros((height, width, 3), dtype=np.uint8)
+    alpha = np.zeros((height, width), dtype=np.uint8)
+
+    def draw(primitive, *args, paint, **kwargs):
+        primitive(color, *args, paint, **kwargs)
+        primitive(alpha, *args, 255, **kwargs)
+
+    cell_height_exact, cell_width_exact = height / rows, width / cols
+    cell_draw_height, cell_draw_width = height // rows, width // cols
+    for i in range(1, rows):
+        y = i * cell_draw_height
+        draw(cv2.line, (0, y), (width, y), paint=line_color, thickness=1)
+    for i in range(1, cols):
+        x = i * cell_draw_width
+        draw(cv2.line, (x, 0), (x, height), paint=line_color, thickness=1)
+
+    cell_number = 1
+    for r in range(rows):
+        for c in range(cols):
+            label_pos_x = int(round(c * cell_width_exact)) + 5
+            label_pos_y = int(round(r * cell_height_exact)) + 20
+            label_text = str(cell_number)
+            (text_w, text_h), _ = cv2.getTextSize(label_text, GRID_LABEL_FONT, 0.6, 1)
+            if label_pos_y - text_h - 2 > 0 and label_pos_x + text_w + 2 < width:
+                draw(cv2.rectangle, (label_pos_x - 2, label_pos_y - text_h - 2),
+                     (label_pos_x + text_w + 2, label_pos_y + 2), paint=text_bg_color, thickness=-1)
+            draw(lambda canvas, paint: cv2.putText(canvas, label_text, (label_pos_x, label_pos_y), GRID_LABEL_FONT,
+                                                   0.8, paint, 2, cv2.LINE_AA), paint=text_color)
+            cell_number += 1
+    return np.dstack((color, alpha))
+
+
+def _runs(mask):
+    """(start, stop) of each run of True values in a 1-D mask."""
+    edges = np.flatnonzero(np.diff(np.concatenate(([0], mask.astype(np.int8), [0]))))
+    return list(zip(edges[0::2].tolist(), edges[1::2].tolist()))
+
+
+class GridTemplate:
+    """
+    A rasterized grid overlay split into a few dense patches: one per grid line and one per
+    band of rows holding labels.
+
+    apply() composites each patch as `color + frame * (255 - alpha) / 255` on an image
+    slice, two OpenCV calls per patch instead of a line, rectangle and putText call per cell,
+    and untouched pixels are never read.
+    """
+
+    def __init__(self, key, overlay):
+        self.key = key  # (width, height, ...) identifying the overlay, (width, height, rows, cols, dark_mode) for grids
+        self.overlay = overlay  # (height, width, 4) premultiplied BGRA
+        self.patches = [] # (row slice, col slice, color, inverse alpha) in the frame's BGR layout
+        alpha = overlay[..., 3]
+        height, width = alpha.shape
+        # Grid lines: rows / columns that are opaque almost end to end
+        line_rows = np.flatnonzero((alpha == 255).sum(axis=1) >= 0.9 * width)
+        line_cols = np.flatnonzero((alpha == 255).sum(axis=0) >= 0.9 * height)
+        claimed = np.zeros_like(alpha, dtype=bool) # Pixels already owned by a patch
+        for y in line_rows.tolist():
+            self._add_patch(slice(y, y + 1), slice(0, width), claimed)
+        for x in line_cols.tolist():
+            self._add_patch(slice(0, height), slice(x, x + 1), claimed)
+        rest = (alpha > 0) & ~claimed
+        for y0, y1 in _runs(rest.any(axis=1)):
+            columns = np.flatnonzero(rest[y0:y1].any(axis=0))
+            self._add_patch(slice(y0, y1), slice(int(columns[0]), int(columns[-1]) + 1), claimed)
+
+    def _add_patch(self, rows, cols, claimed):
+        color = self.overlay[rows, cols, :3].copy()
+        inverse = 255 - self.overlay[rows, cols, 3]
+        owned = claimed[rows, cols]
+        color[owned], inverse[owned] = 0, 255 # Identity where an earlier patch already composites the pixel
+        claimed[rows, cols] = True
+        self.patches.append((rows, cols, color, cv2.merge((inverse, inverse, inverse))))
+
+    def apply(self, img):
+        """Composites the overlay onto a BGR frame of the template's size, in place; returns the frame."""
+        width, height = self.key[:2]
+        if img.shape[:2] != (height, width):
+            raise ValueError(f"Grid template is {width}x{height}, frame is {img.shape[1]}x{img.shape[0]}")
+        for rows, cols, color, inverse in self.patches:
+            region = img[rows, cols]
+            cv2.add(color, cv2.multiply(region, inverse, scale=1.0 / 255), dst=region)
+        return img
+
+    def save(self, path):
+        np.savez_compressed(path, key=np.array(self.key[:4]), dark_mode=self.key[4], overlay=self.overlay)
+
+    @classmethod
+    def load(cls, path, key):
+        with np.load(path) as data:
+            if tuple(data["key"].tolist()) + (bool(data["dark_mode"]),) != key:
+                return None
+            return cls(key, data["overlay"])
+
+
+_templates = {}
+
+
+def _template_path(key):
+    width, height, rows, cols, dark_mode = key
+    theme = "dark" if dark_mode else "light"
+    return os.path.join(GRID_TEMPLATE_DIR, f"grid_{width}x{height}_{rows}x{cols}_{theme}.npz")
+
+
+def get_grid_template(width, height, rows, cols, dark_mode=False):
+    """
+    Returns the GridTemplate for a resolution, grid and theme.
+
+    Templates are looked up in memory, then in GRID_TEMPLATE_DIR, and rendered (and saved
+    there) only on a miss.
+    """
+    key = (int(width), int(height), int(rows), int(cols), bool(dark_mode))
+    template = _templates.get(key)
+    if template is not None:
+        return template
+    path = _template_path(key) if GRID_TEMPLATE_DIR else None
+    if path and os.path.exists(path):
+        try:
+            template = GridTemplate.load(path, key)
+        except (OSError, ValueError, KeyError) as e:
+            print(f"Warning: Ignoring unreadable grid template {path}: {e}")
+    if template is None:
+        template = GridTemplate(key, render_grid_overlay(*key))
+        if path:
+            try:
+                os.makedirs(GRID_TEMPLATE_DIR, exist_ok=True)
+                template.save(path)
+            except OSError as e:
+                print(f"Warning: Could not cache grid template to {path}: {e}")
+    if len(_templates) >= GRID_CACHE_SIZE:
+        _templates.pop(next(iter(_templates)))
+    _templates[key] = template
+    return template
+
+
+def apply_grid(img, rows, cols, dark_mode=False):
+    """Draws the cached grid overlay for the frame's size onto `img` in place and returns it."""
+    height, width = img.shape[:2]
+    return get_grid_template(width, height, rows, cols, dark_mode).apply(img)
@@ -0,0 +1,158 @@
+import numpy as np
+
+from ui_tree import UiTree
+
+# --- Configuration ---
+BOUNDS_TOLERANCE = 4 # Max per-edge shift (px) for a matched node to still count as "not moved"
+MATCH_GATE = 1.0 # Max center offset per axis, in node sizes (plus the tolerance), for two rows to be paired at all
+
+
+class HierarchyDiff:
+    """
+    Delta between two consecutive UiTree snapshots.
+
+    Row indices in `added` refer to the new tree, in `removed` to the old one;
+    `moved` and `text_changed` hold (old_row, new_row) pairs.
+    """
+
+    def __init__(self, old_tree, new_tree, added, removed, matched, moved, text_changed):
+        self.old_tree = old_tree
+        self.new_tree = new_tree
+        self.added = added                # (A,) int rows of new_tree with no counterpart
+        self.removed = removed            # (R,) int rows of old_tree with no counterpart
+        self.matched = matched            # (M, 2) int (old_row, new_row) pairs, including unchanged ones
+        self.moved = moved                # (K, 2) pairs whose bounds shifted or resized beyond the tolerance
+        self.text_changed = text_changed  # (T, 2) pairs whose text or content-desc changed
+
+    def __repr__(self):
+        return (f"HierarchyDiff(added={len(self.added)}, removed={len(self.removed)}, "
+                f"moved={len(self.moved)}, text_changed={len(self.text_changed)}, "
+                f"unchanged={len(self.matched) - len(self.changed_pairs())})")
+
+    def is_empty(self):
+        """True when nothing was added, removed, moved or relabelled."""
+        return not (len(self.added) or len(self.removed) or len(self.moved) or len(self.text_changed))
+
+    def changed_pairs(self):
+        """Matched (old_row, new_row) pairs that moved or changed text, without duplicates."""
+        if not len(self.moved) and not len(self.text_changed):
+            return np.empty((0, 2), dtype=np.int64)
+        return np.unique(np.concatenate([self.moved, self.text_changed]), axis=0)
+
+    def dirty_rows(self):
+        """Rows of the new tree that downstream stages must re-process (added, moved or relabelled)."""
+        return np.union1d(self.added, self.changed_pairs()[:, 1]).astype(np.int64)
+
+    def dirty_rect(self):
+        """(x1, y1, x2, y2) covering every changed region in either snapshot, or None if nothing changed."""
+        boxes = [self.new_tree.bounds[self.dirty_rows()], self.old_tree.bounds[self.removed]]
+        pairs = self.changed_pairs()
+        if len(pairs):
+            boxes.append(self.old_tree.bounds[pairs[:, 0]])
+        boxes = np.concatenate(boxes)
+        if not len(boxes):
+            return None
+        return (int(boxes[:, 0].min()), int(boxes[:, 1].min()),
+                int(boxes[:, 2].max()), int(boxes[:, 3].max()))
+
+
+def _node_key(tree, row):
+    """resource-id, or class when there is none: the AppAgent id part that depends on neither size nor text."""
+    return tree.strings["resource-id"][row] or tree.strings["class"][row]
+
+
+def _compute_match_keys(tree):
+    parent = tree.parent.tolist()
+    return [(_node_key(tree, row), _node_key(tree, parent[row]) if parent[row] >= 0 else "")
+            for row in range(len(tree))]
+
+
+def _rows_by_key(tree):
+    groups = {}
+    for row, key in enumerate(tree.cached("diff_match_keys", _compute_match_keys)):
+        groups.setdefault(key, []).append(row)
+    return groups
+
+
+def _pair_group(old_bounds, new_bounds, old_rows, new_rows, bounds_tolerance):
+    """
+    Greedily pairs same-id rows by nearest center; returns [(old_row, new_row), ...].
+
+    Rows whose centers are further apart on either axis than `bounds_tolerance` plus
+    MATCH_GATE times the larger of the two node sizes on that axis are never paired.
+    """
+    old_b = old_bounds[old_rows].astype(np.int64)
+    new_b = new_bounds[new_rows].astype(np.int64)
+    old_centers = (old_b[:, :2] + old_b[:, 2:]) / 2.0
+    new_centers = (new_b[:, :2] + new_b[:, 2:]) / 2.0
+    offset = np.abs(old_centers[:, None, :] - new_centers[None, :, :])
+    size = np.maximum((old_b[:, 2:] - old_b[:, :2])[:, None, :], (new_b[:, 2:] - new_b[:, :2])[None, :, :])
+    admissible = (offset <= bounds_tolerance + MATCH_GATE * size).all(axis=2)
+    dist = (offset ** 2).sum(axis=2)
+
+    pairs = []
+    used_old, used_new = set(), set()
+    for flat in np.argsort(dist, axis=None, kind="stable").tolist():
+        i, j = divmod(flat, len(new_rows))
+        if i in used_old or j in used_new or not admissible[i, j]:
+            continue
+        used_old.add(i)
+        used_new.add(j)
+        pairs.append((old_rows[i], new_rows[j]))
+        if len(pairs) == min(len(old_rows), len(new_rows)):
+            break
+    return pairs
+
+
+def diff_trees(old_tree, new_tree, bounds_tolerance=BOUNDS_TOLERANCE):
+    """
+    Matches nodes of two snapshots by structural id and reports what changed.
+
+    Nodes are matched on the part of the AppAgent-style id (get_id_from_element_appagent_logic)
+    that depends on neither size nor text: resource-id or class, of the node and of its parent.
+    Nodes with the same key (e.g. list rows) are paired by nearest center, and only when their
+    centers are within `bounds_tolerance` plus MATCH_GATE node sizes on both axes; anything
+    further away stays removed and added. A matched node whose bounds changed by more than
+    `bounds_tolerance` on any edge, whether it moved or was resized, is reported as moved, and
+    one whose text or content-desc changed as text_changed.
+
+    Args:
+        old_tree (UiTree): Previous snapshot
+        new_tree (UiTree): Current snapshot
+        bounds_tolerance (int): Max per-edge change in px before a matched node counts as moved
+
+    Returns:
+        HierarchyDiff
+    """
+    old_groups = _rows_by_key(old_tree)
+    new_groups = _rows_by_key(new_tree)
+
+    pairs = []
+    for key, new_rows in new_groups.items():
+        old_rows = old_groups.get(key)
+        if old_rows:
+            pairs.extend(_pair_group(old_tree.bounds, new_tree.bounds, old_rows, new_rows, bounds_tolerance))
+    matched = np.array(sorted(pairs, key=lambda pair: pair[1]), dtype=np.int64).reshape(-1, 2)
+
+    added = np.setdiff1d(np.arange(len(new_tree)), matched[:, 1])
+    removed = np.setdiff1d(np.arange(len(old_tree)), matched[:, 0])
+
+    old_rows, new_rows = matched[:, 0], matched[:, 1]
+    shift = np.abs(old_tree.bounds[old_rows].astype(np.int64) - new_tree.bounds[new_rows]).max(axis=1, initial=0)
+    moved = matched[shift > bounds_tolerance]
+
+    text_differs = np.zeros(len(matched), dtype=bool)
+    for name in ("text", "content-desc"):
+        old_col, new_col = old_tree.strings[name], new_tree.strings[name]
+        old_values = np.array(old_col.table, dtype=object)[old_col.codes[old_rows]]
+        new_values = np.array(new_col.table, dtype=object)[new_col.codes[new_rows]]
+        text_differs |= old_values != new_values
+    text_changed = matched[text_differs]
+
+    return HierarchyDiff(old_tree, new_tree, added, removed, matched, moved, text_changed)
+
+
+def diff_xml(old_source, new_source, bounds_tolerance=BOUNDS_TOLERANCE, backend=None):
+    """Convenience wrapper: parses two dumps (paths or bytes) and diffs them."""
+    return diff_trees(UiTree.from_xml(old_source, backend), UiTree.from_xml(new_source, backend),
+                      bounds_tolerance)
@@ -0,0 +1,272 @@
+import re
+import xml.etree.ElementTree as ET
+from xml.parsers import expat
+
+try:
+    from lxml import etree as lxml_etree # Optional fast path: pip install lxml
+except ImportError:
+    lxml_etree = None
+
+# --- Configuration ---
+DEFAULT_BACKEND = "expat" # "expat" (stdlib callbacks), "lxml" (optional) or "etree" (baseline)
+READ_CHUNK_SIZE = 64 * 1024 # Bytes fed to the parser per read when streaming a dump
+NODE_TAG = "node" # uiautomator dumps describe every view as a <node> under <hierarchy>
+# Low-cardinality attributes whose values repeat across nodes and dumps; these are interned
+# (text, content-desc and bounds are mostly unique, interning them costs more than it saves)
+INTERNED_ATTRIBS = ("class", "package", "resource-id")
+
+# Matches uiautomator bounds strings such as "[0,84][1280,252]"
+BOUNDS_PATTERN = re.compile(r"\[(-?\d+),(-?\d+)\]\[(-?\d+),(-?\d+)\]")
+
+
+def parse_bounds(bounds_str):
+    """Parses a bounds string "[x1,y1][x2,y2]" into (x1, y1, x2, y2), or None if malformed."""
+    if not bounds_str:
+        return None
+    match = BOUNDS_PATTERN.match(bounds_str)
+    if match is None:
+        return None
+    x1, y1, x2, y2 = match.groups()
+    return int(x1), int(y1), int(x2), int(y2)
+
+
+class HierarchyNode:
+    """One <node> of a UI dump with its bounds parsed once at parse time."""
+    __slots__ = ("attrib", "bounds", "parent", "depth", "index")
+
+    def __init__(self, attrib, bounds, parent, depth, index):
+        self.attrib = attrib  # Attribute dict, same keys as the XML (INTERNED_ATTRIBS values interned)
+        self.bounds = bounds  # (x1, y1, x2, y2) or None if missing/malformed
+        self.parent = parent  # Parent HierarchyNode (the <hierarchy> root for top-level nodes)
+        self.depth = depth    # 0 for top-level nodes, -1 for the <hierarchy> root
+        self.index = index    # Position in document order, -1 for the <hierarchy> root
+
+    def __repr__(self):
+        return (f"HierarchyNode(index={self.index}, depth={self.depth}, "
+                f"class='{self.attrib.get('class', '')}', bounds={self.bounds})")
+
+
+class _HierarchyParserBase:
+    """Incremental parser: feed() bytes as they arrive, then collect nodes with read_nodes()."""
+    name = None
+
+    def __init__(self):
+        self.root = None   # Pseudo-node for <hierarchy>, parent of top-level nodes
+        self.done = False  # True once </hierarchy> (or the outermost element) has closed
+        self.strings = {}  # Intern table for attribute names and INTERNED_ATTRIBS values of this dump
+        self._stack = []   # Nearest enclosing HierarchyNode for each open element
+        self._pending = []
+        self._count = 0
+
+    def _start(self, tag, attrib):
+        # `attrib` must be a dict owned by this parser, interned values are written back in place
+        intern = self.strings.setdefault
+        for key in INTERNED_ATTRIBS:
+            value = attrib.get(key)
+            if value is not None:
+                attrib[key] = intern(value, value)
+        stack = self._stack
+        parent = stack[-1] if stack else None
+        if tag != NODE_TAG:
+            if parent is None and self.root is None:
+                parent = self.root = HierarchyNode(attrib, None, None, -1, -1)
+            stack.append(parent)
+            return
+        node = HierarchyNode(attrib, parse_bounds(attrib.get("bounds")), parent,
+                             parent.depth + 1 if parent is not None else 0, self._count)
+        self._count += 1
+        stack.append(node)
+        self._pending.append(node)
+
+    def _end(self):
+        if self._stack:
+            self._stack.pop()
+        if not self._stack:
+            self.done = True
+
+    def feed(self, data):
+        """Feeds a chunk of the dump. Trailing data after the root element is ignored."""
+        if self.done or not data:
+            return
+        try:
+            self._feed(data)
+        except Exception as e:
+            if not self.done: # adb appends "UI hierchary dumped to: ..." after the XML
+                raise ValueError(f"Malformed UI hierarchy XML ({self.name}): {e}") from e
+
+    def close(self):
+        """Signals end of input; raises ValueError if the document was truncated."""
+        if self.done:
+            return
+        try:
+            self._close()
+        except Exception as e:
+            raise ValueError(f"Malformed UI hierarchy XML ({self.name}): {e}") from e
+        if not self.done:
+            raise ValueError(f"Truncated UI hierarchy XML ({self.name})")
+
+    def read_nodes(self):
+        """Returns the nodes completed since the previous call, in document order."""
+        nodes, self._pending = self._pending, []
+        return nodes
+
+    def _feed(self, data):
+        raise NotImplementedError
+
+    def _close(self):
+        raise NotImplementedError
+
+
+class ElementTreeHierarchyParser(_HierarchyParserBase):
+    """Baseline backend built on xml.etree.ElementTree.XMLPullParser."""
+    name = "etree"
+
+    def __init__(self):
+        super().__init__()
+        self._parser = ET.XMLPullParser(["start", "end"])
+        self._elems = [] # Open elements; finished ones are detached so memory stays bounded
+
+    def _drain(self):
+        elems = self._elems
+        for event, elem in self._parser.read_events():
+            if event == "start":
+                self._start(elem.tag, elem.attrib) # clear() below drops, not empties, this dict
+                elems.append(elem)
+            else:
+                self._end()
+                elems.pop()
+                elem.clear()
+                if elems:
+                    del elems[-1][-1] # A finished element is always the last child of its parent
+
+    def _feed(self, data):
+        self._parser.feed(data)
+        self._drain()
+
+    def _close(self):
+        self._parser.close()
+        self._drain()
+
+
+class ExpatHierarchyParser(_HierarchyParserBase):
+    """Fast stdlib backend driving pyexpat callbacks directly, no element objects are built."""
+    name = "expat"
+
+    def __init__(self):
+        super().__init__()
+        self._parser = expat.ParserCreate(intern=self.strings)
+        self._parser.StartElementHandler = self._start
+        self._parser.EndElementHandler = lambda tag: self._end()
+
+    def _feed(self, data):
+        self._parser.Parse(data, False)
+
+    def _close(self):
+        self._parser.Parse(b"", True)
+
+
+class LxmlHierarchyParser(_HierarchyParserBase):
+    """lxml backend, only available when lxml is installed."""
+    name = "lxml"
+
+    def __init__(self):
+        if lxml_etree is None:
+            raise ValueError("lxml backend requested but lxml is not installed (pip install lxml)")
+        super().__init__()
+        self._parser = lxml_etree.XMLPullParser(events=("start", "end"))
+
+    def _drain(self):
+        for event, elem in self._parser.read_events():
+            if event == "start":
+                self._start(elem.tag, dict(elem.attrib))
+            else:
+                self._end()
+                elem.clear()
+                while elem.getprevious() is not None: # Detach finished siblings, memory stays bounded
+                    del elem.getparent()[0]
+
+    def _feed(self, data):
+        try:
+            self._parser.feed(data)
+        finally:
+            self._drain() # Events before a syntax error (e.g. trailing adb output) still count
+
+    def _close(self):
+        self._parser.close()
+        self._drain()
+
+
+BACKENDS = {
+    "etree": ElementTreeHierarchyParser,
+    "expat": ExpatHierarchyParser,
+    "lxml": LxmlHierarchyParser,
+}
+
+
+def available_backends():
+    """Lists the backend names usable in this environment."""
+    return [name for name in BACKENDS if name != "lxml" or lxml_etree is not None]
+
+
+def create_parser(backend=None):
+    """
+    Creates an incremental hierarchy parser.
+
+    Args:
+        backend (str): One of BACKENDS, defaults to DEFAULT_BACKEND
+
+    Returns:
+        An object with feed(bytes), close(), read_nodes() and a `done` flag
+
+    Raises:
+        ValueError: If the backend is unknown or its library is not installed
+    """
+    backend = backend or DEFAULT_BACKEND
+    if backend not in BACKENDS:
+        raise ValueError(f"Unknown hierarchy parser backend '{backend}'. Choose from {list(BACKENDS)}")
+    return BACKENDS[backend]()
+
+
+def _open_source(source):
+    if isinstance(source, (bytes, bytearray)):
+        import io
+        return io.BytesIO(source)
+    if hasattr(source, "read"):
+        return source
+    return open(source, "rb")
+
+
+def iter_nodes(source, backend=None, chunk_size=READ_CHUNK_SIZE):
+    """
+    Streams HierarchyNode objects out of a UI dump as they are parsed.
+
+    Args:
+        source: Path to the XML file, a binary file object, or the raw XML bytes
+        backend (str): Parser backend name, see BACKENDS
+        chunk_size (int): Bytes read per parser feed
+
+    Yields:
+        HierarchyNode: Nodes in document order (parents before children)
+
+    Raises:
+        ValueError: If the XML is malformed or truncated
+    """
+    parser = create_parser(backend)
+    stream = _open_source(source)
+    try:
+        while not parser.done:
+            chunk = stream.read(chunk_size)
+            if not chunk:
+                break
+            parser.feed(chunk)
+            yield from parser.read_nodes()
+        parser.close()
+        yield from parser.read_nodes()
+    finally:
+        if stream is not source:
+            stream.close()
+
+
+def parse_nodes(source, backend=None):
+    """Parses a whole UI dump and returns its HierarchyNode list in document order."""
+    return list(iter_nodes(source, backend))
@@ -0,0 +1,97 @@
+import numpy as np
+
+from ui_tree import UiTree
+from visibility import VisibilityMap
+
+# --- Configuration ---
+# Nodes with any of these flags are never collapsed: they are what the agent acts on
+KEEP_FLAGS = ("clickable", "long-clickable", "focusable", "scrollable", "checkable")
+# A node carrying any of these strings is informative and kept
+KEEP_STRINGS = ("text", "content-desc", "resource-id")
+DROP_HIDDEN = True # Drop nodes with no visible area (fully covered or off screen), see visibility.py
+
+
+class PrunedHierarchy:
+    """A pruned UiTree plus the mapping between its rows and the rows of the full tree."""
+
+    def __init__(self, full_tree, tree, source_rows):
+        self.full_tree = full_tree
+        self.tree = tree                # Pruned UiTree
+        self.source_rows = source_rows  # (len(tree),) int64 row in full_tree of each pruned row
+        self._pruned_row = None
+
+    def __repr__(self):
+        return f"PrunedHierarchy(nodes={len(self.tree)}/{len(self.full_tree)})"
+
+    def to_source(self, rows):
+        """Full-tree rows of pruned `rows`."""
+        return self.source_rows[np.asarray(rows, dtype=np.int64)]
+
+    def from_source(self, rows):
+        """Pruned rows of full-tree `rows`, -1 for rows that were pruned away."""
+        if self._pruned_row is None:
+            self._pruned_row = np.full(len(self.full_tree), -1, dtype=np.int64)
+            self._pruned_row[self.source_rows] = np.arange(len(self.source_rows))
+        return self._pruned_row[np.asarray(rows, dtype=np.int64)]
+
+
+def prune_rows(tree, keep_flags=KEEP_FLAGS, keep_strings=KEEP_STRINGS, drop_hidden=DROP_HIDDEN):
+    """
+    Rows surviving the pruning pass, in document order.
+
+    Zero-area nodes (and, with drop_hidden, nodes with no visible area) are dropped. Layout
+    wrappers (no keep flag, no text / desc / id) are dropped when they end up with no kept
+    child and collapsed when they have exactly one, so single-child chains disappear while
+    wrappers grouping several elements stay. Window roots are always kept.
+
+    Returns:
+        np.ndarray: int64 rows of `tree`
+    """
+    informative = np.zeros(len(tree), dtype=bool)
+    for name in keep_flags:
+        informative |= tree.flag(name)
+    for name in keep_strings:
+        informative |= tree.strings[name].codes != 0
+    droppable = ~tree.valid()
+    if drop_hidden:
+        droppable |= VisibilityMap.for_tree(tree).visible_fraction() <= 0
+    roots = tree.parent < 0
+
+    keep = np.zeros(len(tree), dtype=bool)
+    kept_children = np.zeros(len(tree), dtype=np.int32) # Kept nodes whose nearest kept ancestor is this row
+    parent = tree.parent.tolist()
+    informative, droppable, roots = informative.tolist(), droppable.tolist(), roots.tolist()
+    for row in range(len(tree) - 1, -1, -1): # Children before parents
+        if roots[row]:
+            keep[row] = True
+        elif droppable[row]:
+            keep[row] = False
+        else:
+            keep[row] = informative[row] or kept_children[row] > 1
+        if parent[row] >= 0:
+            kept_children[parent[row]] += 1 if keep[row] else kept_children[row]
+    return np.flatnonzero(keep)
+
+
+def prune_tree(tree, keep_flags=KEEP_FLAGS, keep_strings=KEEP_STRINGS, drop_hidden=DROP_HIDDEN):
+    """
+    Collapses layout wrappers and drops empty or invisible nodes, see prune_rows().
+
+    Args:
+        tree (UiTree): Full snapshot
+        keep_flags (tuple): Flags that make a node worth keeping
+        keep_strings (tuple): String columns that make a node worth keeping when non-empty
+        drop_hidden (bool): Also drop nodes with no visible area
+
+    Returns:
+        PrunedHierarchy: Pruned tree with the row mapping back to `tree`, memoized per snapshot
+    """
+    def build(tree):
+        rows = prune_rows(tree, keep_flags, keep_strings, drop_hidden)
+        return PrunedHierarchy(tree, tree.take(rows), rows)
+    return tree.cached(("pruned", tuple(keep_flags), tuple(keep_strings), drop_hidden), build)
+
+
+def prune_xml(source, drop_hidden=DROP_HIDDEN, backend=None):
+    """Parses a dump (path or bytes) and returns its PrunedHierarchy."""
+    return prune_tree(UiTree.from_xml(source, backend), drop_hidden=drop_hidden)
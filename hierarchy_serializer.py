@@ -0,0 +1,213 @@
+import math
+import re
+
+import numpy as np
+
+# --- Configuration ---
+BOUNDS_QUANTUM = 10 # Bounds are written in units of this many pixels
+MIN_REPEAT_LENGTH = 12 # Strings at least this long that occur twice or more are replaced by $n aliases
+TEXT_MAX_CHARS = 60 # Longer text / content-desc values are truncated with "~"
+INTERACTIVE_FLAGS = ("clickable", "long-clickable", "checkable", "scrollable")
+# Single-letter markers written after the class for each set flag
+FLAG_MARKERS = (("clickable", "c"), ("long-clickable", "l"), ("checkable", "k"),
+                ("checked", "x"), ("scrollable", "s"), ("focused", "f"))
+# Simple class name -> short name; unknown classes keep their simple name
+CLASS_ABBREVIATIONS = {
+    "Button": "Btn", "ImageButton": "ImgBtn", "TextView": "Txt", "ImageView": "Img",
+    "EditText": "Edit", "AutoCompleteTextView": "Edit", "CheckBox": "Chk", "Switch": "Sw",
+    "RadioButton": "Radio", "ToggleButton": "Toggle", "FrameLayout": "Frame",
+    "LinearLayout": "Lin", "RelativeLayout": "Rel", "ViewGroup": "Group", "View": "View",
+    "RecyclerView": "List", "ListView": "List", "ScrollView": "Scroll", "ViewPager": "Pager",
+    "WebView": "Web", "ProgressBar": "Progress", "SeekBar": "Seek", "Spinner": "Spin",
+}
+
+_TOKEN_PATTERN = re.compile(r"\w+|[^\w\s]")
+
+
+def estimate_tokens(text):
+    """Rough BPE token estimate: one token per punctuation mark, ~4 characters per word piece."""
+    return sum(max(1, math.ceil(len(piece) / 4)) for piece in _TOKEN_PATTERN.findall(text))
+
+
+def abbreviate_class(class_name):
+    """'android.widget.ImageButton' -> 'ImgBtn'."""
+    simple = class_name.rsplit(".", 1)[-1] if class_name else "?"
+    return CLASS_ABBREVIATIONS.get(simple, simple)
+
+
+class SerializedHierarchy:
+    """Prompt text for one snapshot plus the mapping from printed element numbers back to rows."""
+
+    def __init__(self, text, labels, token_estimate, omitted):
+        self.text = text
+        self.labels = labels                  # {element number: tree row (or element list index)}
+        self.token_estimate = token_estimate  # estimate_tokens(text)
+        self.omitted = omitted                # Candidate elements left out to meet the size target
+
+    def __repr__(self):
+        return (f"SerializedHierarchy(elements={len(self.labels)}, tokens~{self.token_estimate}, "
+                f"omitted={self.omitted})")
+
+    def __str__(self):
+        return self.text
+
+
+def _quantize(bounds, quantum):
+    return [int(round(v / quantum)) for v in bounds]
+
+
+def _shorten(value):
+    value = " ".join(value.split())
+    return value if len(value) <= TEXT_MAX_CHARS else value[:TEXT_MAX_CHARS - 1] + "~"
+
+
+def _render(records, quantum, indent):
+    """records: dicts with key, cls, text, desc, bounds, flags, depth. Returns (text, labels)."""
+    counts = {}
+    for record in records:
+        for value in (record["text"], record["desc"]):
+            if len(value) >= MIN_REPEAT_LENGTH:
+                counts[value] = counts.get(value, 0) + 1
+    aliases = {}
+    legend = '# n:class[flags] "text" (desc) @x1,y1,x2,y2'
+    header = [f"{legend} in {quantum}px units" if quantum > 1 else legend]
+    for value, count in counts.items():
+        if count > 1:
+            aliases[value] = f"${len(aliases) + 1}"
+            header.append(f"{aliases[value]}={value}")
+
+    min_depth = min((record["depth"] for record in records), default=0)
+    lines = []
+    labels = {}
+    for number, record in enumerate(records, start=1):
+        labels[number] = record["key"]
+        parts = [f"{number}:{abbreviate_class(record['cls'])}"]
+        if record["flags"]:
+            parts[0] += f"[{record['flags']}]"
+        if record["text"]:
+            parts.append(aliases.get(record["text"]) or f"\"{record['text']}\"")
+        if record["desc"] and record["desc"] != record["text"]:
+            parts.append(aliases.get(record["desc"]) or f"({record['desc']})")
+        parts.append("@" + ",".join(map(str, _quantize(record["bounds"], quantum))))
+        prefix = " " * (record["depth"] - min_depth) if indent else ""
+        lines.append(prefix + " ".join(parts))
+    return "\n".join(header + lines), labels
+
+
+def serialize_records(records, quantum=BOUNDS_QUANTUM, indent=False, max_tokens=None):
+    """
+    Serializes prepared element records, shrinking the output to fit `max_tokens`.
+
+    When over budget the bounds are first coarsened (up to 4x the quantum), then
+    the least important records (non-interactive, then smallest) are dropped.
+
+    Args:
+        records (list): Dicts with key, cls, text, desc, bounds, flags, depth, interactive, area
+        quantum (int): Bounds quantization step in pixels
+        indent (bool): Indent lines by hierarchy depth
+        max_tokens (int): Size target in estimated tokens, None for no limit
+
+    Returns:
+        SerializedHierarchy
+    """
+    text, labels = _render(records, quantum, indent)
+    tokens = estimate_tokens(text)
+    if max_tokens is None or tokens <= max_tokens:
+        return SerializedHierarchy(text, labels, tokens, 0)
+
+    for coarser in (quantum * 2, quantum * 4):
+        text, labels = _render(records, coarser, indent)
+        tokens = estimate_tokens(text)
+        if tokens <= max_tokens:
+            return SerializedHierarchy(text, labels, tokens, 0)
+    quantum = quantum * 4
+
+    # Keep the most useful records, then restore document order
+    ranked = sorted(range(len(records)), key=lambda i: (not records[i]["interactive"], -records[i]["area"], i))
+    low, high = 0, len(ranked)
+    best = _render([], quantum, indent) + (len(records),) # Nothing fits: every record is omitted
+    while low <= high: # Largest prefix of `ranked` that fits the budget
+        middle = (low + high) // 2
+        kept = [records[i] for i in sorted(ranked[:middle])]
+        candidate_text, candidate_labels = _render(kept, quantum, indent)
+        if estimate_tokens(candidate_text) <= max_tokens:
+            best = (candidate_text, candidate_labels, len(records) - middle)
+            low = middle + 1
+        else:
+            high = middle - 1
+    text, labels, omitted = best
+    return SerializedHierarchy(text, labels, estimate_tokens(text), omitted)
+
+
+def _tree_records(tree, rows):
+    flags = {name: tree.flag(name) for name, _ in FLAG_MARKERS}
+    interactive = np.zeros(len(tree), dtype=bool)
+    for name in INTERACTIVE_FLAGS:
+        interactive |= tree.flag(name)
+    areas = tree.areas()
+    records = []
+    for row in rows:
+        records.append({
+            "key": row,
+            "cls": tree.strings["class"][row],
+            "text": _shorten(tree.strings["text"][row]),
+            "desc": _shorten(tree.strings["content-desc"][row]),
+            "bounds": tree.bounds[row].tolist(),
+            "flags": "".join(marker for name, marker in FLAG_MARKERS if flags[name][row]),
+            "depth": int(tree.depth[row]),
+            "interactive": bool(interactive[row]),
+            "area": int(areas[row]),
+        })
+    return records
+
+
+def default_prompt_rows(tree):
+    """Rows worth showing the model: interactive nodes and nodes carrying text or a description."""
+    mask = np.zeros(len(tree), dtype=bool)
+    for name in INTERACTIVE_FLAGS:
+        mask |= tree.flag(name)
+    mask |= tree.strings["text"].codes != 0
+    mask |= tree.strings["content-desc"].codes != 0
+    return np.flatnonzero(mask & tree.valid()).tolist()
+
+
+def serialize_tree(tree, rows=None, quantum=BOUNDS_QUANTUM, indent=False, max_tokens=None):
+    """
+    Compact, numbered prompt text for a UiTree snapshot, memoized per snapshot and options.
+
+    Args:
+        tree (UiTree): Snapshot to describe
+        rows (list): Rows to include, defaults to default_prompt_rows(tree)
+        quantum (int): Bounds quantization step in pixels
+        indent (bool): Indent lines by hierarchy depth
+        max_tokens (int): Size target in estimated tokens
+
+    Returns:
+        SerializedHierarchy: `labels` maps printed numbers to tree rows
+    """
+    rows_key = None if rows is None else tuple(int(row) for row in rows)
+    key = ("prompt", rows_key, quantum, indent, max_tokens)
+
+    def build(tree):
+        selected = default_prompt_rows(tree) if rows_key is None else list(rows_key)
+        return serialize_records(_tree_records(tree, selected), quantum, indent, max_tokens)
+    return tree.cached(key, build)
+
+
+def serialize_elements(elements, quantum=BOUNDS_QUANTUM, max_tokens=None):
+    """Compact, numbered prompt text for a list of AndroidElement; `labels` maps numbers to list indices."""
+    markers = dict(FLAG_MARKERS)
+    records = []
+    for i, elem in enumerate(elements):
+        (x1, y1), (x2, y2) = elem.bbox
+        if elem.tree is not None and elem.row is not None:
+            cls = elem.tree.strings["class"][elem.row]
+        else:
+            cls = elem.class_name or "View" # Elements built without the class attribute (e.g. vision proposals)
+        flags = markers.get(elem.attrib_name, "") if elem.attrib_value == "true" else ""
+        records.append({
+            "key": i, "cls": cls, "text": _shorten(elem.text or ""),
+            "desc": _shorten(elem.desc or ""), "bounds": [x1, y1, x2, y2], "flags": flags,
+            "depth": 0, "interactive": elem.attrib_value == "true", "area": (x2 - x1) * (y2 - y1),
+        })
+    return serialize_records(records, quantum, False, max_tokens)
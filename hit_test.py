@@ -0,0 +1,100 @@
+import numpy as np
+
+from ui_tree import UiTree
+
+# --- Configuration ---
+INTERACTIVE_FLAGS = ("clickable", "long-clickable", "checkable") # Flags of nodes that consume a tap
+GRID_CELL_SIZE = 64 # Bucket size (px) of the spatial index
+
+
+class HitTester:
+    """
+    Spatial index answering "which element receives a tap at (x, y)" for one UiTree snapshot.
+
+    Interactive nodes are bucketed into a uniform grid; each bucket keeps its rows sorted
+    topmost-first by paint order (drawing-order, nesting and window layering), so a query
+    scans one short list and stops at the first node containing the point. Like Android's
+    touch dispatch, non-interactive nodes do not capture the tap and are skipped.
+    """
+
+    def __init__(self, tree, interactive_flags=INTERACTIVE_FLAGS, cell_size=GRID_CELL_SIZE):
+        self.tree = tree
+        self.cell_size = cell_size
+        interactive = np.zeros(len(tree), dtype=bool)
+        for name in interactive_flags:
+            interactive |= tree.flag(name)
+        rows = np.flatnonzero(interactive & tree.valid())
+        rows = rows[np.argsort(-tree.paint_rank()[rows], kind="stable")] # Topmost first
+
+        bounds = tree.bounds[rows].astype(np.int64)
+        cells = np.empty_like(bounds)
+        cells[:, :2] = np.maximum(bounds[:, :2], 0) // cell_size
+        cells[:, 2:] = np.maximum(bounds[:, 2:] - 1, 0) // cell_size
+        buckets = {}
+        for row, (cx1, cy1, cx2, cy2) in zip(rows.tolist(), cells.tolist()):
+            for cy in range(cy1, cy2 + 1):
+                for cx in range(cx1, cx2 + 1):
+                    buckets.setdefault((cx, cy), []).append(row)
+        self._buckets = {key: np.array(value, dtype=np.int64) for key, value in buckets.items()}
+
+    @classmethod
+    def for_tree(cls, tree, interactive_flags=INTERACTIVE_FLAGS):
+        """Returns the hit tester of `tree`, building it once per snapshot and flag set."""
+        return tree.cached(("hit_tester", tuple(interactive_flags)), lambda t: cls(t, interactive_flags))
+
+    def hit_test(self, x, y):
+        """Row of the topmost interactive element containing (x, y), or -1 if none."""
+        if x < 0 or y < 0:
+            return -1
+        candidates = self._buckets.get((int(x) // self.cell_size, int(y) // self.cell_size))
+        if candidates is None:
+            return -1
+        b = self.tree.bounds[candidates]
+        inside = (b[:, 0] <= x) & (x < b[:, 2]) & (b[:, 1] <= y) & (y < b[:, 3])
+        first = int(inside.argmax())
+        return int(candidates[first]) if inside[first] else -1
+
+    def hit_test_many(self, points):
+        """
+        Batch version of hit_test.
+
+        Args:
+            points: (P, 2) array-like of (x, y) device coordinates
+
+        Returns:
+            np.ndarray: (P,) int64 rows, -1 where no interactive element is hit
+        """
+        points = np.asarray(points, dtype=np.int64).reshape(-1, 2)
+        result = np.full(len(points), -1, dtype=np.int64)
+        valid = (points >= 0).all(axis=1)
+        keys = points // self.cell_size
+        groups = {}
+        for i in np.flatnonzero(valid).tolist():
+            groups.setdefault((int(keys[i, 0]), int(keys[i, 1])), []).append(i)
+        for key, indices in groups.items():
+            candidates = self._buckets.get(key)
+            if candidates is None:
+                continue
+            b = self.tree.bounds[candidates]
+            xs = points[indices, 0][:, None]
+            ys = points[indices, 1][:, None]
+            inside = (b[:, 0] <= xs) & (xs < b[:, 2]) & (b[:, 1] <= ys) & (ys < b[:, 3]) # (points, candidates)
+            first = inside.argmax(axis=1)
+            hit = inside[np.arange(len(indices)), first]
+            result[np.array(indices)[hit]] = candidates[first[hit]]
+        return result
+
+    def element_at(self, x, y, attrib_name="clickable"):
+        """AndroidElement receiving a tap at (x, y), or None."""
+        row = self.hit_test(x, y)
+        return self.tree.element(row, attrib_name) if row >= 0 else None
+
+    def lands_on(self, x, y, row):
+        """True if a tap at (x, y) is received by `row` or by one of its descendants."""
+        hit = self.hit_test(x, y)
+        return hit >= 0 and (hit == row or row in self.tree.ancestors(hit))
+
+
+def hit_test_xml(source, points, backend=None):
+    """Parses a dump (path or bytes) and returns the rows hit by each (x, y) in `points`."""
+    return HitTester.for_tree(UiTree.from_xml(source, backend)).hit_test_many(points)
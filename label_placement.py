@@ -0,0 +1,167 @@
+import itertools
+
+import numpy as np
+
+# --- Configuration ---
+GRID_CELL_SIZE = 48 # Side (px) of an occupancy grid cell, about one label
+LABEL_GAP = 2 # Pixels kept between a label and its box edge or a neighbouring label
+# Candidate anchors tried in order, relative to the element box
+ANCHORS = ("top-left", "top-right", "bottom-left", "bottom-right", "center",
+           "above", "below", "left", "right")
+SEARCH_RINGS = 4 # Rings of positions (one label height apart) tried around a box before giving up
+
+
+class OccupancyGrid:
+    """Uniform bucket grid of placed rectangles; a freeness test only looks at the cells a rect touches."""
+
+    def __init__(self, cell_size=GRID_CELL_SIZE):
+        self.cell_size = cell_size
+        self.cells = {} # (cell x, cell y) -> list of (x1, y1, x2, y2)
+
+    def _cells(self, rect):
+        x1, y1, x2, y2 = rect
+        size = self.cell_size
+        for cy in range(y1 // size, (y2 - 1) // size + 1):
+            for cx in range(x1 // size, (x2 - 1) // size + 1):
+                yield cx, cy
+
+    def free(self, rect, gap=0):
+        """True if `rect` grown by `gap` overlaps no placed rectangle."""
+        x1, y1, x2, y2 = rect[0] - gap, rect[1] - gap, rect[2] + gap, rect[3] + gap
+        for cell in self._cells((x1, y1, x2, y2)):
+            for ox1, oy1, ox2, oy2 in self.cells.get(cell, ()):
+                if x1 < ox2 and ox1 < x2 and y1 < oy2 and oy1 < y2:
+                    return False
+        return True
+
+    def add(self, rect):
+        for cell in self._cells(rect):
+            self.cells.setdefault(cell, []).append(rect)
+
+
+class LabelPlacement:
+    """Where one label ended up."""
+    __slots__ = ("origin", "rect", "anchor", "leader")
+
+    def __init__(self, origin, rect, anchor, leader=None):
+        self.origin = origin  # (x, y) top-left of the label box
+        self.rect = rect      # (x1, y1, x2, y2)
+        self.anchor = anchor  # "preferred", one of ANCHORS, "ring" or "overlap"
+        self.leader = leader  # ((x1, y1), (x2, y2)) from the label to its box, for "ring" placements
+
+    def __repr__(self):
+        return f"LabelPlacement(rect={self.rect}, anchor='{self.anchor}')"
+
+
+def _anchor_origin(anchor, box, width, height, gap=LABEL_GAP):
+    """Top-left of a width x height label at `anchor` of box (x1, y1, x2, y2)."""
+    x1, y1, x2, y2 = box
+    if anchor == "top-left":
+        return x1 + gap, y1 + gap
+    if anchor == "top-right":
+        return x2 - width - gap, y1 + gap
+    if anchor == "bottom-left":
+        return x1 + gap, y2 - height - gap
+    if anchor == "bottom-right":
+        return x2 - width - gap, y2 - height - gap
+    if anchor == "center":
+        return (x1 + x2 - width) // 2, (y1 + y2 - height) // 2
+    if anchor == "above":
+        return x1, y1 - height - gap
+    if anchor == "below":
+        return x1, y2 + gap
+    if anchor == "left":
+        return x1 - width - gap, y1
+    if anchor == "right":
+        return x2 + gap, y1
+    raise ValueError(f"Unknown label anchor '{anchor}'")
+
+
+def _ring_origins(box, width, height, rings=SEARCH_RINGS, gap=LABEL_GAP):
+    """Label origins on growing rings around the box: above, below, left, right and the corners."""
+    x1, y1, x2, y2 = box
+    step = height + gap
+    for ring in range(1, rings + 1):
+        reach = ring * step
+        yield x1, y1 - height - reach
+        yield x1, y2 + reach
+        yield x1 - width - reach, y1
+        yield x2 + reach, y1
+        yield x1 - width - reach, y1 - height - reach
+        yield x2 + reach, y1 - height - reach
+        yield x1 - width - reach, y2 + reach
+        yield x2 + reach, y2 + reach
+
+
+def _leader(rect, box):
+    """Segment from the label edge to the nearest point of the box, ((x, y), (x, y))."""
+    lx1, ly1, lx2, ly2 = rect
+    bx1, by1, bx2, by2 = box
+    label_center = ((lx1 + lx2) // 2, (ly1 + ly2) // 2)
+    target = (min(max(label_center[0], bx1), bx2), min(max(label_center[1], by1), by2))
+    start = (min(max(target[0], lx1), lx2 - 1), min(max(target[1], ly1), ly2 - 1))
+    return start, target
+
+
+def place_labels(boxes, sizes, image_size, preferred=None, anchors=ANCHORS, gap=LABEL_GAP,
+                 cell_size=GRID_CELL_SIZE):
+    """
+    Greedy non-overlapping placement of one label per box, in the given order.
+
+    Each label takes the first free position among its preferred origin and the candidate
+    anchors, then positions on rings around the box (these get a leader line back to the
+    box). Freeness is checked against an occupancy grid of the labels placed so far, so each
+    test only touches a few cells. Labels that find no free spot fall back to their first
+    on-screen candidate and may overlap.
+
+    Args:
+        boxes (list): ((x1, y1), (x2, y2)) per element, the AndroidElement.bbox convention
+        sizes (list): (width, height) of each label box, e.g. LabelAtlas.size(label)
+        image_size (tuple): (width, height) of the image, labels are kept inside it
+        preferred (list): Optional (x, y) origin per label, tried before the anchors
+        anchors (tuple): Anchor names to try, see ANCHORS
+        gap (int): Minimum spacing between labels and from box edges
+        cell_size (int): Occupancy grid cell size in pixels
+
+    Returns:
+        list: LabelPlacement per box, in input order
+    """
+    img_w, img_h = image_size
+    grid = OccupancyGrid(cell_size)
+    placements = []
+    for index, (((x1, y1), (x2, y2)), (width, height)) in enumerate(zip(boxes, sizes)):
+        box = (x1, y1, x2, y2)
+        candidates = itertools.chain( # Lazy: most labels stop at the first candidate
+            [("preferred", preferred[index])] if preferred is not None else (),
+            ((anchor, _anchor_origin(anchor, box, width, height, gap)) for anchor in anchors),
+            (("ring", origin) for origin in _ring_origins(box, width, height, gap=gap)))
+        placement = None
+        fallback = None
+        for anchor, (x, y) in candidates:
+            x, y = int(x), int(y)
+            rect = (x, y, x + width, y + height)
+            if x < 0 or y < 0 or rect[2] > img_w or rect[3] > img_h:
+                continue
+            if fallback is None:
+                fallback = LabelPlacement((x, y), rect, "overlap")
+            if grid.free(rect, gap):
+                placement = LabelPlacement((x, y), rect, anchor, _leader(rect, box) if anchor == "ring" else None)
+                break
+        if placement is None:
+            if fallback is None: # Label larger than the image or box far off screen: clamp into view
+                x = int(np.clip(x1, 0, max(img_w - width, 0)))
+                y = int(np.clip(y1, 0, max(img_h - height, 0)))
+                fallback = LabelPlacement((x, y), (x, y, x + width, y + height), "overlap")
+            placement = fallback
+        grid.add(placement.rect)
+        placements.append(placement)
+    return placements
+
+
+def label_at(placements, x, y):
+    """Index of the topmost (last placed) label containing point (x, y), or -1."""
+    for index in range(len(placements) - 1, -1, -1):
+        x1, y1, x2, y2 = placements[index].rect
+        if x1 <= x < x2 and y1 <= y < y2:
+            return index
+    return -1
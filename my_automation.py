@@ -1,30 +1,40 @@
 import new.adb_controller as adb
-import time
+from ui_events import get_monitor
 
 print("Starting custom automation...")
 
 # Get resolution first (optional but good practice for coordinates)
 width, height = adb.get_screen_resolution()
 
+# Waits below return as soon as the UI has reacted and settled, the timeouts are the old fixed sleeps.
+# The monitor holds a UiAutomation connection: wrap any `uiautomator dump` in `with monitor.paused():`.
+monitor = get_monitor()
+
 if width and height:
 
     print("Tapping to open search (example coordinates)...")
+    since = monitor.mark()
     adb.tap(width // 2, 150) 
-    time.sleep(2)
+    monitor.wait_for_update(since, timeout=2)
 
     print("Typing 'display'...")
+    since = monitor.mark()
     adb.type_text("display")
-    time.sleep(2)
+    monitor.wait_for_update(since, timeout=2)
 
     print("Swiping down...")
+    since = monitor.mark()
     adb.swipe_down()
-    time.sleep(1)
+    monitor.wait_for_update(since, timeout=1)
 
     print("Tapping at (300, 500)...")
+    since = monitor.mark()
     adb.tap(300, 500)
-    time.sleep(1)
+    monitor.wait_for_update(since, timeout=1)
 
 else:
     print("Could not get screen resolution. Cannot run automation.")
 
+monitor.stop() # End the `uiautomator events` session before another tool connects
+
 print("Custom automation finished.") 
\ No newline at end of file
@@ -0,0 +1,214 @@
+import cv2
+import numpy as np
+
+# --- Configuration ---
+LABEL_FONT = cv2.FONT_HERSHEY_SIMPLEX
+ATLAS_CACHE_SIZE = 16 # Atlases (font / scale / thickness / padding combinations) kept in memory
+BLEND_CACHE_SIZE = 2048 # Pre-blended label planes (label / colors / alpha combinations) kept per atlas
+
+
+_NO_SPILL = (np.empty(0, dtype=np.intp), np.empty(0, dtype=np.intp), np.empty(0, dtype=np.uint8))
+
+
+class LabelAtlas:
+    """
+    Cached label sprites for one font, scale, thickness and padding.
+
+    A sprite is the uint8 text coverage of a whole label box (padding included), drawn with
+    the same putText call as utils.putBText the first time the label is used. Strokes that
+    putText draws outside the box (e.g. descenders with a small vspace) are kept apart as a
+    short spill list. Colors are applied when compositing, so one atlas serves every theme;
+    blend_planes() caches the per-theme blend factors of each label.
+    """
+
+    def __init__(self, font_scale, thickness, vspace, hspace, font=LABEL_FONT):
+        self.font = font
+        self.font_scale = font_scale
+        self.thickness = thickness
+        self.vspace = vspace
+        self.hspace = hspace
+        (_, height), _ = cv2.getTextSize("0", font, font_scale, thickness)
+        self.margin = height + thickness # Room around the box while rasterizing, for strokes that spill out
+        self._sprites = {}
+        self._spills = {}
+        self._planes = {}
+        self._tables = {} # (alpha, bg, text) -> per-coverage (scale, offset) lookup tables
+
+    def _rasterize(self, text):
+        (width, height), _ = cv2.getTextSize(text, self.font, self.font_scale, self.thickness)
+        m = self.margin
+        canvas = np.zeros((height + 2 * (self.vspace + m), width + 2 * (self.hspace + m)), dtype=np.uint8)
+        cv2.putText(canvas, text, (self.hspace + m, self.vspace + height + m), self.font, self.font_scale,
+                    255, self.thickness)
+        sprite = canvas[m:-m, m:-m].copy()
+        canvas[m:-m, m:-m] = 0
+        self._sprites[text] = sprite
+        if not cv2.countNonZero(canvas): # Usual case: every stroke is inside the box
+            self._spills[text] = _NO_SPILL
+            return
+        rows, cols = np.nonzero(canvas)
+        self._spills[text] = (rows - m, cols - m, canvas[rows, cols])
+
+    def sprite(self, text):
+        """Text coverage (box_h, box_w) uint8 for `text`, rasterized once."""
+        if text not in self._sprites:
+            self._rasterize(text)
+        return self._sprites[text]
+
+    def spill(self, text):
+        """(rows, cols, coverage) of the strokes outside the label box, relative to its top-left corner."""
+        if text not in self._spills:
+            self._rasterize(text)
+        return self._spills[text]
+
+    def blend_planes(self, text, alpha, bg_color, text_color):
+        """
+        Fixed-point factors (scale, offset) of the putBText blend for one label and theme.
+
+        `(pixel * scale + offset) >> 8` equals `(alpha * pixel + (1 - alpha) * bg) * (1 - w) + text * w`
+        (w the text coverage) rounded to the nearest integer, for every pixel of the label box.
+        The factors are looked up per coverage level from a 256-entry table per theme.
+
+        Returns:
+            tuple: (scale, offset) uint16 arrays of shape (box_h, box_w, 3)
+        """
+        key = (text, float(alpha), tuple(bg_color), tuple(text_color))
+        planes = self._planes.get(key)
+        if planes is None:
+            if len(self._planes) >= BLEND_CACHE_SIZE:
+                self._planes.pop(next(iter(self._planes)))
+            scale_lut, offset_lut = self._blend_tables(key[1:])
+            sprite = self.sprite(text)
+            planes = self._planes[key] = (scale_lut.take(sprite, axis=0), offset_lut.take(sprite, axis=0))
+        return planes
+
+    def _blend_tables(self, theme):
+        tables = self._tables.get(theme)
+        if tables is None:
+            alpha, bg_color, text_color = theme
+            coverage = np.arange(256, dtype=np.float64)[:, None] / 255.0
+            bg, fg = np.array(bg_color, dtype=np.float64), np.array(text_color, dtype=np.float64)
+            scale = np.round(256.0 * alpha * (1.0 - coverage)).repeat(3, axis=1)
+            offset = np.round(256.0 * ((1.0 - alpha) * bg * (1.0 - coverage) + fg * coverage) + 128.0)
+            # pixel * scale + offset stays below 2 ** 16: at most 255 * 256 + 128
+            tables = self._tables[theme] = (scale.astype(np.uint16), offset.astype(np.uint16))
+        return tables
+
+    def size(self, text):
+        """(width, height) of the label box for `text`, padding included."""
+        height, width = self.sprite(text).shape
+        return width, height
+
+
+_atlases = {}
+
+
+def get_atlas(font_scale=1.0, thickness=2, vspace=5, hspace=5, font=LABEL_FONT):
+    """Returns the shared LabelAtlas for these settings, creating it on first use."""
+    key = (font, font_scale, thickness, vspace, hspace)
+    atlas = _atlases.get(key)
+    if atlas is None:
+        if len(_atlases) >= ATLAS_CACHE_SIZE:
+            _atlases.pop(next(iter(_atlases)))
+        atlas = _atlases[key] = LabelAtlas(font_scale, thickness, vspace, hspace, font)
+    return atlas
+
+
+def _per_label(value, count):
+    """Broadcasts one BGR color (or a list of them) to a (count, 3) uint8 array."""
+    value = np.asarray(value, dtype=np.uint8)
+    return np.broadcast_to(value, (count, 3)) if value.ndim == 1 else value.reshape(count, 3)
+
+
+def draw_boxes(img, boxes, colors, thickness=2):
+    """
+    Draws every rectangle with one polylines call per distinct color.
+
+    Args:
+        img (np.ndarray): BGR image, drawn in place
+        boxes (list): ((x1, y1), (x2, y2)) per box, the AndroidElement.bbox convention
+        colors: One BGR color or a list with one color per box
+        thickness (int): Line thickness in pixels
+    """
+    if not len(boxes):
+        return img
+    colors = [tuple(color) for color in _per_label(colors, len(boxes)).tolist()]
+    groups = {}
+    for ((x1, y1), (x2, y2)), color in zip(boxes, colors):
+        corners = np.array([[x1, y1], [x2, y1], [x2, y2], [x1, y2]], dtype=np.int32)
+        groups.setdefault(color, []).append(corners)
+    for color, polygons in groups.items():
+        cv2.polylines(img, polygons, True, color, thickness)
+    return img
+
+
+def draw_leaders(img, segments, colors, thickness=1):
+    """Draws leader lines ((x1, y1), (x2, y2)) from labels to their boxes, one polylines call per color."""
+    if not len(segments):
+        return img
+    colors = [tuple(color) for color in _per_label(colors, len(segments)).tolist()]
+    groups = {}
+    for (start, end), color in zip(segments, colors):
+        groups.setdefault(color, []).append(np.array([start, end], dtype=np.int32))
+    for color, lines in groups.items():
+        cv2.polylines(img, lines, False, color, thickness)
+    return img
+
+
+def draw_labels(img, labels, origins, bg_colors, text_colors, alpha=0.6, atlas=None):
+    """
+    Composites labels from cached sprites, in place.
+
+    Each label box gets the utils.putBText blend `alpha * image + (1 - alpha) * bg_color`
+    with the text on top, computed as one fixed-point multiply-add over the box with the
+    factors cached by LabelAtlas.blend_planes, so no text is rasterized and no per-label
+    temporaries are built beyond the box itself. Labels are drawn in order, later ones over
+    earlier ones as with putBText, and boxes are clipped to the image instead of raising.
+
+    Args:
+        img (np.ndarray): BGR uint8 image, modified in place
+        labels (list): Label strings
+        origins (list): (x, y) top-left corner of each label box
+        bg_colors: One BGR background color or one per label
+        text_colors: One BGR text color or one per label
+        alpha (float): Weight of the original image under label backgrounds
+        atlas (LabelAtlas): Sprite source, defaults to get_atlas()
+
+    Returns:
+        list: (x1, y1, x2, y2) label rectangles in image coordinates (unclipped)
+    """
+    atlas = atlas or get_atlas()
+    img_h, img_w = img.shape[:2]
+    bg_colors = [tuple(color) for color in _per_label(bg_colors, len(labels)).tolist()]
+    text_colors = [tuple(color) for color in _per_label(text_colors, len(labels)).tolist()]
+    rects = []
+    for label, (x, y), bg_color, text_color in zip(labels, origins, bg_colors, text_colors):
+        scale, offset = atlas.blend_planes(label, alpha, bg_color, text_color)
+        x, y = int(x), int(y)
+        box_h, box_w = offset.shape[:2]
+        rects.append((x, y, x + box_w, y + box_h))
+        cx1, cy1, cx2, cy2 = max(x, 0), max(y, 0), min(x + box_w, img_w), min(y + box_h, img_h)
+        if cx1 >= cx2 or cy1 >= cy2:
+            continue
+        if cx2 - cx1 != box_w or cy2 - cy1 != box_h:
+            window = (slice(cy1 - y, cy2 - y), slice(cx1 - x, cx2 - x))
+            scale, offset = scale[window], offset[window]
+        region = img[cy1:cy2, cx1:cx2]
+        blended = region * scale # uint16
+        blended += offset
+        blended >>= 8
+        region[...] = blended
+
+        rows, cols, values = atlas.spill(label)
+        if len(rows): # Strokes outside the box, blended onto the image like putText would draw them
+            ys, xs = rows + y, cols + x
+            inside = (ys >= 0) & (ys < img_h) & (xs >= 0) & (xs < img_w)
+            ys, xs = ys[inside], xs[inside]
+            coverage = values[inside].astype(np.float32)[:, None] * (1.0 / 255.0)
+            img[ys, xs] = np.round(img[ys, xs] * (1.0 - coverage) + np.array(text_color) * coverage).astype(np.uint8)
+    return rects
+
+
+def putbtext_origin(text_x, text_y, atlas):
+    """Top-left of the label box utils.putBText would draw for text offset (text_x, text_y)."""
+    return text_x - atlas.hspace, text_y - atlas.vspace
@@ -0,0 +1,152 @@
+import os
+
+import numpy as np
+
+from ui_tree import StringColumn
+
+# --- Configuration ---
+PACKED_EXTENSION = ".pmeta" # Extension of packed metadata files
+PACKED_CACHE_SIZE = 64 # Opened files kept in memory (read whole, no file handle stays open)
+MAGIC = b"PMETA\x00\x01\x00" # File signature, the last two bytes are the format version
+
+# File layout (little endian, every array 8-byte aligned):
+#   header     MAGIC, kind (8 bytes, e.g. b"grid"), column count (uint32), reserved (uint32)
+#   directory  one DIRECTORY_DTYPE record per column
+#   data       the raw column arrays
+HEADER_DTYPE = np.dtype([("magic", "S8"), ("kind", "S8"), ("columns", "<u4"), ("reserved", "<u4")])
+DIRECTORY_DTYPE = np.dtype([("name", "S24"), ("dtype", "S4"), ("ndim", "<u4"), ("shape", "<u4", (3,)),
+                            ("offset", "<u8")])
+KINDS = ("grid", "points", "elements")
+
+
+class PackedStrings:
+    """String table read from a packed file: `offsets` into a UTF-8 `blob`, decoded on access."""
+
+    def __init__(self, offsets, blob):
+        self.offsets = offsets  # (K + 1,) uint32
+        self.blob = blob        # (total bytes,) uint8
+
+    def __len__(self):
+        return len(self.offsets) - 1
+
+    def __getitem__(self, code):
+        start, stop = int(self.offsets[code]), int(self.offsets[code + 1])
+        return self.blob[start:stop].tobytes().decode("utf-8")
+
+    def __iter__(self):
+        return (self[code] for code in range(len(self)))
+
+
+def _string_arrays(column):
+    """(codes, offsets, blob) arrays of a StringColumn."""
+    encoded = [value.encode("utf-8") for value in column.table]
+    offsets = np.zeros(len(encoded) + 1, dtype=np.uint32)
+    offsets[1:] = np.cumsum([len(value) for value in encoded])
+    return column.codes.astype(np.int32), offsets, np.frombuffer(b"".join(encoded), dtype=np.uint8)
+
+
+def write_packed(path, kind, columns):
+    """
+    Writes named arrays as a packed metadata file.
+
+    Args:
+        path (str): Output path
+        kind (str): One of KINDS, checked by the readers
+        columns (dict): Column name -> numpy array (at most 3 dimensions); StringColumn values
+            are stored as "<name>.codes", "<name>.offsets" and "<name>.blob"
+    """
+    arrays = {}
+    for name, value in columns.items():
+        if isinstance(value, StringColumn):
+            arrays[f"{name}.codes"], arrays[f"{name}.offsets"], arrays[f"{name}.blob"] = _string_arrays(value)
+        else:
+            arrays[name] = np.ascontiguousarray(value)
+    directory = np.zeros(len(arrays), dtype=DIRECTORY_DTYPE)
+    offset = HEADER_DTYPE.itemsize + directory.nbytes
+    for record, (name, array) in zip(directory, arrays.items()):
+        if array.ndim > 3:
+            raise ValueError(f"Column '{name}' has {array.ndim} dimensions, packed columns hold at most 3")
+        offset = (offset + 7) // 8 * 8
+        record["name"], record["dtype"] = name.encode("ascii"), array.dtype.newbyteorder("<").str.encode("ascii")
+        record["ndim"], record["offset"] = array.ndim, offset
+        record["shape"][:array.ndim] = array.shape
+        offset += array.nbytes
+    header = np.array([(MAGIC, kind.encode("ascii"), len(arrays), 0)], dtype=HEADER_DTYPE)
+
+    with open(path, "wb") as f:
+        f.write(header.tobytes())
+        f.write(directory.tobytes())
+        for record, array in zip(directory, arrays.values()):
+            f.write(b"\x00" * (int(record["offset"]) - f.tell()))
+            f.write(array.astype(array.dtype.newbyteorder("<"), copy=False).tobytes())
+
+
+class PackedMeta:
+    """
+    A packed metadata file read into memory.
+
+    Opening one reads the file in a single call and decodes the fixed-size header and
+    directory; every column is then a numpy view of that buffer, so nothing is parsed or
+    copied until values are used. The file is not kept open (or mapped), so it can be
+    rewritten or deleted while the object is cached.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._data = np.fromfile(path, dtype=np.uint8)
+        self._data.flags.writeable = False
+        if self._data[:len(MAGIC)].tobytes() != MAGIC:
+            raise ValueError(f"{path} is not a packed metadata file")
+        header = self._data[:HEADER_DTYPE.itemsize].view(HEADER_DTYPE)[0]
+        self.kind = header["kind"].decode("ascii")
+        end = HEADER_DTYPE.itemsize + int(header["columns"]) * DIRECTORY_DTYPE.itemsize
+        self.directory = {record["name"].decode("ascii"): record
+                          for record in self._data[HEADER_DTYPE.itemsize:end].view(DIRECTORY_DTYPE)}
+
+    def __repr__(self):
+        return f"PackedMeta('{self.path}', kind='{self.kind}', columns={list(self.directory)})"
+
+    def __contains__(self, name):
+        return name in self.directory or f"{name}.codes" in self.directory
+
+    def column(self, name):
+        """Zero-copy read-only array view of a column."""
+        record = self.directory.get(name)
+        if record is None:
+            raise ValueError(f"{self.path} has no column '{name}'")
+        dtype = np.dtype(record["dtype"].decode("ascii"))
+        shape = tuple(int(size) for size in record["shape"][:int(record["ndim"])])
+        start = int(record["offset"])
+        stop = start + int(np.prod(shape, dtype=np.int64)) * dtype.itemsize
+        return self._data[start:stop].view(dtype).reshape(shape)
+
+    def strings(self, name):
+        """StringColumn whose codes view the file and whose table decodes on access."""
+        return StringColumn(self.column(f"{name}.codes"),
+                            PackedStrings(self.column(f"{name}.offsets"), self.column(f"{name}.blob")))
+
+    def expect(self, kind):
+        """Raises ValueError unless the file holds `kind` metadata."""
+        if self.kind != kind:
+            raise ValueError(f"{self.path} holds {self.kind} metadata, not {kind}")
+
+
+_opened = {}
+
+
+def open_packed(path):
+    """
+    Returns the PackedMeta of a file, reading it again only when the file changes.
+
+    Raises:
+        OSError: If the file cannot be read
+        ValueError: If it is not a packed metadata file
+    """
+    stat = os.stat(path)
+    key = (os.path.abspath(path), stat.st_mtime_ns, stat.st_size)
+    packed = _opened.get(key)
+    if packed is None:
+        if len(_opened) >= PACKED_CACHE_SIZE:
+            _opened.pop(next(iter(_opened)))
+        packed = _opened[key] = PackedMeta(path)
+    return packed
@@ -0,0 +1,140 @@
+import json
+import os
+import sys
+
+import numpy as np
+
+from android_element import AndroidElement
+from grid_geometry import GridGeometry
+from packed_format import PACKED_EXTENSION, open_packed, write_packed
+from point_lattice import PointLattice
+from ui_tree import StringColumn
+
+# --- Configuration ---
+ELEMENT_STRINGS = ("uid", "attrib_name", "attrib_value", "text", "desc") # AndroidElement string fields
+NULL_SUFFIX = ".null" # "<field>.null" uint8 column marking None values of a string field
+
+
+def unpack_elements(packed):
+    """AndroidElement list of an opened "elements" file (tree links are not stored)."""
+    packed.expect("elements")
+    bboxes = packed.column("bbox").tolist()
+    strings = {name: packed.strings(name) for name in ELEMENT_STRINGS}
+    nulls = {name: packed.column(name + NULL_SUFFIX).astype(bool).tolist()
+             for name in ELEMENT_STRINGS if name + NULL_SUFFIX in packed.directory}
+    elements = []
+    for i, (x1, y1, x2, y2) in enumerate(bboxes):
+        values = {name: None if name in nulls and nulls[name][i] else column[i]
+                  for name, column in strings.items()}
+        elements.append(AndroidElement(values["uid"], ((x1, y1), (x2, y2)), values["attrib_name"],
+                                       values["attrib_value"], values["text"], values["desc"]))
+    return elements
+
+
+def packed_json_data(packed):
+    """The data of the JSON equivalent of an opened file (grid info, sparse points info or element dicts)."""
+    if packed.kind == "grid":
+        return GridGeometry.from_packed(packed).to_cell_info()
+    if packed.kind == "points":
+        return PointLattice.from_packed(packed).to_points_info()
+    return [_element_dict(elem) for elem in unpack_elements(packed)]
+
+
+def pack_grid(path, geometry):
+    """Writes a GridGeometry as a "grid" file (bounds plus center and quadrant centers)."""
+    write_packed(path, "grid", {
+        "size": np.array([geometry.width, geometry.height, geometry.rows, geometry.cols], dtype=np.int32),
+        "bounds": geometry.bounds.reshape(-1, 4).astype(np.int32),
+        "points": geometry.points[:, :, :5].reshape(-1, 5, 2).astype(np.int32),
+    })
+
+
+def pack_points(path, lattice):
+    """Writes a PointLattice as a "points" file."""
+    write_packed(path, "points", {
+        "size": np.array([lattice.width, lattice.height], dtype=np.int32),
+        "xs": lattice.xs.astype(np.int32),
+        "ys": lattice.ys.astype(np.int32),
+        "primary_rows": np.array(lattice.primary_rows, dtype=np.int32),
+        "label": StringColumn.from_values(lattice.labels),
+    })
+
+
+def pack_elements(path, elements):
+    """
+    Writes AndroidElements (uid, bbox, attribute, text, desc) as an "elements" file.
+
+    None values are stored as "" plus a "<field>.null" mask, so they read back as None.
+    """
+    bbox = np.array([[x1, y1, x2, y2] for (x1, y1), (x2, y2) in (elem.bbox for elem in elements)],
+                    dtype=np.int32).reshape(len(elements), 4)
+    columns = {"bbox": bbox}
+    for name in ELEMENT_STRINGS:
+        values = [getattr(elem, name) for elem in elements]
+        columns[name] = StringColumn.from_values(["" if value is None else str(value) for value in values])
+        null = np.array([value is None for value in values], dtype=np.uint8)
+        if null.any():
+            columns[name + NULL_SUFFIX] = null
+    write_packed(path, "elements", columns)
+
+
+def _element_dict(elem):
+    (x1, y1), (x2, y2) = elem.bbox
+    return {"uid": elem.uid, "bbox": [[x1, y1], [x2, y2]], "attrib_name": elem.attrib_name,
+            "attrib_value": elem.attrib_value, "text": elem.text, "desc": elem.desc}
+
+
+def _elements_from_dicts(items):
+    try:
+        return [AndroidElement(item["uid"], tuple(tuple(corner) for corner in item["bbox"]), item["attrib_name"],
+                               item["attrib_value"], item.get("text"), item.get("desc")) for item in items]
+    except (KeyError, TypeError, ValueError) as e:
+        raise ValueError(f"Element entry is missing or malformed: {e}") from e
+
+
+def json_to_packed(json_path, packed_path=None):
+    """
+    Converts a grid info, sparse points info or element JSON to a packed file.
+
+    The kind is recognised from the entries' keys. Returns the packed path.
+
+    Raises:
+        ValueError: If the JSON is not one of those schemas
+    """
+    packed_path = packed_path or os.path.splitext(json_path)[0] + PACKED_EXTENSION
+    with open(json_path, "r") as f:
+        data = json.load(f)
+    first = data[0] if isinstance(data, list) and data else {}
+    if "cell_id" in first:
+        pack_grid(packed_path, GridGeometry.from_cell_info(data))
+    elif "coords_px" in first:
+        pack_points(packed_path, PointLattice.from_points_info(data))
+    elif "uid" in first:
+        pack_elements(packed_path, _elements_from_dicts(data))
+    else:
+        raise ValueError(f"{json_path} is not a grid, points or element JSON")
+    return packed_path
+
+
+def packed_to_json(packed_path, json_path=None):
+    """Writes the JSON equivalent of a packed file (the schema the generators produce); returns its path."""
+    json_path = json_path or os.path.splitext(packed_path)[0] + ".json"
+    data = packed_json_data(open_packed(packed_path))
+    with open(json_path, "w") as f_json:
+        json.dump(data, f_json, indent=4)
+    return json_path
+
+
+if __name__ == "__main__":
+    if len(sys.argv) < 2:
+        print(f"Usage: python packed_meta.py <file.json | file{PACKED_EXTENSION}> [output path]")
+        sys.exit(1)
+    source, target = sys.argv[1], (sys.argv[2] if len(sys.argv) > 2 else None)
+    try:
+        if source.endswith(PACKED_EXTENSION):
+            print(f"Wrote {packed_to_json(source, target)}")
+        else:
+            print(f"Wrote {json_to_packed(source, target)}")
+    except (OSError, ValueError) as e:
+        print(f"Error: {e}")
+        sys.exit(1)
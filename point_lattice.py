@@ -0,0 +1,244 @@
+import json
+import os
+
+import cv2
+import numpy as np
+
+from grid_overlay import GridTemplate
+from packed_format import PACKED_EXTENSION, open_packed
+
+# --- Configuration ---
+POINT_COLOR = (0, 255, 0) # BGR fill of each point square
+POINT_LABEL_COLOR = (255, 255, 0) # BGR text of the primary row labels
+POINT_LABEL_BG_COLOR = (50, 50, 50) # BGR box behind the primary row labels
+POINT_LABEL_FONT = cv2.FONT_HERSHEY_SIMPLEX
+SUB_ROW_LETTERS = 3 # Rows after a primary row labelled "<col>a", "<col>b", ...; later rows get "r<row>c<col>"
+LATTICE_CACHE_SIZE = 16 # Lattices (resolution / rows / cols / primary rows combinations) kept in memory
+
+
+def _row_labels(row, cols, primary_rows, next_number):
+    """Labels of one lattice row and the primary counter after it, as test_points always numbered them."""
+    if row in primary_rows:
+        return [str(number) for number in range(next_number, next_number + cols)], next_number + cols
+    preceding = max((primary for primary in primary_rows if primary < row), default=-1)
+    sub_row = row - (preceding + 1) if preceding != -1 else -1
+    if 0 <= sub_row < SUB_ROW_LETTERS:
+        return [f"{col + 1}{chr(ord('a') + sub_row)}" for col in range(cols)], next_number
+    return [f"r{row + 1}c{col + 1}" for col in range(cols)], next_number
+
+
+class PointLattice:
+    """
+    The labelled rows x cols point lattice of test_points.draw_sparse_points_custom_labels.
+
+    Coordinates live in one (rows, cols, 2) array and labels in a dict to their row-major
+    indices, so resolving a label like "7b" is a dict lookup. Sub-row labels repeat in every
+    block ("1a" follows each primary row); point() takes the occurrence to pick one, the
+    first being the one a scan of the old JSON found. Because the lattice is a product of
+    column and row positions, the nearest point to any pixel is one searchsorted per axis.
+    """
+
+    def __init__(self, width, height, xs, ys, labels, primary_rows):
+        self.width = width
+        self.height = height
+        self.xs = xs  # (cols,) int32 point x positions, increasing
+        self.ys = ys  # (rows,) int32 point y positions, increasing
+        self.rows, self.cols = len(ys), len(xs)
+        self.labels = labels  # Row-major label per point
+        self.primary_rows = primary_rows  # Sorted tuple of 0-based rows with numeric labels
+        self.coords = np.empty((self.rows, self.cols, 2), dtype=np.int32)
+        self.coords[..., 0], self.coords[..., 1] = xs[None, :], ys[:, None]
+        self.index = {} # label -> row-major indices of its occurrences
+        for i, label in enumerate(labels):
+            self.index.setdefault(label, []).append(i)
+        self._templates = {}
+
+    def __repr__(self):
+        return f"PointLattice({self.width}x{self.height}, {self.rows}x{self.cols}, primary_rows={self.primary_rows})"
+
+    def __len__(self):
+        return self.rows * self.cols
+
+    def __contains__(self, label):
+        return str(label).strip().lower() in self.index
+
+    @classmethod
+    def from_size(cls, width, height, rows, cols, primary_rows):
+        """Lays out the lattice with the spacing and rounding test_points has always used."""
+        col_spacing, row_spacing = width / (cols + 1), height / (rows + 1)
+        xs = np.array([int(round(col_spacing * (col + 1))) for col in range(cols)], dtype=np.int32)
+        ys = np.array([int(round(row_spacing * (row + 1))) for row in range(rows)], dtype=np.int32)
+        labels, next_number = [], 1
+        for row in range(rows):
+            row_labels, next_number = _row_labels(row, cols, primary_rows, next_number)
+            labels.extend(row_labels)
+        return cls(width, height, xs, ys, labels, tuple(sorted(primary_rows)))
+
+    @classmethod
+    def from_points_info(cls, points, width=0, height=0):
+        """
+        Rebuilds the lattice from the dicts of a sparse points info JSON.
+
+        Raises:
+            ValueError: If the points do not form a complete row-major lattice
+        """
+        if not points:
+            raise ValueError("Points info holds no points")
+        try:
+            coords = np.array([point["coords_px"] for point in points], dtype=np.int32).reshape(len(points), 2)
+            labels = [str(point["label"]) for point in points]
+        except (KeyError, TypeError, ValueError) as e:
+            raise ValueError(f"Points info entry is missing or malformed: {e}") from e
+        xs, ys = np.unique(coords[:, 0]), np.unique(coords[:, 1])
+        expected = np.stack(np.meshgrid(xs, ys), axis=-1).reshape(-1, 2)
+        if len(xs) * len(ys) != len(points) or not np.array_equal(coords, expected):
+            raise ValueError(f"Points info with {len(points)} points is not a complete row-major lattice")
+        primary_rows = tuple(row for row in range(len(ys)) if labels[row * len(xs)].isdigit())
+        return cls(width, height, xs.astype(np.int32), ys.astype(np.int32), labels, primary_rows)
+
+    @classmethod
+    def from_packed(cls, packed):
+        """
+        Builds the lattice from an opened packed_format "points" file (see packed_meta.pack_points).
+
+        Raises:
+            ValueError: If the file holds another kind of metadata
+        """
+        packed.expect("points")
+        width, height = packed.column("size").tolist()
+        labels = packed.strings("label")
+        return cls(width, height, np.array(packed.column("xs")), np.array(packed.column("ys")),
+                   [labels[i] for i in range(len(labels))], tuple(packed.column("primary_rows").tolist()))
+
+    def _resolve(self, label):
+        indices = self.index.get(str(label).strip().lower())
+        if indices is None:
+            raise ValueError(f"Unknown point label '{label}'")
+        return indices
+
+    def point(self, label, occurrence=0):
+        """
+        (x, y) of a labelled point.
+
+        Args:
+            label (str): Label as drawn or listed in the JSON, e.g. "12" or "7b"
+            occurrence (int): Which repeat of a sub-row label, 0 for the first block
+
+        Raises:
+            ValueError: If the label is unknown or has fewer repeats
+        """
+        indices = self._resolve(label)
+        if not 0 <= occurrence < len(indices):
+            raise ValueError(f"Point label '{label}' occurs {len(indices)} time(s), no occurrence {occurrence}")
+        row, col = divmod(indices[occurrence], self.cols)
+        x, y = self.coords[row, col].tolist()
+        return x, y
+
+    def points(self, label):
+        """(x, y) of every occurrence of a label, in row-major order."""
+        return [tuple(self.coords[divmod(i, self.cols)].tolist()) for i in self._resolve(label)]
+
+    def nearest(self, x, y):
+        """(label, (x, y)) of the lattice point closest to pixel (x, y)."""
+        col, row = self._nearest_position(self.xs, x), self._nearest_position(self.ys, y)
+        px, py = self.coords[row, col].tolist()
+        return self.labels[row * self.cols + col], (px, py)
+
+    @staticmethod
+    def _nearest_position(positions, value):
+        i = int(np.searchsorted(positions, value))
+        if i == len(positions) or (i > 0 and value - positions[i - 1] <= positions[i] - value):
+            i -= 1
+        return i
+
+    def to_points_info(self):
+        """The dicts of the sparse points info JSON (label, coords_px), row-major."""
+        coords = self.coords.reshape(-1, 2).tolist()
+        return [{"label": label, "coords_px": xy} for label, xy in zip(self.labels, coords)]
+
+    def save_json(self, path):
+        """Writes the points info JSON in the format test_points has always produced."""
+        with open(path, "w") as f_json:
+            json.dump(self.to_points_info(), f_json, indent=4)
+
+    def render_overlay(self, point_size=10, label_font_scale=0.7, label_thickness=2):
+        """
+        Rasterizes the point squares and primary row labels on a transparent canvas.
+
+        Shapes are drawn in the original order onto a color and an alpha canvas, as in
+        grid_overlay.render_grid_overlay, giving premultiplied BGRA.
+
+        Returns:
+            np.ndarray: (height, width, 4) uint8 premultiplied BGRA
+        """
+        color = np.zeros((self.height, self.width, 3), dtype=np.uint8)
+        alpha = np.zeros((self.height, self.width), dtype=np.uint8)
+        half_size = point_size // 2
+        for row in range(self.rows):
+            is_primary = row in self.primary_rows
+            for col in range(self.cols):
+                center_x, center_y = self.coords[row, col].tolist()
+                pt1, pt2 = (center_x - half_size, center_y - half_size), (center_x + half_size, center_y + half_size)
+                cv2.rectangle(color, pt1, pt2, POINT_COLOR, -1)
+                cv2.rectangle(alpha, pt1, pt2, 255, -1)
+                if not is_primary:
+                    continue
+                text = self.labels[row * self.cols + col]
+                (text_w, text_h), baseline = cv2.getTextSize(text, POINT_LABEL_FONT, label_font_scale, label_thickness)
+                label_x = max(center_x - half_size - text_w - 5, 0)
+                label_y = max(center_y + text_h // 2, text_h)
+                bg_pt1 = (label_x - 2, label_y - text_h - baseline - 2)
+                bg_pt2 = (label_x + text_w + 2, label_y + baseline + 2)
+                cv2.rectangle(color, bg_pt1, bg_pt2, POINT_LABEL_BG_COLOR, -1)
+                cv2.rectangle(alpha, bg_pt1, bg_pt2, 255, -1)
+                for canvas, paint in ((color, POINT_LABEL_COLOR), (alpha, 255)):
+                    cv2.putText(canvas, text, (label_x, label_y), POINT_LABEL_FONT, label_font_scale, paint,
+                                label_thickness, cv2.LINE_AA)
+        return np.dstack((color, alpha))
+
+    def template(self, point_size=10, label_font_scale=0.7, label_thickness=2):
+        """The overlay as a GridTemplate (apply(img) composites it), rendered once per drawing style."""
+        style = (point_size, label_font_scale, label_thickness)
+        template = self._templates.get(style)
+        if template is None:
+            key = (self.width, self.height, self.rows, self.cols, self.primary_rows) + style
+            template = self._templates[style] = GridTemplate(key, self.render_overlay(*style))
+        return template
+
+
+_lattices = {}
+
+
+def _memoized(key, factory):
+    lattice = _lattices.get(key)
+    if lattice is None:
+        if len(_lattices) >= LATTICE_CACHE_SIZE:
+            _lattices.pop(next(iter(_lattices)))
+        lattice = _lattices[key] = factory()
+    return lattice
+
+
+def get_point_lattice(width, height, rows=16, cols=9, primary_rows=(0, 4, 8, 12)):
+    """Returns the shared PointLattice for a resolution, size and set of primary rows, computing it on first use."""
+    key = (int(width), int(height), int(rows), int(cols), tuple(sorted(int(row) for row in primary_rows)))
+    return _memoized(key, lambda: PointLattice.from_size(*key))
+
+
+def load_point_lattice(json_path):
+    """
+    Loads a sparse points info JSON (or its packed_meta ".pmeta" form) as a PointLattice,
+    reparsing only when the file changes.
+
+    Raises:
+        OSError: If the file cannot be read
+        ValueError: If it is not valid JSON / packed metadata or not a complete lattice
+    """
+    stat = os.stat(json_path)
+    key = (os.path.abspath(json_path), stat.st_mtime_ns, stat.st_size)
+
+    def load():
+        if json_path.endswith(PACKED_EXTENSION):
+            return PointLattice.from_packed(open_packed(json_path))
+        with open(json_path, "r") as f:
+            return PointLattice.from_points_info(json.load(f))
+    return _memoized(key, load)
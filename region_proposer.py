@@ -0,0 +1,136 @@
+import cv2
+import numpy as np
+
+from android_element import AndroidElement
+
+# --- Configuration ---
+PROPOSAL_MAX_SIDE = 640 # Frames are downscaled so their longest side is at most this many pixels
+CANNY_LOW, CANNY_HIGH = 40, 120 # Edge thresholds on the downscaled, blurred gray frame
+MIN_REGION_SIDE = 0.02 # Minimum box side as a fraction of the frame width
+MAX_REGION_AREA = 0.25 # Boxes covering more of the frame are containers, not targets
+MIN_RECTANGULARITY = 0.7 # Contour area / box area needed to count as a (rounded) rectangle
+TEXT_JOIN_FRACTION = 0.025 # Horizontal gap (fraction of width) bridged when grouping MSER glyphs into words
+NMS_IOU = 0.5 # Overlapping proposals above this IoU are merged into the best-scoring one
+MAX_PROPOSALS = 80 # Upper bound on returned boxes, best score first before reordering
+
+
+def _downscale(img):
+    """Gray frame whose longest side is at most PROPOSAL_MAX_SIDE, plus the scale back to full size."""
+    gray = cv2.cvtColor(img, cv2.COLOR_BGR2GRAY) if img.ndim == 3 else img
+    height, width = gray.shape
+    factor = min(1.0, PROPOSAL_MAX_SIDE / max(height, width))
+    if factor < 1.0:
+        gray = cv2.resize(gray, (int(width * factor), int(height * factor)), interpolation=cv2.INTER_AREA)
+    return gray, 1.0 / factor
+
+
+def _shape_boxes(gray):
+    """Closed edge contours that look like buttons, cards, icons or rounded rects: (boxes, scores)."""
+    edges = cv2.Canny(cv2.GaussianBlur(gray, (3, 3), 0), CANNY_LOW, CANNY_HIGH)
+    edges = cv2.morphologyEx(edges, cv2.MORPH_CLOSE, np.ones((3, 3), np.uint8))
+    contours, _ = cv2.findContours(edges, cv2.RETR_LIST, cv2.CHAIN_APPROX_SIMPLE)
+    boxes, scores = [], []
+    for contour in contours:
+        x, y, w, h = cv2.boundingRect(contour)
+        hull_area = cv2.contourArea(cv2.convexHull(contour))
+        rectangularity = hull_area / float(w * h) if w and h else 0.0
+        if rectangularity >= MIN_RECTANGULARITY:
+            boxes.append((x, y, x + w, y + h))
+            scores.append(rectangularity)
+    return boxes, scores
+
+
+def _text_boxes(gray):
+    """MSER glyph blobs joined horizontally into word / line boxes: (boxes, scores)."""
+    height, width = gray.shape
+    mser = cv2.MSER_create()
+    mser.setMinArea(max(int(width * height * 0.00002), 8))
+    mser.setMaxArea(int(width * height * 0.005))
+    _, blobs = mser.detectRegions(gray)
+    if len(blobs) == 0:
+        return [], []
+    mask = np.zeros_like(gray)
+    blobs = np.asarray(blobs).reshape(-1, 4)
+    for x, y, w, h in blobs.tolist():
+        if h <= height * 0.06 and w <= h * 3: # Glyph-sized, not wide bars
+            mask[y:y + h, x:x + w] = 255
+    kernel = cv2.getStructuringElement(cv2.MORPH_RECT, (max(int(width * TEXT_JOIN_FRACTION), 3), 3))
+    contours, _ = cv2.findContours(cv2.dilate(mask, kernel), cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
+    boxes = []
+    for contour in contours:
+        x, y, w, h = cv2.boundingRect(contour)
+        boxes.append((x, y, x + w, y + h))
+    return boxes, [0.6] * len(boxes) # Text is a weaker hint than a closed shape
+
+
+def _size_mask(boxes, width, height):
+    """Boxes large enough to tap and small enough not to be a whole panel."""
+    sides = boxes[:, 2:] - boxes[:, :2]
+    return (sides.min(axis=1) >= MIN_REGION_SIDE * width) & \
+           (sides[:, 0] * sides[:, 1] <= MAX_REGION_AREA * width * height)
+
+
+def _nms(boxes, scores, iou_threshold=NMS_IOU):
+    """Indices of boxes kept by greedy non-maximum suppression, best score first."""
+    order = np.argsort(-scores, kind="stable")
+    areas = (boxes[:, 2] - boxes[:, 0]) * (boxes[:, 3] - boxes[:, 1])
+    keep = []
+    while len(order) and len(keep) < MAX_PROPOSALS:
+        best, rest = order[0], order[1:]
+        keep.append(int(best))
+        ix = np.clip(np.minimum(boxes[best, 2], boxes[rest, 2]) - np.maximum(boxes[best, 0], boxes[rest, 0]), 0, None)
+        iy = np.clip(np.minimum(boxes[best, 3], boxes[rest, 3]) - np.maximum(boxes[best, 1], boxes[rest, 1]), 0, None)
+        inter = ix * iy
+        order = rest[inter / (areas[best] + areas[rest] - inter + 1e-9) <= iou_threshold]
+    return keep
+
+
+def propose_regions(image):
+    """
+    Candidate interactive regions from pixels alone, for screens whose XML dump is missing or useless.
+
+    Closed edge contours with a (rounded) rectangular outline and MSER text groups are
+    detected on a downscaled gray frame, filtered by size, deduplicated by NMS and mapped
+    back to full-resolution coordinates.
+
+    Args:
+        image: Screenshot path or BGR numpy array
+
+    Returns:
+        list: AndroidElement objects (attrib_name "clickable", desc "vision:shape" or
+              "vision:text") in reading order, ready for draw_bounding_boxes_on_image
+    """
+    img = cv2.imread(image) if isinstance(image, str) else image
+    if img is None:
+        print(f"Error: Could not read image from {image}")
+        return []
+    gray, scale = _downscale(img)
+    height, width = gray.shape
+
+    shape_boxes, shape_scores = _shape_boxes(gray)
+    text_boxes, text_scores = _text_boxes(gray)
+    boxes = np.asarray(shape_boxes + text_boxes, dtype=np.float64).reshape(-1, 4)
+    scores = np.asarray(shape_scores + text_scores, dtype=np.float64)
+    kinds = ["shape"] * len(shape_boxes) + ["text"] * len(text_boxes)
+    keep = _size_mask(boxes, width, height)
+    boxes, scores = boxes[keep], scores[keep]
+    kinds = [kind for kind, kept in zip(kinds, keep.tolist()) if kept]
+    if not len(boxes):
+        return []
+
+    keep = _nms(boxes, scores)
+    keep.sort(key=lambda i: (boxes[i, 1] // 8, boxes[i, 0])) # Reading order, rows of ~8 px tolerance
+    full_height, full_width = img.shape[:2]
+    elements = []
+    for i in keep:
+        x1, y1, x2, y2 = np.round(boxes[i] * scale).astype(int).tolist()
+        x2, y2 = min(x2, full_width), min(y2, full_height)
+        elements.append(AndroidElement(
+            uid=f"vision_{kinds[i]}_{x2 - x1}_{y2 - y1}_{x1}_{y1}",
+            bbox=((x1, y1), (x2, y2)),
+            attrib_name="clickable",
+            attrib_value="true",
+            text="",
+            desc=f"vision:{kinds[i]}",
+        ))
+    return elements
@@ -0,0 +1,309 @@
+import re
+
+import numpy as np
+
+from element_index import ElementIndex
+from ui_tree import FLAG_NAMES, UiTree
+
+# --- Configuration ---
+COMPILED_CACHE_SIZE = 256 # Selector strings kept compiled; automation loops reuse a handful
+# Selector attribute name -> UiTree string column
+ATTRIBUTE_ALIASES = {
+    "class": "class", "id": "resource-id", "resource-id": "resource-id", "text": "text",
+    "desc": "content-desc", "content-desc": "content-desc", "package": "package",
+}
+AXES = ("descendant", "child", "parent", "ancestor", "sibling")
+DEFAULT_AXIS = "descendant" # Axis of a ">>" step that does not name one
+
+_TOKEN_PATTERN = re.compile(r"""
+    \s*(?:
+        (?P<chain>>>)
+      | (?P<op>~=|\^=|\$=|!=|=)
+      | (?P<punct>[\[\]!*])
+      | "(?P<dq>(?:[^"\\]|\\.)*)"
+      | '(?P<sq>(?:[^'\\]|\\.)*)'
+      | (?P<name>[^\s\[\]"'=~^$!>*]+)
+    )""", re.VERBOSE)
+_compiled = {}
+
+
+class _Condition:
+    """One attribute test, evaluated as a vectorized mask over every row of a tree."""
+
+    def __init__(self, attribute, op, value):
+        self.attribute = attribute
+        self.op = op
+        self.value = value
+        if attribute in FLAG_NAMES:
+            if op not in (None, "=", "!="):
+                raise ValueError(f"Operator '{op}' is not supported for flag '{attribute}'")
+            wanted = value is None or value.lower() == "true"
+            self.flag_value = wanted if op != "!=" else not wanted
+            self.test = None
+        else:
+            self.test = _string_test(attribute, op, value)
+
+    def mask(self, tree):
+        if self.test is None:
+            column = tree.flag(self.attribute)
+            return column if self.flag_value else ~column
+        column = tree.strings[self.attribute]
+        matching = [code for code, value in enumerate(column.table) if self.test(value)]
+        return np.isin(column.codes, matching)
+
+    def index_lookup(self, index):
+        """Rows from the ElementIndex for indexable terms, None if the term needs a scan."""
+        if self.op != "=":
+            if self.op == "~=" and self.attribute in ("text", "content-desc"):
+                return index.contains(self.value, fields=(self.attribute,))
+            return None
+        if self.attribute == "class":
+            return index.by_class(self.value)
+        if self.attribute == "resource-id":
+            return index.by_resource_id(self.value)
+        if self.attribute in ("text", "content-desc", "package"):
+            return index.by_value(self.attribute, self.value)
+        return None
+
+
+def _string_test(attribute, op, value):
+    """Closure value -> bool for one string attribute test."""
+    if value is None:
+        return bool # [text] means "has a non-empty text"
+    if op == "~=":
+        needle = value.lower()
+        return lambda candidate: needle in candidate.lower()
+    if op == "^=":
+        return lambda candidate: candidate.startswith(value)
+    if op == "$=":
+        return lambda candidate: candidate.endswith(value)
+    if attribute == "class" and "." not in value: # Simple name matches any package, like ElementIndex.by_class
+        exact = lambda candidate: candidate == value or candidate.rsplit(".", 1)[-1] == value
+    elif attribute == "resource-id" and "/" not in value: # Bare id name, like ElementIndex.by_resource_id
+        exact = lambda candidate: candidate == value or candidate.endswith("/" + value)
+    else:
+        exact = lambda candidate: candidate == value
+    return exact if op == "=" else (lambda candidate: not exact(candidate))
+
+
+class _Step:
+    __slots__ = ("axis", "conditions")
+
+    def __init__(self, axis, conditions):
+        self.axis = axis
+        self.conditions = conditions
+
+
+class Selector:
+    """
+    A compiled UI hierarchy query.
+
+    Syntax: steps joined by ">>", each step being `[axis] [term] [filter]...`
+        term     class name (`Button`, `android.widget.Button`), `attr=value` or `*`
+        filter   `[flag]`, `[!flag]`, `[attr]` (non-empty) or `[attr op "value"]`
+        op       `=` exact, `!=`, `~=` case-insensitive contains, `^=` prefix, `$=` suffix
+        axis     descendant (default), child, parent, ancestor, sibling
+    Attributes: class, id / resource-id, text, desc / content-desc, package and the UiTree flags.
+
+    Example:
+        class=android.widget.Button[text~="Sign in"] >> descendant[clickable]
+    """
+
+    def __init__(self, source):
+        self.source = source
+        self.steps = _parse(source)
+
+    def __repr__(self):
+        return f"Selector({self.source!r})"
+
+    def select(self, tree):
+        """Matching rows of `tree` in document order, memoized per snapshot."""
+        return tree.cached(("selector", self.source), self._evaluate)
+
+    def select_one(self, tree):
+        """First matching row in document order, or -1."""
+        rows = self.select(tree)
+        return int(rows[0]) if len(rows) else -1
+
+    def elements(self, tree, attrib_name="clickable"):
+        """AndroidElement views of the matching rows."""
+        return tree.elements(self.select(tree), attrib_name)
+
+    def _evaluate(self, tree):
+        current = None
+        for step in self.steps:
+            mask = _step_mask(tree, step, seed=current is None)
+            if current is not None:
+                mask &= _axis_mask(tree, step.axis, current)
+            current = np.flatnonzero(mask)
+            if not len(current):
+                break
+        return current
+
+
+def _step_mask(tree, step, seed):
+    """Mask of rows satisfying every condition of `step`; the first step starts from an index lookup."""
+    mask = None
+    remaining = step.conditions
+    if seed:
+        index = ElementIndex.for_tree(tree)
+        for i, condition in enumerate(step.conditions):
+            rows = condition.index_lookup(index)
+            if rows is not None:
+                mask = np.zeros(len(tree), dtype=bool)
+                mask[rows] = True
+                remaining = step.conditions[:i] + step.conditions[i + 1:]
+                break
+    if mask is None:
+        mask = np.ones(len(tree), dtype=bool)
+    for condition in remaining:
+        if not mask.any():
+            break
+        mask &= condition.mask(tree)
+    return mask
+
+
+def _axis_mask(tree, axis, rows):
+    """Mask of rows related to any of `rows` along `axis`."""
+    count = len(tree)
+    mask = np.zeros(count, dtype=bool)
+    if axis == "descendant": # Pre-order rows: a subtree is the contiguous range (row, subtree_end)
+        delta = np.zeros(count + 1, dtype=np.int32)
+        np.add.at(delta, rows + 1, 1)
+        np.add.at(delta, tree.subtree_end()[rows], -1)
+        return np.cumsum(delta[:-1]) > 0
+    if axis == "child":
+        return np.isin(tree.parent, rows)
+    parents = tree.parent[rows]
+    if axis == "sibling":
+        mask = np.isin(tree.parent, parents)
+        mask[rows] = False
+        return mask
+    while len(parents): # parent / ancestor
+        parents = parents[parents >= 0]
+        mask[parents] = True
+        if axis == "parent":
+            break
+        parents = np.unique(tree.parent[parents])
+    return mask
+
+
+def _tokenize(source):
+    tokens = []
+    position = 0
+    source = source.rstrip()
+    while position < len(source):
+        match = _TOKEN_PATTERN.match(source, position)
+        if match is None or match.end() == position:
+            raise ValueError(f"Invalid selector {source!r}: unexpected character at {position}")
+        kind = match.lastgroup
+        value, start = match.group(kind), match.start(kind)
+        if kind in ("dq", "sq"):
+            kind, value = "string", re.sub(r"\\(.)", r"\1", value)
+        tokens.append((kind, value, start))
+        position = match.end()
+    return tokens
+
+
+def _parse(source):
+    tokens = _tokenize(source)
+    position = 0
+
+    def peek(offset=0):
+        index = position + offset
+        return tokens[index] if index < len(tokens) else (None, None, len(source))
+
+    def fail(message):
+        raise ValueError(f"Invalid selector {source!r}: {message} at {peek()[2]}")
+
+    def attribute(name):
+        name = ATTRIBUTE_ALIASES.get(name, name)
+        if name not in FLAG_NAMES and name not in ATTRIBUTE_ALIASES.values():
+            fail(f"unknown attribute '{name}'")
+        return name
+
+    def value():
+        nonlocal position
+        kind, text, _ = peek()
+        if kind not in ("name", "string"):
+            fail("expected a value")
+        position += 1
+        return text
+
+    steps = []
+    while True:
+        axis = DEFAULT_AXIS if steps else None
+        conditions = []
+        start = position
+        kind, text, _ = peek()
+        if kind == "name" and text in AXES and peek(1)[0] != "op":
+            if not steps:
+                fail(f"axis '{text}' needs a previous step")
+            axis = text
+            position += 1
+            kind, text, _ = peek()
+        if kind == "punct" and text == "*":
+            position += 1
+        elif kind == "name":
+            position += 1
+            if peek()[0] == "op":
+                op = peek()[1]
+                position += 1
+                conditions.append(_Condition(attribute(text), op, value()))
+            else:
+                conditions.append(_Condition("class", "=", text))
+        while peek()[:2] == ("punct", "["):
+            position += 1
+            negated = peek()[:2] == ("punct", "!")
+            if negated:
+                position += 1
+            if peek()[0] != "name":
+                fail("expected an attribute name")
+            name = attribute(peek()[1])
+            position += 1
+            if peek()[0] == "op" and not negated:
+                op = peek()[1]
+                position += 1
+                conditions.append(_Condition(name, op, value()))
+            elif name in FLAG_NAMES:
+                conditions.append(_Condition(name, "!=" if negated else "=", "true"))
+            elif negated:
+                conditions.append(_Condition(name, "=", ""))
+            else:
+                conditions.append(_Condition(name, None, None))
+            if peek()[:2] != ("punct", "]"):
+                fail("expected ']'")
+            position += 1
+        if position == start:
+            fail("expected a step")
+        steps.append(_Step(axis, conditions))
+        if peek()[0] is None:
+            return steps
+        if peek()[0] != "chain":
+            fail("expected '>>'")
+        position += 1
+
+
+def compile_selector(source):
+    """
+    Compiles a selector string, reusing the compiled form for strings seen before.
+
+    Raises:
+        ValueError: If the selector is malformed or names an unknown attribute
+    """
+    selector = _compiled.get(source)
+    if selector is None:
+        if len(_compiled) >= COMPILED_CACHE_SIZE:
+            _compiled.pop(next(iter(_compiled)))
+        selector = _compiled[source] = Selector(source)
+    return selector
+
+
+def select(tree, source):
+    """Rows of `tree` matching the selector string `source`."""
+    return compile_selector(source).select(tree)
+
+
+def query_xml(source, selector, attrib_name="clickable", backend=None):
+    """Parses a dump (path or bytes) and returns AndroidElement views of the rows matching `selector`."""
+    return compile_selector(selector).elements(UiTree.from_xml(source, backend), attrib_name)
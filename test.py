@@ -12,6 +12,11 @@ from PIL import Image
 import requests # Make sure 'requests' is installed: pip install requests
 import base64   # For encoding images for OpenAI
 
+from grid_geometry import POINT_NAMES, load_grid_geometry
+from zoom_grid import refine_tap_point
+from contact_sheet import choose_element
+from annotated_screenshot_generator import traverse_xml_tree
+
 # --- Utility Function (from your utils.py) ---
 try:
     from colorama import Fore, Style
@@ -93,28 +98,6 @@ class OpenAIModel(BaseModel): # (Ensure full class definition is here)
         except requests.exceptions.RequestException as e: return False, f"OpenAI API Request failed: {e}"
         except Exception as e: return False, f"OpenAI unexpected error: {e}"
 
-def get_coordinates_from_cell_info(cell_info: dict, point_name_key: str) -> tuple[int, int] | None:
-    if not cell_info: return None
-    point_name_key = point_name_key.lower()
-    if point_name_key == "center":
-        return tuple(cell_info.get("center_px", [])) if cell_info.get("center_px") else None
-    q_centers = cell_info.get("quadrant_centers_px", {})
-    quadrant_map = {
-        "top_left_quadrant": "top_left", "top_right_quadrant": "top_right",
-        "bottom_left_quadrant": "bottom_left", "bottom_right_quadrant": "bottom_right"
-    }
-    if point_name_key in quadrant_map:
-        return tuple(q_centers.get(quadrant_map[point_name_key], [])) if q_centers.get(quadrant_map[point_name_key]) else None
-    bounds = cell_info.get("bounds_px", [])
-    if len(bounds) == 4:
-        x_min, y_min, x_max, y_max = bounds
-        if point_name_key == "top_left_corner": return (x_min, y_min)
-        if point_name_key == "top_right_corner": return (x_max, y_min) # Assuming x_max is inclusive for corner
-        if point_name_key == "bottom_left_corner": return (x_min, y_max) # Assuming y_max is inclusive for corner
-        if point_name_key == "bottom_right_corner": return (x_max, y_max) # Assuming x_max, y_max are inclusive
-    return None
-
-
 def get_play_store_tap_coordinates_visual_choice( # Renamed
     llm_instance: BaseModel,
     original_screenshot_path: str,
@@ -125,10 +108,7 @@ def get_play_store_tap_coordinates_visual_choice( # Renamed
         print_with_color("One or more input files not found.", "red"); return None
 
     try:
-        with open(grid_info_json_path, 'r') as f:
-            grid_cells_data_list = json.load(f) # Load for local lookup
-        if not grid_cells_data_list:
-            print_with_color("Grid info JSON is empty.", "red"); return None
+        grid_geometry = load_grid_geometry(grid_info_json_path) # Memoized array form for local lookup
     except Exception as e:
         print_with_color(f"Error reading grid_info.json: {e}", "red"); return None
 
@@ -219,30 +199,18 @@ Respond ONLY with a single JSON object in the following format. Do NOT include a
             print_with_color(f"  - {point_name}: {score}", "yellow")
         print_with_color(f"LLM Recommended Point Name (normalized): '{recommended_point_name_from_llm}'", "green")
 
-        # These are the keys our get_coordinates_from_cell_info function expects
-        valid_point_name_keys_for_lookup = [
-            "center", "top_left_quadrant", "top_right_quadrant",
-            "bottom_left_quadrant", "bottom_right_quadrant",
-            "top_left_corner", "top_right_corner",
-            "bottom_left_corner", "bottom_right_corner"
-        ]
-        if recommended_point_name_from_llm not in valid_point_name_keys_for_lookup:
+        # These are the point names GridGeometry resolves
+        if recommended_point_name_from_llm not in POINT_NAMES:
             print_with_color(f"Invalid 'recommended_point_name' from LLM after normalization: '{recommended_point_name_from_llm}'", "red")
             return None
 
-        target_cell_info = next((cell for cell in grid_cells_data_list if cell.get("cell_id") == target_cell_id), None)
-        if not target_cell_info:
-            print_with_color(f"Grid cell ID {target_cell_id} (from LLM) not found in OUR JSON data.", "red"); return None
-        
-        # Use the new helper function to get coordinates based on the LLM's chosen point name
-        final_coordinates = get_coordinates_from_cell_info(target_cell_info, recommended_point_name_from_llm)
-            
-        if not final_coordinates or len(final_coordinates) != 2:
-            print_with_color(f"Could not retrieve valid coordinates for '{recommended_point_name_from_llm}' in cell {target_cell_id} from OUR JSON.", "red")
-            print_with_color(f"Cell Info: {target_cell_info}", "yellow")
-            return None
+        # Direct index into the (rows, cols, 9, 2) point array
+        try:
+            final_coordinates = grid_geometry.point(target_cell_id, recommended_point_name_from_llm)
+        except ValueError as e:
+            print_with_color(f"Grid cell ID {target_cell_id} (from LLM) not found in OUR JSON data: {e}", "red"); return None
 
-        return tuple(final_coordinates)
+        return final_coordinates
 
     except json.JSONDecodeError:
         print_with_color(f"Failed to decode LLM response as JSON. Response was:\n{response_text}", "red"); return None
@@ -253,11 +221,14 @@ if __name__ == "__main__":
     # For security, prefer environment variables or a config file in real applications
     GEMINI_API_KEY = ""
     OPENAI_API_KEY = ""
+    USE_ZOOM_REFINEMENT = False # Coarse grid, then zoomed sub-grids on crops (zoom_grid.py) instead of nine scored sub-points
+    USE_CONTACT_SHEET = False # Pick among the clickable XML elements on one small contact sheet (contact_sheet.py)
 
 
     original_screenshot_path = r"C:\Users\lonel\Desktop\Study\AI Agent for android\14th\Navi_Agent_1\grid_test_output\test_0_grid_orig.png"
     gridded_screenshot_path = r"C:\Users\lonel\Desktop\Study\AI Agent for android\14th\Navi_Agent_1\grid_test_output\test_0_gridded.png"
     grid_info_json_path = r"C:\Users\lonel\Desktop\Study\AI Agent for android\14th\Navi_Agent_1\grid_test_output\test_0_grid_info.json"
+    ui_xml_path = r"C:\Users\lonel\Desktop\Study\AI Agent for android\14th\Navi_Agent_1\grid_test_output\test_0_grid.xml"
 
     if "YOUR_GEMINI_API_KEY_HERE" in GEMINI_API_KEY and "YOUR_OPENAI_API_KEY_HERE" in OPENAI_API_KEY:
         print_with_color("Please set your API keys.", "red"); exit(1)
@@ -278,13 +249,30 @@ if __name__ == "__main__":
     else:
         print_with_color("Invalid choice.", "red"); exit()
 
-    if llm_instance:
+    if llm_instance and USE_CONTACT_SHEET:
+        candidates = []
+        traverse_xml_tree(ui_xml_path, candidates, "clickable", 10)
+        chosen, sheet = choose_element(llm_instance, original_screenshot_path, candidates, "the Google Play Store app icon")
+        if sheet is not None:
+            print_with_color(f"Contact sheet with {len(sheet)} elements, {sheet.image.shape[1]}x{sheet.image.shape[0]}", "yellow")
+        coordinates = None
+        if chosen is not None:
+            (x1, y1), (x2, y2) = chosen.bbox
+            coordinates = ((x1 + x2) // 2, (y1 + y2) // 2)
+    elif llm_instance and USE_ZOOM_REFINEMENT:
+        zoom_result = refine_tap_point(llm_instance, original_screenshot_path, "the Google Play Store app icon")
+        for zoom_round in zoom_result.rounds:
+            print_with_color(f"Zoom round {zoom_round.level}: region {zoom_round.region}, cell {zoom_round.cell_id}, "
+                             f"{zoom_round.image_bytes // 1024} KB sent", "yellow")
+        coordinates = zoom_result.point
+    elif llm_instance:
         coordinates = get_play_store_tap_coordinates_visual_choice( # Called the new function
             llm_instance,
             original_screenshot_path,
             gridded_screenshot_path,
             grid_info_json_path
         )
+    if llm_instance:
         if coordinates:
             print_with_color(f"\n>>> Final Recommended Tap Coordinates for Play Store: {coordinates}", "green")
         else:
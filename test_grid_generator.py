@@ -1,6 +1,5 @@
 import cv2
 import os
-import json
 import sys # For device selection
 import numpy as np # Potentially needed if and_controller uses it for image fallbacks
 
@@ -10,6 +9,10 @@ try:
     from .utils import print_with_color
     from .and_controller import AndroidController, list_all_devices
     from .config import load_config # AndroidController uses configs
+    from .grid_overlay import get_grid_template
+    from .grid_geometry import get_grid_geometry
+    from .artifact_writer import FLUSH_TIMEOUT, wait, write_image
+    from .packed_meta import PACKED_EXTENSION, pack_grid
 except ImportError:
     print("Error: Make sure this script is in the 'scripts' directory and can import other modules.")
     print("Alternatively, copy the necessary classes/functions (AndroidController, utils) into this script.")
@@ -31,10 +34,13 @@ except FileNotFoundError:
 
 
 # --- The Grid Drawing Function (Copied from previous response) ---
-def draw_grid_and_get_info(controller, output_dir, prefix, grid_rows=10, grid_cols=4, dark_mode=False):
+def draw_grid_and_get_geometry(controller, output_dir, prefix, grid_rows=10, grid_cols=4, dark_mode=False,
+                               save_json=False, save_packed=False):
     """
-    Takes a screenshot, draws a grid, labels grid cells, and saves info
-    including cell center and quadrant centers.
+    Takes a screenshot, draws a grid, labels grid cells, and returns the grid geometry
+    (cell bounds, center and quadrant centers) as a GridGeometry. The grid info JSON is
+    written only when save_json is True; save_packed writes the ~10x smaller packed_meta
+    file next to it, which grid_geometry.load_grid_geometry reads without a parse step.
     """
     if not controller:
         print_with_color("AndroidController instance is required.", "red")
@@ -59,105 +65,52 @@ def draw_grid_and_get_info(controller, output_dir, prefix, grid_rows=10, grid_co
         print_with_color("Image has zero dimensions, cannot draw grid.", "red")
         return screenshot_path, xml_path, None
 
-    if dark_mode:
-        line_color, text_color, text_bg_color = (200, 200, 200), (255, 255, 255), (50, 50, 50)
-    else:
-        line_color, text_color, text_bg_color = (50, 50, 50), (0, 0, 0), (220, 220, 220)
-
-    cell_height_exact = img_height / grid_rows # Use float for precise quadrant calc later
-    cell_width_exact = img_width / grid_cols  # Use float for precise quadrant calc later
-
-    # For drawing lines, use integer division as before
-    cell_draw_height = img_height // grid_rows
-    cell_draw_width = img_width // grid_cols
-
-    for i in range(1, grid_rows):
-        y = i * cell_draw_height
-        cv2.line(img, (0, y), (img_width, y), line_color, 1)
-    for i in range(1, grid_cols):
-        x = i * cell_draw_width
-        cv2.line(img, (x, 0), (x, img_height), line_color, 1)
-
-    grid_cell_info_list = []
-    cell_number = 1
-
-    # 3. Get coordinates and 4. Label grids
-    for r in range(grid_rows):
-        for c in range(grid_cols):
-            # Use exact float values for boundary calculations for higher precision of quadrant centers
-            x1_exact = c * cell_width_exact
-            y1_exact = r * cell_height_exact
-            x2_exact = (c + 1) * cell_width_exact
-            y2_exact = (r + 1) * cell_height_exact
-
-            # For cell bounds in JSON and center, integer rounding is fine
-            x1_int = int(round(x1_exact))
-            y1_int = int(round(y1_exact))
-            # Ensure x2/y2 are at least x1/y1 + 1 if they round to the same due to small cells
-            x2_int = max(x1_int + 1, int(round(x2_exact)))
-            y2_int = max(y1_int + 1, int(round(y2_exact)))
-
-
-            current_cell_width = x2_exact - x1_exact
-            current_cell_height = y2_exact - y1_exact
-
-            center_x = x1_exact + current_cell_width / 2
-            center_y = y1_exact + current_cell_height / 2
-
-            # --- START OF MODIFICATION ---
-            # Calculate quadrant centers using the exact float boundaries and dimensions
-            q_centers = {
-                "top_left": [
-                    int(round(x1_exact + current_cell_width * 0.25)),
-                    int(round(y1_exact + current_cell_height * 0.25))
-                ],
-                "top_right": [
-                    int(round(x1_exact + current_cell_width * 0.75)),
-                    int(round(y1_exact + current_cell_height * 0.25))
-                ],
-                "bottom_left": [
-                    int(round(x1_exact + current_cell_width * 0.25)),
-                    int(round(y1_exact + current_cell_height * 0.75))
-                ],
-                "bottom_right": [
-                    int(round(x1_exact + current_cell_width * 0.75)),
-                    int(round(y1_exact + current_cell_height * 0.75))
-                ]
-            }
-            # --- END OF MODIFICATION ---
-
-            label_pos_x, label_pos_y = x1_int + 5, y1_int + 20
-            label_text = str(cell_number)
-            (text_w, text_h), _ = cv2.getTextSize(label_text, cv2.FONT_HERSHEY_SIMPLEX, 0.6, 1)
-            if label_pos_y - text_h - 2 > 0 and label_pos_x + text_w + 2 < img_width:
-                cv2.rectangle(img, (label_pos_x - 2, label_pos_y - text_h - 2),
-                              (label_pos_x + text_w + 2, label_pos_y + 2), text_bg_color, -1)
-            cv2.putText(img, label_text, (label_pos_x, label_pos_y),
-                        cv2.FONT_HERSHEY_SIMPLEX, 0.8, text_color, 2, cv2.LINE_AA)
-
-            grid_cell_info_list.append({
-                "cell_id": cell_number,
-                "bounds_px": [x1_int, y1_int, x2_int, y2_int],
-                "center_px": [int(round(center_x)), int(round(center_y))],
-                "quadrant_centers_px": q_centers # --- MODIFICATION: Add quadrant centers ---
-            })
-            cell_number += 1
+    # Lines and cell labels are rasterized once per resolution / grid / theme and composited here
+    get_grid_template(img_width, img_height, grid_rows, grid_cols, dark_mode).apply(img)
+
+    # 3. Get coordinates: every cell bound and tap point as arrays, memoized per screen size and grid
+    grid_geometry = get_grid_geometry(img_width, img_height, grid_rows, grid_cols)
 
     annotated_image_filename = f"{prefix}_gridded.png"
     annotated_image_path = os.path.join(output_dir, annotated_image_filename)
-    cv2.imwrite(annotated_image_path, img)
+    # Encoded on the artifact writer's pool while the grid info is saved; waited for before returning
+    annotated_image_path = write_image(annotated_image_path, img)
+    if annotated_image_path is None:
+        print_with_color("Annotated grid image dropped: artifact queue full.", "red")
+        return None, xml_path, grid_geometry
+
+    if save_json:
+        grid_info_filename = f"{prefix}_grid_info.json"
+        grid_info_path = os.path.join(output_dir, grid_info_filename)
+        try:
+            grid_geometry.save_json(grid_info_path)
+            print_with_color(f"Grid cell info (with quadrant centers) saved to: {grid_info_path}", "green")
+        except Exception as e:
+            print_with_color(f"Error saving grid info JSON: {e}", "red")
+    if save_packed:
+        grid_info_path = os.path.join(output_dir, f"{prefix}_grid_info{PACKED_EXTENSION}")
+        try:
+            pack_grid(grid_info_path, grid_geometry)
+            print_with_color(f"Packed grid cell info saved to: {grid_info_path}", "green")
+        except (OSError, ValueError) as e:
+            print_with_color(f"Error saving packed grid info: {e}", "red")
+
+    if not wait([annotated_image_path], FLUSH_TIMEOUT): # Callers read or upload the file right away
+        print_with_color(f"Error saving annotated grid image {annotated_image_path}", "red")
+        return None, xml_path, grid_geometry
     print_with_color(f"Annotated grid image saved to: {annotated_image_path}", "green")
+    return annotated_image_path, xml_path, grid_geometry
 
-    grid_info_filename = f"{prefix}_grid_info.json"
-    grid_info_path = os.path.join(output_dir, grid_info_filename)
-    try:
-        with open(grid_info_path, 'w') as f_json:
-            json.dump(grid_cell_info_list, f_json, indent=4)
-        print_with_color(f"Grid cell info (with quadrant centers) saved to: {grid_info_path}", "green")
-    except Exception as e:
-        print_with_color(f"Error saving grid info JSON: {e}", "red")
-
-    return annotated_image_path, xml_path, grid_cell_info_list
+def draw_grid_and_get_info(controller, output_dir, prefix, grid_rows=10, grid_cols=4, dark_mode=False,
+                           save_json=False, save_packed=False):
+    """
+    Takes a screenshot, draws a grid, labels grid cells, and returns the cell info
+    including cell center and quadrant centers, as the list of dicts of the grid info
+    JSON. See draw_grid_and_get_geometry for the array form.
+    """
+    annotated_image_path, xml_path, grid_geometry = draw_grid_and_get_geometry(
+        controller, output_dir, prefix, grid_rows, grid_cols, dark_mode, save_json, save_packed)
+    return annotated_image_path, xml_path, grid_geometry.to_cell_info() if grid_geometry is not None else None
 
 # --- Main execution logic ---
 if __name__ == '__main__':
@@ -216,7 +169,8 @@ if __name__ == '__main__':
         prefix=f"test_{timestamp}",
         grid_rows=num_rows,
         grid_cols=num_cols,
-        dark_mode=use_dark_mode_text
+        dark_mode=use_dark_mode_text,
+        save_json=True # test.py reads the JSON
     )
 
     if annotated_img_path:
@@ -10,10 +10,14 @@ try:
     from .utils import print_with_color
     from .and_controller import AndroidController, list_all_devices
     from .config import load_config
+    from .point_lattice import get_point_lattice
+    from .artifact_writer import FLUSH_TIMEOUT, wait, write_image
 except ImportError:
     # Fallback for standalone execution if not in package
     print("Warning: Running in standalone mode, imports might need adjustment "
           "or related files copied to the same directory.")
+    from point_lattice import get_point_lattice
+    from artifact_writer import FLUSH_TIMEOUT, wait, write_image
     # Define a basic print_with_color if colorama is not found or not in package
     try:
         from colorama import Fore, Style
@@ -73,89 +77,29 @@ def draw_sparse_points_custom_labels( # Renamed function
         print_with_color("Image has zero dimensions.", "red")
         return screenshot_path, None
 
-    col_spacing = img_width / (num_cols + 1)
-    row_spacing = img_height / (num_rows + 1)
-
-    all_points_info = []
-    point_color = (0, 255, 0)
-    label_color = (255, 255, 0)
-    label_bg_color_rgb = (50, 50, 50) # Background for text, no alpha for cv2.rectangle
-
-    # Counter for primary numeric labels (1,2,3... then 10,11,12...)
-    primary_label_counter = 1
-
-    for r_idx in range(num_rows):  # 0 to 15
-        is_primary_numeric_row = r_idx in primary_numeric_label_rows_indices
-        
-        # Determine which primary row this sub-row falls under (if it's a sub-row)
-        # And what its sub-row index is (0 for 'a', 1 for 'b', 2 for 'c')
-        sub_row_index_in_block = -1
-        if not is_primary_numeric_row:
-            # Find the immediately preceding primary numeric row
-            preceding_primary_row_idx = -1
-            for primary_idx in reversed(primary_numeric_label_rows_indices):
-                if r_idx > primary_idx:
-                    preceding_primary_row_idx = primary_idx
-                    break
-            if preceding_primary_row_idx != -1:
-                sub_row_index_in_block = r_idx - (preceding_primary_row_idx + 1)
-
-
-        for c_idx in range(num_cols):  # 0 to 8
-            center_x = int(round(col_spacing * (c_idx + 1)))
-            center_y = int(round(row_spacing * (r_idx + 1)))
-
-            half_size = point_size // 2
-            pt1 = (center_x - half_size, center_y - half_size)
-            pt2 = (center_x + half_size, center_y + half_size)
-            cv2.rectangle(img, pt1, pt2, point_color, -1)
-
-            point_label = ""
-            if is_primary_numeric_row:
-                point_label = str(primary_label_counter)
-                primary_label_counter += 1
-            elif sub_row_index_in_block >= 0 and sub_row_index_in_block < 3: # Max 'a', 'b', 'c'
-                # Sub-rows: 1a, 2a, ..., 9a then 1b, 2b, ..., 9b
-                column_part = str(c_idx + 1) # 1 to 9
-                sub_char = chr(ord('a') + sub_row_index_in_block)
-                point_label = f"{column_part}{sub_char}"
-            else:
-                point_label = f"r{r_idx+1}c{c_idx+1}" # Fallback generic label if logic fails
-
-            all_points_info.append({
-                "label": point_label,
-                "coords_px": [center_x, center_y]
-            })
-
-            # Only draw labels for the primary numeric rows on the image
-            if is_primary_numeric_row:
-                text_to_draw = point_label
-                (text_w, text_h), baseline = cv2.getTextSize(text_to_draw, cv2.FONT_HERSHEY_SIMPLEX, label_font_scale, label_thickness)
-                
-                label_x = center_x - half_size - text_w - 5 
-                label_y = center_y 
-                label_x = max(label_x, 0)
-                label_y = max(label_y + text_h // 2, text_h) 
-                
-                # Simple background rectangle (no transparency for simplicity here)
-                bg_pt1 = (label_x - 2, label_y - text_h - baseline - 2)
-                bg_pt2 = (label_x + text_w + 2, label_y + baseline + 2)
-                cv2.rectangle(img, bg_pt1, bg_pt2, label_bg_color_rgb, -1)
-                cv2.putText(img, text_to_draw, (label_x, label_y),
-                            cv2.FONT_HERSHEY_SIMPLEX, label_font_scale, label_color, label_thickness, cv2.LINE_AA)
+    # Labels, coordinates and the rendered overlay are cached per resolution / lattice
+    lattice = get_point_lattice(img_width, img_height, num_rows, num_cols, primary_numeric_label_rows_indices)
+    lattice.template(point_size, label_font_scale, label_thickness).apply(img)
 
     annotated_image_filename = f"{prefix}_sparse_points_custom.png"
     annotated_image_path = os.path.join(output_dir, annotated_image_filename)
-    cv2.imwrite(annotated_image_path, img)
-    print_with_color(f"Annotated image saved: {annotated_image_path}", "green")
+    # Encoded on the artifact writer's pool while the JSON is saved; waited for before returning
+    annotated_image_path = write_image(annotated_image_path, img)
+    if annotated_image_path is None:
+        print_with_color("Annotated image dropped: artifact queue full.", "red")
+        return None, None
 
     json_filename = f"{prefix}_sparse_points_info_custom.json"
     json_path = os.path.join(output_dir, json_filename)
     try:
-        with open(json_path, 'w') as f_json: json.dump(all_points_info, f_json, indent=4)
+        lattice.save_json(json_path)
         print_with_color(f"Points info JSON saved: {json_path}", "green")
     except Exception as e:
         print_with_color(f"Error saving JSON: {e}", "red"); json_path = None
+    if not wait([annotated_image_path], FLUSH_TIMEOUT): # Callers read or upload the file right away
+        print_with_color(f"Error saving annotated image {annotated_image_path}", "red")
+        return None, json_path
+    print_with_color(f"Annotated image saved: {annotated_image_path}", "green")
     return annotated_image_path, json_path
 
 # --- Main Execution Block ---
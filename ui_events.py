@@ -0,0 +1,238 @@
+import atexit
+import collections
+import re
+import subprocess
+import threading
+import time
+from contextlib import contextmanager
+
+# --- Configuration ---
+ADB_PATH = "adb"  # Path to adb executable or just "adb" if in PATH
+# Accessibility events that mean "what is on screen changed"
+CHANGE_EVENT_TYPES = ("TYPE_WINDOW_STATE_CHANGED", "TYPE_WINDOW_CONTENT_CHANGED", "TYPE_WINDOWS_CHANGED",
+                      "TYPE_VIEW_SCROLLED", "TYPE_VIEW_TEXT_CHANGED", "TYPE_VIEW_SELECTED")
+SETTLE_QUIET_TIME = 0.4 # Seconds without change events after which the UI counts as settled
+WAIT_TIMEOUT = 5.0 # Default upper bound (seconds) for the wait_* helpers
+EVENT_HISTORY = 256 # Recent events kept in memory per device
+STARTUP_GRACE = 0.3 # Seconds to let `uiautomator events` register before trusting its silence
+
+# Matches the head of a `uiautomator events` line, e.g.
+# "EventType: TYPE_WINDOW_STATE_CHANGED; EventTime: 1234; PackageName: com.android.settings; ..."
+EVENT_PATTERN = re.compile(r"EventType: (\w+); EventTime: (\d+); PackageName: ([^;]*);")
+
+
+class UiEvent:
+    """One accessibility event from `uiautomator events`."""
+    __slots__ = ("event_type", "event_time", "package", "received")
+
+    def __init__(self, event_type, event_time, package, received):
+        self.event_type = event_type  # e.g. "TYPE_WINDOW_STATE_CHANGED"
+        self.event_time = event_time  # Device uptime in ms
+        self.package = package
+        self.received = received      # Host time.monotonic() when the line was read
+
+    def __repr__(self):
+        return f"UiEvent({self.event_type}, package='{self.package}', t={self.event_time})"
+
+
+def parse_event_line(line, received=None):
+    """Parses one `uiautomator events` output line into a UiEvent, or None for other lines."""
+    match = EVENT_PATTERN.search(line)
+    if match is None:
+        return None
+    event_type, event_time, package = match.groups()
+    return UiEvent(event_type, int(event_time), package.strip(),
+                   time.monotonic() if received is None else received)
+
+
+class UiEventMonitor:
+    """
+    Keeps one long-running `adb shell uiautomator events` session and turns it into wait primitives.
+
+    Events are parsed line by line on a background thread. Loops can then wait for a real
+    UI change (or for the UI to settle) instead of sleeping a fixed time:
+
+        since = monitor.mark()
+        adb.tap(x, y)
+        monitor.wait_for_update(since)
+
+    Only one UiAutomation client can be connected at a time. Wrap `uiautomator dump` calls
+    in `with monitor.paused():` on devices that refuse to dump while the event stream runs.
+    If the stream cannot be started, the waits degrade to plain timeouts.
+    """
+
+    def __init__(self, device_id=None, change_types=CHANGE_EVENT_TYPES):
+        self.device_id = device_id
+        self.change_types = frozenset(change_types)
+        self.events = collections.deque(maxlen=EVENT_HISTORY)
+        self.last_change = None # time.monotonic() of the latest change event
+        self._condition = threading.Condition()
+        self._process = None
+        self._reader = None
+        self._started_at = None
+
+    # --- Session management ---
+
+    def start(self):
+        """Starts the event stream if it is not running; returns True if it is running."""
+        if self.running:
+            return True
+        command = [ADB_PATH]
+        if self.device_id:
+            command.extend(["-s", self.device_id])
+        command.extend(["shell", "uiautomator", "events"])
+        try:
+            self._process = subprocess.Popen(command, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL,
+                                             text=True, errors="replace", bufsize=1)
+        except FileNotFoundError:
+            print(f"Error: '{ADB_PATH}' command not found. Is ADB installed and in your PATH?")
+            self._process = None
+            return False
+        self._started_at = time.monotonic()
+        self._reader = threading.Thread(target=self._read_events, args=(self._process,),
+                                        name=f"uiautomator-events-{self.device_id or 'default'}", daemon=True)
+        self._reader.start()
+        return True
+
+    def stop(self):
+        """Terminates the event stream."""
+        process, self._process = self._process, None
+        if process is not None and process.poll() is None:
+            process.terminate()
+            try:
+                process.wait(timeout=2)
+            except subprocess.TimeoutExpired:
+                process.kill()
+        if self._reader is not None:
+            self._reader.join(timeout=2)
+            self._reader = None
+
+    @property
+    def running(self):
+        return self._process is not None and self._process.poll() is None
+
+    @contextmanager
+    def paused(self):
+        """Stops the stream for the duration of the block (e.g. around `uiautomator dump`) and restarts it."""
+        was_running = self.running
+        self.stop()
+        try:
+            yield
+        finally:
+            if was_running:
+                self.start()
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, *exc):
+        self.stop()
+
+    def _read_events(self, process):
+        for line in process.stdout:
+            event = parse_event_line(line)
+            if event is None:
+                continue
+            with self._condition:
+                self.events.append(event)
+                if event.event_type in self.change_types:
+                    self.last_change = event.received
+                self._condition.notify_all()
+        with self._condition: # Stream ended, wake waiters so they fall back to timeouts
+            self._condition.notify_all()
+
+    # --- Wait primitives ---
+
+    @staticmethod
+    def mark():
+        """Timestamp to pass as `since` to the wait helpers (take it before acting)."""
+        return time.monotonic()
+
+    def changed_since(self, since):
+        """True if a change event arrived after `since`."""
+        last_change = self.last_change
+        return last_change is not None and last_change > since
+
+    def wait_for_change(self, since=None, timeout=WAIT_TIMEOUT):
+        """
+        Blocks until a change event newer than `since` arrives.
+
+        Args:
+            since (float): mark() taken before the action, defaults to now
+            timeout (float): Maximum seconds to wait
+
+        Returns:
+            bool: True on a change, False on timeout (always False once the stream is down)
+        """
+        since = self.mark() if since is None else since
+        deadline = time.monotonic() + timeout
+        with self._condition:
+            while not self.changed_since(since):
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    return False
+                if not self.running:
+                    self._condition.wait(remaining) # No stream, behave like the fixed sleep it replaces
+                    return False
+                self._condition.wait(remaining)
+        return True
+
+    def wait_until_settled(self, quiet=SETTLE_QUIET_TIME, timeout=WAIT_TIMEOUT):
+        """
+        Blocks until no change event has arrived for `quiet` seconds.
+
+        Returns:
+            bool: True once settled, False if changes kept coming until the timeout
+        """
+        deadline = time.monotonic() + timeout
+        with self._condition:
+            while True:
+                now = time.monotonic()
+                reference = max(self.last_change or 0.0, self._started_at or 0.0)
+                quiet_until = reference + (quiet if self.last_change else max(quiet, STARTUP_GRACE))
+                if now >= quiet_until:
+                    return True
+                if now >= deadline:
+                    return False
+                if not self.running:
+                    self._condition.wait(min(quiet_until, deadline) - now)
+                    return time.monotonic() >= quiet_until
+                self._condition.wait(min(quiet_until, deadline) - now)
+
+    def wait_for_update(self, since=None, change_timeout=WAIT_TIMEOUT / 2, quiet=SETTLE_QUIET_TIME,
+                        timeout=WAIT_TIMEOUT):
+        """
+        Waits for the UI to react to an action taken after `since`, then for it to settle.
+
+        Actions that change nothing only cost `change_timeout`.
+
+        Returns:
+            bool: True if a change was seen and the UI settled within `timeout`
+        """
+        start = time.monotonic()
+        if not self.wait_for_change(since, min(change_timeout, timeout)):
+            return False
+        return self.wait_until_settled(quiet, max(timeout - (time.monotonic() - start), 0))
+
+
+_monitors = {}
+
+
+def get_monitor(device_id=None):
+    """Returns the running UiEventMonitor of a device, starting it on first use."""
+    monitor = _monitors.get(device_id)
+    if monitor is None:
+        monitor = _monitors[device_id] = UiEventMonitor(device_id)
+    monitor.start()
+    return monitor
+
+
+def stop_all_monitors():
+    """Terminates every event stream started by get_monitor()."""
+    for monitor in _monitors.values():
+        monitor.stop()
+    _monitors.clear()
+
+
+atexit.register(stop_all_monitors)
@@ -0,0 +1,359 @@
+import numpy as np
+
+from android_element import AndroidElement, get_id_from_element_appagent_logic
+from hierarchy_parser import iter_nodes
+
+# --- Configuration ---
+# Boolean node attributes stored as columns of UiTree.flags, in this order
+FLAG_NAMES = ("clickable", "long-clickable", "focusable", "scrollable", "checkable",
+              "checked", "enabled", "focused", "selected", "password")
+# String attributes stored as (codes, table) pairs, code 0 is always the empty string
+STRING_COLUMNS = ("class", "resource-id", "text", "content-desc", "package")
+# Multi-window dumps list one top-level node per window; uiautomator emits the topmost window first
+TOP_LEVEL_TOPMOST_FIRST = True
+
+
+class StringColumn:
+    """Interned string column: `codes[i]` indexes into `table`, shared strings are stored once."""
+    __slots__ = ("codes", "table", "_lookup")
+
+    def __init__(self, codes, table):
+        self.codes = codes
+        self.table = table
+        self._lookup = None
+
+    @classmethod
+    def from_values(cls, values):
+        lookup = {"": 0}
+        table = [""]
+        codes = np.empty(len(values), dtype=np.int32)
+        for i, value in enumerate(values):
+            code = lookup.get(value)
+            if code is None:
+                code = lookup[value] = len(table)
+                table.append(value)
+            codes[i] = code
+        column = cls(codes, table)
+        column._lookup = lookup
+        return column
+
+    def __getitem__(self, row):
+        return self.table[self.codes[row]]
+
+    def __len__(self):
+        return len(self.codes)
+
+    def code_of(self, value):
+        """Returns the table code of `value`, or -1 if no row holds it."""
+        if self._lookup is None:
+            self._lookup = {value: code for code, value in enumerate(self.table)}
+        return self._lookup.get(value, -1)
+
+    def equals(self, value):
+        """Boolean mask of rows whose value is exactly `value`."""
+        return self.codes == self.code_of(value)
+
+    def take(self, rows):
+        """Column restricted to `rows` (the string table is shared, not copied)."""
+        return StringColumn(self.codes[rows], self.table)
+
+
+class UiTree:
+    """
+    Columnar snapshot of a UI hierarchy: one row per <node>, in document order.
+
+    Every column is a numpy array of length N, so geometry and flag queries run
+    vectorized over the whole tree instead of looping over Python objects.
+    """
+
+    def __init__(self, bounds, parent, depth, drawing_order, sibling_index, flags, strings, uids):
+        self.bounds = bounds                # (N, 4) int32 [x1, y1, x2, y2]
+        self.parent = parent                # (N,) int32 row of the parent node, -1 for top-level nodes
+        self.depth = depth                  # (N,) int16 nesting depth, 0 for top-level nodes
+        self.drawing_order = drawing_order  # (N,) int16 "drawing-order" among siblings
+        self.sibling_index = sibling_index  # (N,) int16 "index" attribute
+        self.flags = flags                  # (N, len(FLAG_NAMES)) bool
+        self.strings = strings              # {name: StringColumn} for STRING_COLUMNS
+        self.uids = uids                    # StringColumn of AppAgent-style element ids
+        self._cache = {}                    # Derived per-snapshot structures, see cached()
+
+    @classmethod
+    def from_nodes(cls, nodes):
+        """Builds a UiTree from hierarchy_parser.HierarchyNode objects (document order)."""
+        count = len(nodes)
+        bounds = np.zeros((count, 4), dtype=np.int32)
+        parent = np.full(count, -1, dtype=np.int32)
+        depth = np.zeros(count, dtype=np.int16)
+        drawing_order = np.zeros(count, dtype=np.int16)
+        sibling_index = np.zeros(count, dtype=np.int16)
+        flags = np.zeros((count, len(FLAG_NAMES)), dtype=bool)
+        values = {name: [] for name in STRING_COLUMNS}
+        uids = []
+
+        row_of = {}
+        for row, node in enumerate(nodes):
+            row_of[id(node)] = row
+            attrib = node.attrib
+            if node.bounds is not None:
+                bounds[row] = node.bounds
+            parent[row] = row_of.get(id(node.parent), -1)
+            depth[row] = max(node.depth, 0)
+            drawing_order[row] = _to_int(attrib.get("drawing-order"))
+            sibling_index[row] = _to_int(attrib.get("index"))
+            for col, name in enumerate(FLAG_NAMES):
+                if attrib.get(name) == "true":
+                    flags[row, col] = True
+            for name in STRING_COLUMNS:
+                values[name].append(attrib.get(name, ""))
+            uids.append(get_id_from_element_appagent_logic(node, node.parent))
+
+        strings = {name: StringColumn.from_values(column) for name, column in values.items()}
+        return cls(bounds, parent, depth, drawing_order, sibling_index, flags, strings,
+                   StringColumn.from_values(uids))
+
+    @classmethod
+    def from_xml(cls, source, backend=None):
+        """Parses a UI dump (path, file object or bytes) straight into a UiTree."""
+        return cls.from_nodes(list(iter_nodes(source, backend)))
+
+    def take(self, rows):
+        """
+        Sub-snapshot holding only `rows`; each kept row is re-parented to its nearest kept ancestor.
+
+        Element ids, flags and strings are carried over unchanged, so uids still match the full tree.
+        Raw "drawing-order" values only compare among the original siblings, so the paint order
+        of the full tree is carried instead: the sub-tree's paint_rank() keeps the relative order
+        of the kept rows, and drawing_order is renumbered to each row's position among its new
+        siblings.
+
+        Args:
+            rows: Rows to keep (mask or indices), document order is preserved
+
+        Returns:
+            UiTree: New snapshot with len(rows) rows and an empty cache
+        """
+        rows = np.asarray(_as_rows(rows), dtype=np.int64)
+        rows.sort()
+        new_row = np.full(len(self), -1, dtype=np.int32)
+        new_row[rows] = np.arange(len(rows), dtype=np.int32)
+        nearest = new_row.copy() # New row of the nearest kept node on the path to the root, -1 if none
+        parent = self.parent.tolist()
+        for row in range(len(self)): # Parents precede children in document order
+            if nearest[row] < 0 and parent[row] >= 0:
+                nearest[row] = nearest[parent[row]]
+        kept_parent = self.parent[rows]
+        new_parent = np.where(kept_parent >= 0, nearest[np.maximum(kept_parent, 0)], -1).astype(np.int32)
+        depth = np.zeros(len(rows), dtype=np.int16)
+        for i, p in enumerate(new_parent.tolist()):
+            if p >= 0:
+                depth[i] = depth[p] + 1
+        paint_rank = np.empty(len(rows), dtype=np.int32)
+        paint_order = np.argsort(self.paint_rank()[rows], kind="stable")
+        paint_rank[paint_order] = np.arange(len(rows), dtype=np.int32)
+        drawing_order = np.zeros(len(rows), dtype=np.int16)
+        next_order = {}
+        for i in paint_order.tolist(): # Siblings in paint order get 0, 1, 2, ...
+            p = int(new_parent[i])
+            drawing_order[i] = next_order.get(p, 0)
+            next_order[p] = drawing_order[i] + 1
+        sub = UiTree(self.bounds[rows], new_parent, depth, drawing_order, self.sibling_index[rows],
+                     self.flags[rows], {name: column.take(rows) for name, column in self.strings.items()},
+                     self.uids.take(rows))
+        sub._cache["paint_rank"] = paint_rank # Top-level rows may come from one window, keep its order too
+        return sub
+
+    def __len__(self):
+        return len(self.parent)
+
+    def __repr__(self):
+        return f"UiTree(nodes={len(self)}, classes={len(self.strings['class'].table) - 1})"
+
+    def cached(self, key, factory):
+        """Returns the structure stored under `key`, building it with factory(self) on first use."""
+        value = self._cache.get(key)
+        if value is None:
+            value = self._cache[key] = factory(self)
+        return value
+
+    # --- Row access ---
+
+    def flag(self, name):
+        """Boolean column for one of FLAG_NAMES."""
+        return self.flags[:, FLAG_NAMES.index(name)]
+
+    def string(self, name, row):
+        """String attribute `name` of `row`."""
+        return self.strings[name][row]
+
+    def bbox(self, row):
+        """((x1, y1), (x2, y2)) of `row`, the AndroidElement convention."""
+        x1, y1, x2, y2 = self.bounds[row].tolist()
+        return (x1, y1), (x2, y2)
+
+    def element(self, row, attrib_name="clickable"):
+        """Returns an AndroidElement view of `row`."""
+        flag_value = "true" if attrib_name in FLAG_NAMES and self.flag(attrib_name)[row] else "false"
+        return AndroidElement(
+            uid=self.uids[row],
+            bbox=self.bbox(row),
+            attrib_name=attrib_name,
+            attrib_value=flag_value,
+            text=self.strings["text"][row],
+            desc=self.strings["content-desc"][row],
+            tree=self,
+            row=int(row),
+            class_name=self.strings["class"][row],
+        )
+
+    def elements(self, rows, attrib_name="clickable"):
+        """AndroidElement views for `rows` (a mask or an index array)."""
+        return [self.element(row, attrib_name) for row in _as_rows(rows)]
+
+    def children(self, row):
+        """Rows whose parent is `row`, in document order."""
+        return np.flatnonzero(self.parent == row)
+
+    def ancestors(self, row):
+        """Rows from the parent of `row` up to its top-level node."""
+        chain = []
+        row = self.parent[row]
+        while row >= 0:
+            chain.append(int(row))
+            row = self.parent[row]
+        return chain
+
+    def paint_rank(self):
+        """
+        (N,) int32 global paint order: a higher rank is drawn later, i.e. on top.
+
+        Parents paint before their children, siblings by their "drawing-order",
+        and whole windows (top-level subtrees) according to TOP_LEVEL_TOPMOST_FIRST.
+        """
+        return self.cached("paint_rank", _compute_paint_rank)
+
+    def subtree_end(self):
+        """(N,) int32 exclusive end row of each subtree; rows are in pre-order, so row r owns rows [r, end)."""
+        return self.cached("subtree_end", _compute_subtree_end)
+
+    def window(self):
+        """(N,) int32 index of the top-level subtree (window) each row belongs to, 0 = bottom window."""
+        return self.cached("window", _compute_window)
+
+    def where(self, **flag_values):
+        """Mask of rows matching every flag, e.g. where(clickable=True, enabled=True)."""
+        mask = np.ones(len(self), dtype=bool)
+        for name, wanted in flag_values.items():
+            column = self.flag(name.replace("_", "-"))
+            mask &= column if wanted else ~column
+        return mask
+
+    # --- Vectorized geometry ---
+
+    def areas(self):
+        """(N,) int64 pixel areas, 0 for empty or inverted bounds."""
+        widths = np.clip(self.bounds[:, 2].astype(np.int64) - self.bounds[:, 0], 0, None)
+        heights = np.clip(self.bounds[:, 3].astype(np.int64) - self.bounds[:, 1], 0, None)
+        return widths * heights
+
+    def valid(self):
+        """Mask of rows with non-empty bounds (x1 < x2 and y1 < y2)."""
+        b = self.bounds
+        return (b[:, 0] < b[:, 2]) & (b[:, 1] < b[:, 3])
+
+    def area_between(self, min_area=0, max_area=None):
+        """Mask of rows whose area lies in [min_area, max_area]."""
+        areas = self.areas()
+        mask = areas >= min_area
+        if max_area is not None:
+            mask &= areas <= max_area
+        return mask
+
+    def contains_point(self, x, y):
+        """Mask of rows whose bounds contain the point (x, y), right/bottom edges exclusive."""
+        b = self.bounds
+        return (b[:, 0] <= x) & (x < b[:, 2]) & (b[:, 1] <= y) & (y < b[:, 3])
+
+    def contains_rect(self, rect):
+        """Mask of rows whose bounds fully contain rect (x1, y1, x2, y2)."""
+        b = self.bounds
+        x1, y1, x2, y2 = rect
+        return (b[:, 0] <= x1) & (b[:, 1] <= y1) & (b[:, 2] >= x2) & (b[:, 3] >= y2)
+
+    def within_rect(self, rect):
+        """Mask of rows lying fully inside rect (x1, y1, x2, y2)."""
+        b = self.bounds
+        x1, y1, x2, y2 = rect
+        return (b[:, 0] >= x1) & (b[:, 1] >= y1) & (b[:, 2] <= x2) & (b[:, 3] <= y2)
+
+    def intersects(self, rect):
+        """Mask of rows whose bounds overlap rect (x1, y1, x2, y2) with a positive area."""
+        b = self.bounds
+        x1, y1, x2, y2 = rect
+        return (b[:, 0] < x2) & (x1 < b[:, 2]) & (b[:, 1] < y2) & (y1 < b[:, 3])
+
+    def intersection_areas(self, rect):
+        """(N,) int64 overlap area between each row and rect (x1, y1, x2, y2)."""
+        b = self.bounds.astype(np.int64)
+        x1, y1, x2, y2 = rect
+        widths = np.clip(np.minimum(b[:, 2], x2) - np.maximum(b[:, 0], x1), 0, None)
+        heights = np.clip(np.minimum(b[:, 3], y2) - np.maximum(b[:, 1], y1), 0, None)
+        return widths * heights
+
+
+def _children_by_parent(tree):
+    children = {}
+    for row, parent in enumerate(tree.parent.tolist()):
+        children.setdefault(parent, []).append(row)
+    return children
+
+
+def _compute_paint_rank(tree):
+    children = _children_by_parent(tree)
+    drawing_order = tree.drawing_order.tolist()
+    top_level = children.get(-1, [])
+    if TOP_LEVEL_TOPMOST_FIRST:
+        top_level = top_level[::-1]
+    rank = np.zeros(len(tree), dtype=np.int32)
+    next_rank = 0
+    stack = top_level[::-1]
+    while stack:
+        row = stack.pop()
+        rank[row] = next_rank
+        next_rank += 1
+        kids = sorted(children.get(row, ()), key=lambda kid: (drawing_order[kid], kid))
+        stack.extend(reversed(kids))
+    return rank
+
+
+def _compute_subtree_end(tree):
+    size = np.ones(len(tree), dtype=np.int32)
+    parent = tree.parent.tolist()
+    for row in range(len(tree) - 1, -1, -1): # Children follow their parent, so sizes are final when read
+        if parent[row] >= 0:
+            size[parent[row]] += size[row]
+    return np.arange(len(tree), dtype=np.int32) + size
+
+
+def _compute_window(tree):
+    top_level = [row for row, parent in enumerate(tree.parent.tolist()) if parent < 0]
+    if TOP_LEVEL_TOPMOST_FIRST:
+        top_level = top_level[::-1]
+    window = np.zeros(len(tree), dtype=np.int32)
+    order = {row: i for i, row in enumerate(top_level)}
+    for row, parent in enumerate(tree.parent.tolist()):
+        window[row] = order[row] if parent < 0 else window[parent] # Parents precede children in document order
+    return window
+
+
+def _to_int(value, default=0):
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return default
+
+
+def _as_rows(rows):
+    rows = np.asarray(rows)
+    if rows.dtype == bool:
+        rows = np.flatnonzero(rows)
+    return rows.tolist()
@@ -2,6 +2,12 @@ import base64
 import cv2
 import numpy as np
 from colorama import Fore, Style
+from artifact_writer import write_image
+from label_placement import place_labels
+from overlay_renderer import draw_labels, draw_leaders, get_atlas, putbtext_origin
+
+LABEL_PLACEMENT = True # Move overlapping labels to free spots with leader lines (label_placement.py)
+BACKGROUND_WRITES = False # Write draw_bbox_multi output on artifact_writer's worker pool instead of blocking
 
 def print_with_color(text: str, color=""):
     if color == "red":
@@ -54,18 +60,30 @@ def draw_bbox_multi(img_path, output_path, elem_list, record_mode=False, dark_mo
     if img.shape[0] == 0 or img.shape[1] == 0:
         print_with_color(f"Error: Image at {img_path} is empty or invalid.", "red")
         return None
-    count = 0
-    for elem in elem_list:
-        count += 1
+    draw_element_labels(img, elem_list, record_mode, dark_mode)
+    if BACKGROUND_WRITES:
+        write_image(output_path, img)
+        img.flags.writeable = False # Shared with the writer until encoded: copy before drawing on it
+    else:
+        cv2.imwrite(output_path, img)
+    return img
+
+def draw_element_labels(img, elem_list, record_mode=False, dark_mode=False):
+    """Draws the e1, e2, ... labels of draw_bbox_multi onto a BGR image in place; returns the image."""
+    atlas = get_atlas(font_scale=1, thickness=2, vspace=5, hspace=5)
+    labels, origins, bg_colors, text_colors = [], [], [], []
+    for count, elem in enumerate(elem_list, start=1):
         tl, br = elem.bbox[0], elem.bbox[1]
         color = (0, 0, 0)
         if record_mode:
-            if elem.attrib == "clickable":
+            # Text color encodes the category, e.g. from merge_clickable_focusable(classify_xml_tree(...))
+            if elem.attrib_name == "clickable":
                 color = (255, 0, 0)
-            elif elem.attrib == "focusable":
+            elif elem.attrib_name == "focusable":
                 color = (0, 0, 255)
             else:
                 color = (0, 255, 0)
+            text_background_color = [80, 80, 80] if dark_mode else [200, 200, 200] # Same as outside record_mode
         else:
             if dark_mode:
                 color = [255, 255, 255]  # White for text on dark mode
@@ -73,18 +91,19 @@ def draw_bbox_multi(img_path, output_path, elem_list, record_mode=False, dark_mo
             else:
                 color = [0, 0, 0] # Black for text on light mode
                 text_background_color = [200, 200, 200] # Light gray for background
-        try:
-            img = putBText(img, f"e{count}", text_offset_x=(tl[0] + br[0]) // 2 - 5, text_offset_y=(tl[1] + br[1]) // 2 - 5,
-                              vspace=5, hspace=5, font_scale=1, thickness=2, background_RGB=text_background_color,
-                              text_RGB=color, font=cv2.FONT_HERSHEY_SIMPLEX)
-        except Exception as e:
-            print_with_color(f"Error drawing text with pyshine: {e}", "red")
-            print_with_color("Falling back to cv2.putText", "yellow")
-            # Fallback to simple text drawing
-            # Simple background rectangle for cv2.putText
-    # (text_size, _) = cv2.getTextSize(str(count), cv2.FONT_HERSHEY_SIMPLEX, 1, 2)
-    # cv2.rectangle(img, (label_x, label_y - text_size[1] - 5), (label_x + text_size[0] + 5, label_y + 5), text_background_color, -1)
-    cv2.imwrite(output_path, img)
+        labels.append(f"e{count}")
+        origins.append(putbtext_origin((tl[0] + br[0]) // 2 - 5, (tl[1] + br[1]) // 2 - 5, atlas))
+        bg_colors.append(text_background_color[::-1]) # Colors above are RGB, as putBText takes them
+        text_colors.append(color[::-1])
+    if LABEL_PLACEMENT:
+        placements = place_labels([elem.bbox for elem in elem_list], [atlas.size(label) for label in labels],
+                                  (img.shape[1], img.shape[0]), preferred=origins)
+        origins = [placement.origin for placement in placements]
+        leaders = [(placement.leader, bg) for placement, bg in zip(placements, bg_colors) if placement.leader]
+        draw_leaders(img, [leader for leader, _ in leaders], [bg for _, bg in leaders], 2)
+    rects = draw_labels(img, labels, origins, bg_colors, text_colors, alpha=0.6, atlas=atlas)
+    for elem, rect in zip(elem_list, rects):
+        elem.label_rect = rect # Final label rectangle, for hit-testing what the model reads
     return img
 
 def encode_image(image_path):
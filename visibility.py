@@ -0,0 +1,137 @@
+import numpy as np
+
+from ui_tree import UiTree
+
+# --- Configuration ---
+MIN_VISIBLE_FRACTION = 0.5 # Elements with less of their area visible are treated as hidden
+COVERAGE_SCALE = 4 # Pixels per cell of the coverage raster (1 = exact, larger = faster)
+# Nodes that cover what is painted below them: they intercept touches (dialog buttons, bottom
+# sheets, scrims, FABs). Window roots above the bottom window always occlude.
+OCCLUDER_FLAGS = ("clickable", "long-clickable", "scrollable")
+
+
+class VisibilityMap:
+    """
+    Visible-area estimate for every node of one UiTree snapshot.
+
+    Occluders are painted into a downscaled raster in paint order (drawing-order, nesting and
+    window layering), so each cell holds the rank of the topmost occluder covering it. A node
+    is visible in a cell when that rank belongs to something painted below it or inside its
+    own subtree. Cells outside the screen never count as visible.
+    """
+
+    def __init__(self, tree, screen_size=None, occluder_flags=OCCLUDER_FLAGS, scale=COVERAGE_SCALE):
+        self.tree = tree
+        self.scale = scale
+        rank = tree.paint_rank()
+        self._end = rank + (tree.subtree_end() - np.arange(len(tree))) # Paint ranks are pre-order too
+
+        if screen_size is None:
+            roots = tree.parent < 0
+            screen_size = (int(tree.bounds[roots, 2].max(initial=0)), int(tree.bounds[roots, 3].max(initial=0)))
+        self.screen_size = screen_size
+        width, height = screen_size
+        self._raster = np.full((-(-height // scale), -(-width // scale)), -1, dtype=np.int32)
+
+        occluders = np.zeros(len(tree), dtype=bool)
+        for name in occluder_flags:
+            occluders |= tree.flag(name)
+        occluders |= (tree.parent < 0) & (tree.window() > 0)
+        rows = np.flatnonzero(occluders & tree.valid())
+        rows = rows[np.argsort(rank[rows], kind="stable")] # Bottom first, later writes cover earlier ones
+        cells = self._cells(tree.bounds[rows])
+        for row, (cx1, cy1, cx2, cy2) in zip(rows.tolist(), cells.tolist()):
+            self._raster[cy1:cy2, cx1:cx2] = rank[row]
+
+    @classmethod
+    def for_tree(cls, tree, screen_size=None):
+        """Returns the visibility map of `tree`, building it once per snapshot and screen size."""
+        key = ("visibility", None if screen_size is None else tuple(screen_size))
+        return tree.cached(key, lambda t: cls(t, screen_size))
+
+    def _cells(self, bounds):
+        """Bounds -> raster cell ranges [cx1, cy1, cx2, cy2), keeping cells the box mostly covers."""
+        half = self.scale // 2
+        cells = (np.asarray(bounds, dtype=np.int64).reshape(-1, 4) + half) // self.scale
+        cells[:, [0, 2]] = np.clip(cells[:, [0, 2]], 0, self._raster.shape[1])
+        cells[:, [1, 3]] = np.clip(cells[:, [1, 3]], 0, self._raster.shape[0])
+        return cells
+
+    def visible_fraction(self, rows=None):
+        """
+        Fraction (0..1) of each row's area that is on screen and not covered by a later-painted occluder.
+
+        Args:
+            rows: Rows to measure (mask or indices), defaults to every row
+
+        Returns:
+            np.ndarray: (len(rows),) float64, 0 for rows with empty bounds
+        """
+        rows = np.arange(len(self.tree)) if rows is None else np.asarray(rows)
+        if rows.dtype == bool:
+            rows = np.flatnonzero(rows)
+        bounds = self.tree.bounds[rows].astype(np.int64)
+        full = np.clip(bounds[:, 2:] - bounds[:, :2], 0, None).prod(axis=1).astype(np.float64)
+        cells = self._cells(bounds)
+        fractions = np.zeros(len(rows))
+        cell_area = float(self.scale * self.scale)
+        for i, (row, (cx1, cy1, cx2, cy2)) in enumerate(zip(rows.tolist(), cells.tolist())):
+            if full[i] <= 0 or cx1 >= cx2 or cy1 >= cy2:
+                continue
+            visible = np.count_nonzero(self._raster[cy1:cy2, cx1:cx2] < self._end[row])
+            fractions[i] = min(visible * cell_area / full[i], 1.0)
+        return fractions
+
+    def visible(self, rows=None, min_fraction=MIN_VISIBLE_FRACTION):
+        """Mask aligned with `rows`: True where at least `min_fraction` of the area is visible."""
+        return self.visible_fraction(rows) >= min_fraction
+
+
+def _element_rows(tree, elements):
+    """Tree row of each AndroidElement: its own row if it is a tree view, else matched by (uid, bbox)."""
+    lookup = None
+    rows = []
+    for elem in elements:
+        if elem.tree is tree and elem.row is not None:
+            rows.append(elem.row)
+            continue
+        if lookup is None:
+            lookup = {}
+            for row in range(len(tree)):
+                lookup.setdefault((tree.uids[row], tree.bbox(row)), row)
+        rows.append(lookup.get((elem.uid, tuple(tuple(point) for point in elem.bbox)), -1))
+    return rows
+
+
+def filter_visible_elements(elements, tree, min_fraction=MIN_VISIBLE_FRACTION, drop=True, screen_size=None):
+    """
+    Removes or flags elements hidden by dialogs, sheets and overlays or lying off screen.
+
+    Every element gets its `visible_fraction` set. Elements that cannot be located in `tree`
+    are kept with visible_fraction None.
+
+    Args:
+        elements (list): AndroidElement list, e.g. from traverse_xml_tree
+        tree (UiTree): Snapshot the elements come from
+        min_fraction (float): Minimum visible fraction to keep an element
+        drop (bool): True to drop hidden elements, False to keep them with the fraction set
+        screen_size (tuple): (width, height) in pixels, defaults to the extent of the window roots
+
+    Returns:
+        list: The kept AndroidElement objects, in the input order
+    """
+    rows = np.array(_element_rows(tree, elements), dtype=np.int64)
+    known = rows >= 0
+    fractions = np.full(len(rows), np.nan)
+    fractions[known] = VisibilityMap.for_tree(tree, screen_size).visible_fraction(rows[known])
+    kept = []
+    for elem, fraction in zip(elements, fractions.tolist()):
+        elem.visible_fraction = None if np.isnan(fraction) else fraction
+        if not drop or elem.visible_fraction is None or fraction >= min_fraction:
+            kept.append(elem)
+    return kept
+
+
+def filter_visible_xml(source, elements, min_fraction=MIN_VISIBLE_FRACTION, drop=True, backend=None):
+    """Parses a dump (path or bytes) and applies filter_visible_elements to `elements` from it."""
+    return filter_visible_elements(elements, UiTree.from_xml(source, backend), min_fraction, drop)
@@ -0,0 +1,186 @@
+import json
+import os
+
+import cv2
+
+from grid_geometry import get_grid_geometry
+from grid_overlay import apply_grid
+
+# --- Configuration ---
+ZOOM_COARSE_GRID = (10, 4) # (rows, cols) of the first round, same as draw_grid_and_get_info
+ZOOM_FINE_GRID = (3, 3) # (rows, cols) overlaid on each zoomed crop
+ZOOM_LEVELS = 2 # Zoom rounds after the coarse round
+ZOOM_MARGIN = 0.25 # Context added around the chosen cell on each side, as a fraction of its size
+ZOOM_MIN_CELL_SIDE = 24 # Stop zooming once sub-cells would be smaller than this many frame pixels
+COARSE_VIEW_MAX_SIDE = 1024 # Longest side of the image sent in the coarse round
+ZOOM_VIEW_SIDE = 512 # Longest side of each zoomed crop sent to the model (small crops are upscaled)
+ZOOM_OUTPUT_DIR = os.path.join("temp", "zoom_rounds") # Where the per-round images are written
+
+ZOOM_PROMPT = """You are looking at {view} with a numbered grid of {rows} rows x {cols} columns drawn on it.
+The number in the top-left corner of each cell is its cell_id.
+
+Task: find {target}.
+
+Answer with a JSON object only:
+{{
+  "found": true or false,
+  "cell_id": <cell_id that contains the center of the target>,
+  "reasoning": "<one short sentence>"
+}}"""
+
+
+class ZoomRound:
+    """One question to the model: the frame region shown, its grid and the answer."""
+
+    def __init__(self, level, region, scale, geometry, image_path):
+        self.level = level            # 0 for the coarse round
+        self.region = region          # (x1, y1, x2, y2) of the full frame shown, in frame pixels
+        self.scale = scale            # View pixels per frame pixel
+        self.geometry = geometry      # GridGeometry of the view image
+        self.image_path = image_path
+        self.image_bytes = os.path.getsize(image_path)
+        self.cell_id = None           # Cell picked by the model
+        self.response = None          # Raw model answer
+
+    def __repr__(self):
+        return f"ZoomRound(level={self.level}, region={self.region}, cell_id={self.cell_id})"
+
+    def to_frame(self, x, y):
+        """Maps a point of the view image to full-frame pixels."""
+        return int(round(self.region[0] + x / self.scale)), int(round(self.region[1] + y / self.scale))
+
+    def cell_region(self, cell_id):
+        """(x1, y1, x2, y2) in frame pixels of a cell of this round's grid."""
+        x1, y1, x2, y2 = self.geometry.cell_bounds(cell_id)
+        return self.to_frame(x1, y1) + self.to_frame(x2, y2)
+
+
+class ZoomResult:
+    """Outcome of refine_tap_point: the tap point in frame pixels plus the rounds that led to it."""
+
+    def __init__(self, point, rounds):
+        self.point = point    # (x, y) in full-frame pixels, or None if the target was not found
+        self.rounds = rounds  # ZoomRound list, coarse round first
+
+    def __repr__(self):
+        return f"ZoomResult(point={self.point}, rounds={len(self.rounds)}, bytes={self.bytes_sent})"
+
+    @property
+    def bytes_sent(self):
+        return sum(zoom_round.image_bytes for zoom_round in self.rounds)
+
+
+def _render_view(frame, region, max_side, rows, cols, dark_mode, image_path):
+    """Crops `region` from the frame, scales it to `max_side`, draws the grid and writes it; returns (scale, geometry)."""
+    x1, y1, x2, y2 = region
+    crop = frame[y1:y2, x1:x2]
+    scale = max_side / max(x2 - x1, y2 - y1)
+    size = (max(int(round((x2 - x1) * scale)), 1), max(int(round((y2 - y1) * scale)), 1))
+    view = cv2.resize(crop, size, interpolation=cv2.INTER_AREA if scale < 1 else cv2.INTER_CUBIC)
+    apply_grid(view, rows, cols, dark_mode)
+    cv2.imwrite(image_path, view)
+    return scale, get_grid_geometry(size[0], size[1], rows, cols)
+
+
+def _expand(region, margin, frame_width, frame_height):
+    """Grows (x1, y1, x2, y2) by `margin` of its size on each side, clipped to the frame."""
+    x1, y1, x2, y2 = region
+    dx, dy = int(round((x2 - x1) * margin)), int(round((y2 - y1) * margin))
+    return max(x1 - dx, 0), max(y1 - dy, 0), min(x2 + dx, frame_width), min(y2 + dy, frame_height)
+
+
+def parse_zoom_response(response_text):
+    """
+    Reads the model's JSON answer (optionally inside a ```json fence).
+
+    Returns:
+        int: The chosen cell_id, or None if the target was reported as not found
+
+    Raises:
+        ValueError: If the answer is not JSON or has no usable cell_id
+    """
+    text = response_text.strip()
+    if text.startswith("```"):
+        text = text.split("\n", 1)[1] if "\n" in text else ""
+        text = text.rsplit("```", 1)[0]
+    answer = json.loads(text)
+    if not isinstance(answer, dict):
+        raise ValueError(f"Expected a JSON object, got {type(answer).__name__}")
+    if answer.get("found") is False:
+        return None
+    if answer.get("cell_id") is None:
+        raise ValueError("Answer has no cell_id")
+    return int(answer["cell_id"])
+
+
+def refine_tap_point(llm, frame_path, target, levels=ZOOM_LEVELS, coarse_grid=ZOOM_COARSE_GRID,
+                     fine_grid=ZOOM_FINE_GRID, margin=ZOOM_MARGIN, dark_mode=False, output_dir=ZOOM_OUTPUT_DIR):
+    """
+    Locates `target` by asking the model for a grid cell, then zooming into it.
+
+    The coarse round shows the whole frame (downscaled to COARSE_VIEW_MAX_SIDE) with the
+    coarse grid. Each further round crops the chosen cell plus `margin` from the
+    full-resolution frame, scales it to ZOOM_VIEW_SIDE, overlays the fine grid and asks
+    again. Every round keeps the mapping from its view back to frame pixels, so the final
+    tap point is the center of the last chosen cell in frame coordinates. Zooming stops
+    early when sub-cells would get smaller than ZOOM_MIN_CELL_SIDE frame pixels.
+
+    Args:
+        llm: Model with get_model_response(prompt, image_paths) -> (ok, text), e.g. test.BaseModel
+        frame_path (str): Full-resolution screenshot
+        target (str): What to find, e.g. "the Google Play Store app icon"
+        levels (int): Zoom rounds after the coarse round
+        coarse_grid (tuple): (rows, cols) of the coarse round
+        fine_grid (tuple): (rows, cols) of the zoom rounds
+        margin (float): Context around the chosen cell, fraction of its size per side
+        dark_mode (bool): Grid theme
+        output_dir (str): Where the round images are written
+
+    Returns:
+        ZoomResult: point is None if the model failed, gave an invalid cell or did not find the target
+    """
+    frame = cv2.imread(frame_path)
+    if frame is None:
+        print(f"Error: Could not read image from {frame_path}")
+        return ZoomResult(None, [])
+    os.makedirs(output_dir, exist_ok=True)
+    stem = os.path.splitext(os.path.basename(frame_path))[0]
+    frame_height, frame_width = frame.shape[:2]
+
+    rounds = []
+    region = (0, 0, frame_width, frame_height)
+    for level in range(levels + 1):
+        rows, cols = coarse_grid if level == 0 else fine_grid
+        if level > 0:
+            previous = rounds[-1]
+            region = _expand(previous.cell_region(previous.cell_id), margin, frame_width, frame_height)
+            if min(region[2] - region[0], region[3] - region[1]) / max(rows, cols) < ZOOM_MIN_CELL_SIDE:
+                break
+        max_side = min(COARSE_VIEW_MAX_SIDE, max(frame_width, frame_height)) if level == 0 else ZOOM_VIEW_SIDE
+        image_path = os.path.join(output_dir, f"{stem}_zoom{level}.png")
+        scale, geometry = _render_view(frame, region, max_side, rows, cols, dark_mode, image_path)
+        zoom_round = ZoomRound(level, region, scale, geometry, image_path)
+        rounds.append(zoom_round)
+
+        view = "a phone screenshot" if level == 0 else "a zoomed-in part of a phone screenshot"
+        prompt = ZOOM_PROMPT.format(view=view, rows=rows, cols=cols, target=target)
+        ok, response = llm.get_model_response(prompt, [image_path])
+        zoom_round.response = response
+        if not ok:
+            print(f"Error: Model request failed in zoom round {level}: {response}")
+            return ZoomResult(None, rounds)
+        try:
+            zoom_round.cell_id = parse_zoom_response(response)
+            if zoom_round.cell_id is not None:
+                geometry.cell_position(zoom_round.cell_id) # Validates the id against this grid
+        except ValueError as e:
+            print(f"Error: Unusable answer in zoom round {level}: {e}\n{response}")
+            return ZoomResult(None, rounds)
+        if zoom_round.cell_id is None: # Not seen in the crop: keep the previous round's cell
+            break
+
+    answered = [zoom_round for zoom_round in rounds if zoom_round.cell_id is not None]
+    if not answered:
+        return ZoomResult(None, rounds)
+    last = answered[-1]
+    return ZoomResult(last.to_frame(*last.geometry.point(last.cell_id, "center")), rounds)